@@ -0,0 +1,40 @@
+"""
+Atomic file writes.
+===================
+Readers (the sports API, the next crawl, a Prometheus textfile collector)
+must never see a half-written file, so output is written to a temp file in
+the target directory and then moved over the old file with os.replace(),
+which is atomic on both POSIX and Windows.
+"""
+import json
+import os
+import tempfile
+from typing import Callable, TextIO
+
+
+def _write_atomic(path: str, write: Callable[[TextIO], None]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.basename(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path: str, data, **dump_kwargs) -> None:
+    """json.dump `data` to `path` via a temp file + rename."""
+    _write_atomic(path, lambda f: json.dump(data, f, **dump_kwargs))
+
+
+def write_text_atomic(path: str, text: str) -> None:
+    """Write `text` to `path` via a temp file + rename."""
+    _write_atomic(path, lambda f: f.write(text))
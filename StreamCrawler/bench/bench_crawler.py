@@ -0,0 +1,207 @@
+"""
+Crawler benchmark
+=================
+Runs scrape_all_events() against the offline fixture server
+(fixture_server.py) at several event counts and reports, per size:
+
+  - wall time of the whole crawl
+  - peak RSS of the crawling process
+  - p50 / p95 latency of each stage: live (the /live card list),
+    embed (event page -> embed URL), token (/fetch -> m3u8), mirrors
+    (alternate streams resolved and timed, with --mirror-streams) and event
+    (one event end to end, as seen by a worker)
+
+Each crawl runs in a fresh child process so peak RSS is not inflated by
+earlier runs or by the fixture server, which lives in this process. Stage
+latencies come from the crawl's own metrics (metrics.py). Peak RSS is that
+of the crawl's main process; with --shards each shard process adds its own.
+
+    python bench/bench_crawler.py                      # 20, 200, 2000 events
+    python bench/bench_crawler.py --sizes 200 --latency 40 --error-rate 0.02
+    python bench/bench_crawler.py --extractor auto --json bench.json
+"""
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CRAWLER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, CRAWLER_DIR)
+
+from fixture_server import FixtureServer, fixture_env  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+DEFAULT_SIZES = (20, 200, 2000)
+STAGES = ('live', 'embed', 'token', 'mirrors', 'event')
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 2)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Child: one timed crawl (environment already points at the fixture)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def run_child(args: argparse.Namespace) -> None:
+    import scraper
+    from metrics import CrawlMetrics
+
+    metrics = CrawlMetrics()
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        events = asyncio.run(scraper.scrape_all_events(
+            concurrency=args.concurrency,
+            extractor=args.extractor,
+            shards=args.shards,
+            lb_probe=not args.no_lb_probe,
+            mirror_streams=args.mirror_streams,
+            metrics=metrics,
+        ))
+    wall = time.perf_counter() - started
+
+    # Shard processes report their spans back into `metrics`, so this
+    # covers sharded and single-process crawls alike.
+    samples = {
+        'live': metrics.spans['live_static'] + metrics.spans['live_browser'],
+        'embed': metrics.spans['embed_static'] + metrics.spans['embed_browser'],
+        'token': metrics.spans['token'],
+        'mirrors': metrics.spans['mirrors'],
+        'event': [e['total_ms'] for e in metrics.events],
+    }
+    print(json.dumps({
+        'events': len(events),
+        'streams': sum(1 for e in events if e.get('stream')),
+        'errors': sum(1 for e in events if e.get('error')),
+        'wall_s': round(wall, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': {
+            stage: {
+                'count': len(values),
+                'p50_ms': _round(percentile(values, 50)),
+                'p95_ms': _round(percentile(values, 95)),
+                'mean_ms': _round(statistics.fmean(values)) if values else None,
+            }
+            for stage, values in samples.items()
+        },
+    }))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Parent: fixture server + one child per size
+# ─────────────────────────────────────────────────────────────────────────────
+
+class FixtureThread:
+    """Runs a FixtureServer on its own event loop in a background thread."""
+
+    def __init__(self, server: FixtureServer):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        return asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def bench_size(size: int, args: argparse.Namespace) -> dict:
+    server = FixtureServer(size, args.latency, args.error_rate, args.js_iframe)
+    with FixtureThread(server) as base_url:
+        env = {**os.environ, **fixture_env(base_url)}
+        cmd = [sys.executable, os.path.abspath(__file__), '--child',
+               '--concurrency', str(args.concurrency), '--shards', str(args.shards),
+               '--extractor', args.extractor, '--mirror-streams', str(args.mirror_streams)]
+        if args.no_lb_probe:
+            cmd.append('--no-lb-probe')
+        proc = subprocess.run(cmd, cwd=CRAWLER_DIR, env=env, capture_output=True,
+                              text=True, encoding='utf-8')
+    if proc.returncode != 0:
+        raise RuntimeError(f'crawl of {size} events failed:\n{proc.stderr.strip()}')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['size'] = size
+    result['fixture_requests'] = server.requests
+    result['fixture_errors'] = server.errors
+    return result
+
+
+def _ms(value: float | None) -> str:
+    return '-' if value is None else f'{value:.1f}'
+
+
+def print_report(results: list[dict]) -> None:
+    print()
+    print(f"{'events':>7} {'wall s':>8} {'RSS MB':>7} {'ok':>6} {'err':>5}  "
+          + '  '.join(f'{stage + " p50/p95 ms":>22}' for stage in STAGES))
+    for r in results:
+        stages = '  '.join(
+            f"{_ms(r['stages'][s]['p50_ms']) + ' / ' + _ms(r['stages'][s]['p95_ms']):>22}"
+            for s in STAGES
+        )
+        print(f"{r['size']:>7} {r['wall_s']:>8.2f} {r['peak_rss_mb']:>7.1f} "
+              f"{r['streams']:>6} {r['errors']:>5}  {stages}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark the crawler against the offline fixture.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='event counts to crawl (default: 20 200 2000)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--shards', type=int, default=1,
+                        help='crawler shard processes (default 1)')
+    parser.add_argument('--extractor', choices=('auto', 'static', 'browser'), default='static',
+                        help="'static' (default) needs no Chromium; 'auto'/'browser' with --js-iframe "
+                             "exercise the browser path")
+    parser.add_argument('--latency', type=float, default=0.0, help='fixture mean response delay in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fixture fraction of 503 responses')
+    parser.add_argument('--js-iframe', action='store_true',
+                        help='fixture injects the player iframe from a script')
+    parser.add_argument('--no-lb-probe', action='store_true')
+    parser.add_argument('--mirror-streams', type=int, default=0,
+                        help='stream numbers per event tried as alternate streams (default 0: off)')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.child:
+        run_child(args)
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"Crawling {size} fixture events ...", flush=True)
+        results.append(bench_size(size, args))
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
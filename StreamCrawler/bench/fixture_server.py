@@ -0,0 +1,329 @@
+"""
+Offline stand-in for streamwest.cc, embedsporty.top and the strmd.top edges.
+===========================================================================
+Serves everything the crawler talks to from one local aiohttp app, so the
+crawler can be tested and benchmarked without touching the live sites:
+
+  GET  /live                          N .match-card-compact cards grouped in
+                                      sport sections, like the real page
+  GET  /watch/<id>/<slug>             event page with the player iframe
+                                      (inline, or injected by a script with
+                                      --js-iframe so only a browser finds it)
+  POST /fetch                         protobuf request -> `goat` header and
+                                      protobuf body advertising LB hosts;
+                                      404 for stream numbers beyond the
+                                      event's 1-3 mirrors
+  HEAD /<lb>/                         load-balancer liveness probe
+  GET  /<lb>/secure/.../playlist.m3u8 HLS master playlist with two variants
+  GET  /<lb>/secure/.../<v>/index.m3u8 live media playlist: a window of
+                                      SEGMENT_WINDOW segments that moves on
+                                      every SEGMENT_SECONDS
+  GET  /<lb>/secure/.../<v>/seg<n>.ts  a SEGMENT_BYTES MPEG-TS segment
+                                      (counted in `segment_requests`)
+  GET  /api/images/proxy/<id>.webp    card poster (a 960x540 PNG, 8 colours)
+
+Every response waits `latency` ms (+/- 50% jitter) and fails with a 503 at
+`error_rate`. Point the crawler at it with:
+
+  STREAMCRAWLER_BASE_URL=http://127.0.0.1:8800
+  STREAMCRAWLER_EMBED_API=http://127.0.0.1:8800/fetch
+  STREAMCRAWLER_LB_URL_TEMPLATE=http://127.0.0.1:8800/{lb}
+
+(fixture_env() returns exactly these.)
+
+    python bench/fixture_server.py --events 200 --latency 30 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import html
+import os
+import random
+import secrets
+import string
+import struct
+import sys
+import time
+import zlib
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proto import ProtoError, decode_message, encode_message  # noqa: E402
+
+SPORTS = ['Football', 'Basketball', 'Hockey', 'Tennis', 'Baseball', 'Fighting', 'Motorsport']
+TEAMS = ['Lions', 'Tigers', 'Bears', 'Wolves', 'Eagles', 'Sharks', 'Hawks', 'Bulls',
+         'Rangers', 'Rovers', 'United', 'City', 'Athletic', 'Wanderers', 'Comets', 'Giants']
+LB_HOSTS = ['lb3', 'lb5', 'lb7']
+SEGMENT_SECONDS = 6
+SEGMENT_WINDOW = 3
+SEGMENT_BYTES = 188 * 512   # MPEG-TS packets
+POSTER_SIZE = (960, 540)
+
+
+def solid_png(width: int, height: int, rgb: tuple[int, int, int]) -> bytes:
+    """Minimal single-colour RGB PNG, so the fixture needs no image library."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    row = b'\x00' + bytes(rgb) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+
+def make_events(count: int, seed: int = 1) -> list[dict]:
+    """Deterministic synthetic events, grouped by sport like /live."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        home, away = rng.sample(TEAMS, 2)
+        title = f'{home} vs {away} {i}'
+        slug = f'{home}-vs-{away}-{i}'.lower()
+        events.append({
+            'id': 90000 + i,
+            'sport': SPORTS[i % len(SPORTS)],
+            'title': title,
+            'slug': slug,
+            'embed_slug': f'{slug}-{rng.choice(["football", "basketball", "hockey"])}-{1300000 + i}',
+            'viewers': rng.randint(0, 5000),
+            'live': rng.random() < 0.8,
+            'mirrors': 1 + i % 3,   # stream numbers /fetch answers for
+        })
+    events.sort(key=lambda e: SPORTS.index(e['sport']))
+    return events
+
+
+class FixtureServer:
+    def __init__(self, events: int = 20, latency: float = 0.0, error_rate: float = 0.0,
+                 js_iframe: bool = False, seed: int = 1):
+        self.events = make_events(events, seed)
+        self.by_id = {str(e['id']): e for e in self.events}
+        self.by_embed_slug = {e['embed_slug']: e for e in self.events}
+        self.latency = latency / 1000
+        self.error_rate = error_rate
+        self.js_iframe = js_iframe
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.segment_requests = 0
+        self.base_url = None
+        self._runner = None
+        self._posters: dict[int, bytes] = {}
+
+    # ── behaviour knobs ─────────────────────────────────────────────────────
+
+    async def _delay_or_fail(self) -> web.Response | None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text='fixture: injected failure')
+        return None
+
+    def embed_url(self, event: dict) -> str:
+        return f'{self.base_url}/embed/echo/{event["embed_slug"]}/1'
+
+    # ── pages ───────────────────────────────────────────────────────────────
+
+    def _card_html(self, e: dict) -> str:
+        live = ('<span class="live-indicator"><span class="live-indicator-dot"></span>LIVE</span>'
+                if e['live'] else '')
+        title = html.escape(e['title'])
+        return f'''
+            <div class="match-card-compact" onclick="location.href='/watch/{e["id"]}/{e["slug"]}'">
+                <div class="match-poster-container">
+                    <img src="/api/images/proxy/{e["id"]}.webp" alt="{title}" class="match-poster-img">
+                    <div class="poster-overlay">{live}</div>
+                </div>
+                <div class="match-info-compact">
+                    <div class="match-title-compact">{title}</div>
+                    <div class="match-meta-compact">
+                        <span class="sport-tag-compact">{e["sport"]}</span>
+                        <span class="meta-divider">•</span>
+                        <span style="font-size: 0.7rem;">👁️ {e["viewers"]}</span>
+                    </div>
+                </div>
+            </div>'''
+
+    async def handle_live(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        if failed:
+            return failed
+        sections = []
+        for sport in SPORTS:
+            cards = [self._card_html(e) for e in self.events if e['sport'] == sport]
+            if not cards:
+                continue
+            sections.append(f'''
+    <section class="sport-section">
+        <div class="sport-header">
+            <h2 class="sport-name">{sport}</h2>
+            <span class="sport-count">({len(cards)} live)</span>
+        </div>
+        <div class="matches-grid-compact">{"".join(cards)}
+        </div>
+    </section>''')
+        body = f'''<!DOCTYPE html>
+<html><head><title>Live - fixture</title></head>
+<body><main class="main">
+<div class="page-header"><h1 class="page-title">LIVE NOW</h1></div>
+{"".join(sections)}
+</main></body></html>'''
+        return web.Response(text=body, content_type='text/html')
+
+    async def handle_watch(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        if failed:
+            return failed
+        event = self.by_id.get(request.match_info['id'])
+        if event is None:
+            return web.Response(status=404, text='no such event')
+        src = self.embed_url(event)
+        if self.js_iframe:
+            player = f'''<div id="player"></div>
+<script>setTimeout(() => {{
+    const f = document.createElement('iframe');
+    f.src = {src!r};
+    document.getElementById('player').appendChild(f);
+}}, 50);</script>'''
+        else:
+            player = f'<iframe src="{src}" allowfullscreen></iframe>'
+        body = f'''<!DOCTYPE html>
+<html><head><title>{html.escape(event["title"])}</title></head>
+<body><h1>{html.escape(event["title"])}</h1>{player}</body></html>'''
+        return web.Response(text=body, content_type='text/html')
+
+    async def handle_embed(self, request: web.Request) -> web.Response:
+        return web.Response(text='<html><body>player</body></html>', content_type='text/html')
+
+    async def handle_fetch(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        if failed:
+            return failed
+        try:
+            fields = decode_message(await request.read())
+            slug = fields[2][0].decode('utf-8')
+            stream_num = int(fields[3][0])
+        except (ProtoError, KeyError, IndexError, UnicodeDecodeError, ValueError):
+            return web.Response(status=400, text='bad protobuf request')
+        event = self.by_embed_slug.get(slug)
+        if event is not None and not 1 <= stream_num <= event['mirrors']:
+            return web.Response(status=404, text='no such stream')
+        goat = ''.join(self.rng.choices(string.ascii_letters, k=32))
+        payload = encode_message([
+            (1, secrets.token_bytes(64)),           # stands in for the obfuscated blob
+            (2, ' '.join(LB_HOSTS)),
+            (3, slug),
+        ])
+        return web.Response(body=payload, headers={'goat': goat},
+                            content_type='application/octet-stream')
+
+    async def handle_image(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        if failed:
+            return failed
+        event = self.by_id.get(request.match_info['id'])
+        if event is None:
+            return web.Response(status=404, text='no such poster')
+        colour = event['id'] % 8
+        if colour not in self._posters:
+            rgb = tuple(255 * ((colour >> bit) & 1) for bit in range(3))
+            self._posters[colour] = solid_png(*POSTER_SIZE, rgb)
+        return web.Response(body=self._posters[colour], content_type='image/png')
+
+    async def handle_lb_probe(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        return failed or web.Response(status=403)
+
+    async def handle_playlist(self, request: web.Request) -> web.Response:
+        failed = await self._delay_or_fail()
+        if failed:
+            return failed
+        tail = request.match_info['tail']
+        if tail.endswith('.ts'):
+            self.segment_requests += 1
+            packet = b'\x47' + bytes(187)
+            return web.Response(body=packet * (SEGMENT_BYTES // len(packet)), content_type='video/mp2t')
+        if tail.endswith('/index.m3u8'):
+            newest = int(time.time()) // SEGMENT_SECONDS
+            first = max(0, newest - SEGMENT_WINDOW + 1)
+            started = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(first * SEGMENT_SECONDS))
+            playlist = (f'#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}\n'
+                        f'#EXT-X-MEDIA-SEQUENCE:{first}\n#EXT-X-PROGRAM-DATE-TIME:{started}\n')
+            playlist += ''.join(f'#EXTINF:{SEGMENT_SECONDS}.0,\nseg{n}.ts\n' for n in range(first, newest + 1))
+        else:
+            playlist = ('#EXTM3U\n'
+                        '#EXT-X-STREAM-INF:BANDWIDTH=3000000,RESOLUTION=1280x720\nhi/index.m3u8\n'
+                        '#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlo/index.m3u8\n')
+        return web.Response(text=playlist, content_type='application/vnd.apple.mpegurl')
+
+    # ── lifecycle ───────────────────────────────────────────────────────────
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/live', self.handle_live)
+        app.router.add_get('/watch/{id}/{slug}', self.handle_watch)
+        app.router.add_get('/embed/{tail:.*}', self.handle_embed)
+        app.router.add_post('/fetch', self.handle_fetch)
+        app.router.add_get('/api/images/proxy/{id}.webp', self.handle_image)
+        app.router.add_route('HEAD', '/{lb:lb\\d+}/', self.handle_lb_probe)
+        app.router.add_get('/{lb:lb\\d+}/secure/{tail:.*}', self.handle_playlist)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def fixture_env(base_url: str) -> dict:
+    """Environment variables that point the crawler at a fixture server."""
+    return {
+        'STREAMCRAWLER_BASE_URL': base_url,
+        'STREAMCRAWLER_EMBED_API': f'{base_url}/fetch',
+        'STREAMCRAWLER_LB_URL_TEMPLATE': f'{base_url}/{{lb}}',
+    }
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = FixtureServer(args.events, args.latency, args.error_rate, args.js_iframe, args.seed)
+    base_url = await server.start(args.host, args.port)
+    print(f"Fixture serving {args.events} events on {base_url}")
+    for key, value in fixture_env(base_url).items():
+        print(f"  {key}={value}")
+    sys.stdout.flush()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Offline stand-in for the streaming sites.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800, help='0 picks a free port')
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='mean response delay in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 503 responses')
+    parser.add_argument('--js-iframe', action='store_true',
+                        help='inject the player iframe from a script (static parse cannot see it)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+/live card extraction engine
+============================
+Turns the /live page into event records in one pass over the document,
+both from plain HTML (BeautifulSoup, CardEngine.parse) and inside the
+browser (CARD_SCRIPT, see scraper._extract_live_cards):
+
+  - sport headings and cards are visited together, in document order, by
+    one query for "<heading>, <card>"; a card's sport is simply the last
+    heading seen before it, so no card walks its ancestors or siblings;
+  - each field is one precompiled selector query inside its card, which
+    stops at the first match (`viewers` at the first match that holds a
+    number and a viewer marker);
+  - results are compact column arrays ({field: [values]}), turned into
+    records once, in Python (CardEngine.rows).
+
+The selectors are declarative (CARD_CONFIG), can be overridden with a JSON
+file named by STREAMCRAWLER_CARD_CONFIG, and are compiled once at import.
+
+In the browser every extracted card is marked with `seen_attr`, so on a
+lazy-loaded or infinitely scrolled grid only the cards added by the last
+scroll are read again; rows are merged by href across scroll rounds.
+"""
+import json
+import os
+import re
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+CARD_CONFIG = {
+    'card': '.match-card-compact[onclick]',
+    'heading': 'h2, h3',
+    'href_attr': 'onclick',
+    'href_pattern': r"location\.href='([^']+)'",
+    # field -> selector list; the first matching element inside the card wins
+    'fields': {
+        'title': '.match-title-compact, [class*="title"], [class*="match-name"], h3, h4',
+        'thumbnail': 'img.match-poster-img, img[class*="poster"], img',
+        'live': '.live-indicator, [class*="live"], .badge-live',
+        'sport': '[class*="sport-badge"], [class*="sport-tag"], [class*="category"]',
+        'viewers': 'span',
+    },
+    # a `viewers` element only counts if its text has a number and one of these
+    'viewer_markers': ['👁️', '👀'],
+    'default_sport': 'Other',
+    'seen_attr': 'data-sc-seen',
+}
+
+COLUMNS = ('href', 'title', 'sport', 'thumbnail', 'is_live', 'viewer_count')
+
+_NUMBER_RE = re.compile(r'(\d+)')
+
+# Runs in the page: (config) -> {column: [values]} for the cards not yet
+# marked as seen. Text is read with textContent, which unlike innerText
+# does not force a layout per element.
+CARD_SCRIPT = '''(cfg) => {
+    const cols = {href: [], title: [], sport: [], thumbnail: [], is_live: [], viewer_count: []};
+    const hrefRe = new RegExp(cfg.href_pattern);
+    const names = Object.keys(cfg.fields);
+    const text = (el) => el.textContent.replace(/\\s+/g, ' ').trim();
+    let heading = null;
+    let lastCard = null;
+
+    for (const el of document.querySelectorAll(cfg.heading + ', ' + cfg.card)) {
+        if (!el.matches(cfg.card)) {
+            // a heading, unless it is part of the previous card (e.g. its h3 title)
+            if (!lastCard || !lastCard.contains(el)) heading = text(el);
+            continue;
+        }
+        lastCard = el;
+        if (el.hasAttribute(cfg.seen_attr)) continue;
+        el.setAttribute(cfg.seen_attr, '');
+        const m = (el.getAttribute(cfg.href_attr) || '').match(hrefRe);
+        if (!m) continue;
+
+        const found = {};
+        for (const name of names) {
+            if (name === 'viewers') {
+                found[name] = Array.from(el.querySelectorAll(cfg.fields[name])).find((n) => {
+                    const t = n.textContent;
+                    return /\\d/.test(t) && cfg.viewer_markers.some((mk) => t.includes(mk));
+                });
+            } else {
+                found[name] = el.querySelector(cfg.fields[name]);
+            }
+        }
+
+        const img = found.thumbnail;
+        const src = img ? img.getAttribute('src') : null;
+        const lazy = img ? (img.getAttribute('data-src') || img.getAttribute('data-lazy-src')) : null;
+        const viewers = found.viewers ? found.viewers.textContent.match(/(\\d+)/) : null;
+        cols.href.push(m[1]);
+        cols.title.push(found.title ? text(found.title)
+                                    : (el.textContent.trim().split(/\\s*\\n\\s*/)[0] || 'Unknown'));
+        cols.sport.push((found.sport && text(found.sport)) || heading || cfg.default_sport);
+        cols.thumbnail.push((src && !src.startsWith('data:') ? img.src : null)
+                            || (lazy ? new URL(lazy, document.baseURI).href : null));
+        cols.is_live.push(!!found.live && found.live.textContent.toLowerCase().includes('live'));
+        cols.viewer_count.push(viewers ? parseInt(viewers[1]) : 0);
+    }
+    return cols;
+}'''
+
+
+def load_config(path: str | None = None) -> dict:
+    """CARD_CONFIG, with the keys of the JSON file at `path` (if any) replacing its own."""
+    config = {**CARD_CONFIG, 'fields': dict(CARD_CONFIG['fields'])}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            override = json.load(f)
+        config.update({k: v for k, v in override.items() if k != 'fields'})
+        config['fields'].update(override.get('fields') or {})
+    return config
+
+
+def split_teams(title: str) -> list[str]:
+    """Split "A vs B" into [A, B] (case-insensitive); [] if there is no " vs "."""
+    parts = re.split(r' vs ', title, flags=re.IGNORECASE)
+    if len(parts) < 2:
+        return []
+    return [parts[0].strip(), ' vs '.join(parts[1:]).strip()]
+
+
+class CardEngine:
+    """A card config with its selectors compiled, for static and browser extraction."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.card_selector = config['card']
+        self.unseen_selector = f"{config['card']}:not([{config['seen_attr']}])"
+        self._walk = soupsieve.compile(f"{config['heading']}, {config['card']}")
+        self._card = soupsieve.compile(config['card'])
+        self._fields = [(name, soupsieve.compile(sel)) for name, sel in config['fields'].items()]
+        self._href_re = re.compile(config['href_pattern'])
+        self._markers = tuple(config['viewer_markers'])
+
+    def _is_viewers(self, text: str) -> bool:
+        return bool(_NUMBER_RE.search(text)) and any(m in text for m in self._markers)
+
+    def _card_fields(self, card) -> dict:
+        found = {}
+        for name, pattern in self._fields:
+            if name == 'viewers':
+                node = next((n for n in pattern.iselect(card) if self._is_viewers(n.get_text())), None)
+            else:
+                node = pattern.select_one(card)
+            if node is not None:
+                found[name] = node
+        return found
+
+    def parse(self, html: str, base_url: str) -> dict[str, list]:
+        """Static counterpart of CARD_SCRIPT: the /live HTML as column arrays."""
+        soup = BeautifulSoup(html, 'html.parser')
+        cols = {name: [] for name in COLUMNS}
+        heading = None
+        last_card = None
+        for el in self._walk.select(soup):
+            if not self._card.match(el):
+                if last_card is None or not any(p is last_card for p in el.parents):
+                    heading = el.get_text(strip=True)
+                continue
+            last_card = el
+            m = self._href_re.search(el.get(self.config['href_attr']) or '')
+            if not m:
+                continue
+            found = self._card_fields(el)
+
+            title_el = found.get('title')
+            img = found.get('thumbnail')
+            thumbnail = None
+            if img is not None:
+                src = img.get('src')
+                if not src or src.startswith('data:'):
+                    src = img.get('data-src') or img.get('data-lazy-src')
+                thumbnail = urljoin(base_url + '/', src) if src else None
+            live_el = found.get('live')
+            sport_el = found.get('sport')
+            viewers = _NUMBER_RE.search(found['viewers'].get_text()) if 'viewers' in found else None
+
+            cols['href'].append(m.group(1))
+            cols['title'].append(title_el.get_text(' ', strip=True) if title_el is not None
+                                 else next(iter(el.stripped_strings), 'Unknown'))
+            cols['sport'].append((sport_el.get_text(strip=True) if sport_el is not None else None)
+                                 or heading or self.config['default_sport'])
+            cols['thumbnail'].append(thumbnail)
+            cols['is_live'].append(live_el is not None and 'live' in live_el.get_text().lower())
+            cols['viewer_count'].append(int(viewers.group(1)) if viewers else 0)
+        return cols
+
+    @staticmethod
+    def rows(columns: dict[str, list], into: dict[str, dict] | None = None) -> dict[str, dict]:
+        """
+        Event records (href, title, sport, teams, thumbnail, is_live,
+        viewer_count) keyed by href, in card order, from column arrays;
+        hrefs already in `into` (e.g. from an earlier scroll round) are kept.
+        """
+        rows = {} if into is None else into
+        for values in zip(*(columns[name] for name in COLUMNS)):
+            href, title, sport, thumbnail, is_live, viewer_count = values
+            if href and href not in rows:
+                rows[href] = {
+                    'href': href,
+                    'title': title,
+                    'sport': sport,
+                    'teams': split_teams(title),
+                    'thumbnail': thumbnail,
+                    'is_live': is_live,
+                    'viewer_count': viewer_count,
+                }
+        return rows
+
+
+CARD_ENGINE = CardEngine(load_config(os.environ.get('STREAMCRAWLER_CARD_CONFIG')))
@@ -0,0 +1,102 @@
+"""
+Incremental refreshes.
+======================
+Between two refreshes most of the /live grid is unchanged apart from each
+card's viewer_count and is_live. plan_refresh() compares the new card list
+with the previous streams.json and decides per card:
+
+  - reuse      same href and title as a previous record that resolved fine
+               (and whose stream token is younger than `max_age`): copy the
+               record, patching only VOLATILE_FIELDS and dropping its `hls`
+               probe result; no page or token work
+  - resolve    new href, changed title, previously failed, or stale token
+
+Vanished hrefs are dropped. The card set is fingerprinted by href + title
+in card order, so a consumer can tell at a glance whether anything but the
+volatile fields changed. The resulting diff:
+
+  {"fingerprint": "...", "previous_fingerprint": "...", "structural_change": bool,
+   "added": [href], "removed": [href], "refreshed": [href],
+   "updated": [{"href": ..., "viewer_count": ..., "is_live": ...}]}
+"""
+import hashlib
+import time
+
+DEFAULT_DIFF_FILE = 'streams.diff.json'
+DEFAULT_MAX_AGE = 10 * 60  # seconds a resolved stream URL may be carried over
+
+VOLATILE_FIELDS = ('viewer_count', 'is_live')
+
+
+def card_fingerprint(events: list[dict]) -> str:
+    """Hash of (href, title) of every card, in card order."""
+    digest = hashlib.sha1()
+    for e in events:
+        digest.update(f"{e.get('href')}\t{e.get('title')}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _reusable(previous: dict, event: dict, now: float, max_age: float, lazy_tokens: bool) -> bool:
+    if previous.get('title') != event.get('title'):
+        return False
+    if previous.get('error') or not previous.get('embed_url'):
+        return False
+    if lazy_tokens:
+        return previous.get('stream') is None
+    return bool(previous.get('stream')) and now - previous.get('resolved_at', 0) < max_age
+
+
+def plan_refresh(previous: list[dict], events: list[dict], max_age: float = DEFAULT_MAX_AGE,
+                 lazy_tokens: bool = False, reuse: bool = True, now: float | None = None
+                 ) -> tuple[dict[int, dict], list[int], dict]:
+    """
+    Returns (reused records by card index, card indexes to resolve, diff).
+    Reused records are the previous ones with VOLATILE_FIELDS taken from the
+    new card; the diff lists what the server needs to push to clients.
+    With reuse=False every card is resolved (a full crawl) but the diff is
+    still computed against `previous`.
+    """
+    now = time.time() if now is None else now
+    by_href = {p['href']: p for p in previous if isinstance(p, dict) and p.get('href')}
+    current = {e['href'] for e in events}
+
+    reused: dict[int, dict] = {}
+    to_resolve: list[int] = []
+    added, refreshed, updated = [], [], []
+    for index, event in enumerate(events):
+        href = event['href']
+        prev = by_href.get(href)
+        if reuse and prev is not None and _reusable(prev, event, now, max_age, lazy_tokens):
+            record = {**prev, **{f: event.get(f) for f in VOLATILE_FIELDS}}
+            # the last crawl's liveness is not current; a probe of this crawl re-adds it
+            record.pop('hls', None)
+            if event.get('thumbnail') != prev.get('thumbnail_source', prev.get('thumbnail')):
+                # new poster: drop the cached local copy (thumb_cache.py)
+                record['thumbnail'] = event.get('thumbnail')
+                record.pop('thumbnail_source', None)
+            reused[index] = record
+            if any(prev.get(f) != record[f] for f in VOLATILE_FIELDS):
+                updated.append({'href': href, **{f: record[f] for f in VOLATILE_FIELDS}})
+            continue
+        to_resolve.append(index)
+        (added if prev is None else refreshed).append(href)
+
+    fingerprint = card_fingerprint(events)
+    previous_fingerprint = card_fingerprint([p for p in previous if isinstance(p, dict)])
+    diff = {
+        'fingerprint': fingerprint,
+        'previous_fingerprint': previous_fingerprint,
+        'structural_change': fingerprint != previous_fingerprint,
+        'added': added,
+        'removed': [href for href in by_href if href not in current],
+        'refreshed': refreshed,
+        'updated': updated,
+    }
+    return reused, to_resolve, diff
+
+
+def diff_summary(diff: dict) -> str:
+    """One-line human readable summary for the crawler log."""
+    return (f"{len(diff['added'])} added, {len(diff['removed'])} removed, "
+            f"{len(diff['updated'])} updated, {len(diff['refreshed'])} re-resolved"
+            + ('' if diff['structural_change'] else ' (card set unchanged)'))
@@ -0,0 +1,148 @@
+"""
+StreamCrawler command line
+==========================
+One entry point for the crawler's jobs; every subcommand imports only the
+modules it needs, so a quick job does not pay for the crawler's:
+
+    python cli.py crawl [scraper.py options]       full crawl / --daemon (scraper.py)
+    python cli.py resolve <embed_url> [--expired]  one embed URL -> fresh m3u8 as JSON (resolver.py)
+    python cli.py list [--sport S] [--live] [--playable] [--json]
+                                                   events of the last crawl (streams.json)
+
+`list` needs nothing beyond the standard library. `resolve` answers a
+cached token without importing aiohttp, so the server can call it on every
+click; only a cache miss imports the /fetch client. Playwright is imported
+by `crawl` alone, and only when a page actually needs a browser.
+
+--timing (or STREAMCRAWLER_TIMING=1) reports on stderr how long the command
+spent starting up, importing its modules and running; for a per-module
+breakdown use `python -X importtime cli.py ...`.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
+
+import argparse
+import json
+import os
+from contextlib import contextmanager
+
+
+class Timing:
+    """Start-up, import and run time of one command."""
+
+    def __init__(self, started: float = _STARTED):
+        self.started = started
+        self.imports_ms = 0.0
+        self.command_started: float | None = None
+
+    @contextmanager
+    def importing(self):
+        """Count the time spent in the enclosed (lazy) imports."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports_ms += (time.perf_counter() - started) * 1000
+
+    def start(self) -> None:
+        self.command_started = time.perf_counter()
+
+    def report(self, command: str) -> str:
+        now = time.perf_counter()
+        command_started = self.command_started or now
+        startup_ms = (command_started - self.started) * 1000
+        run_ms = (now - command_started) * 1000 - self.imports_ms
+        return (f"[timing] {command}: startup {startup_ms:.1f} ms, "
+                f"imports {self.imports_ms:.1f} ms, run {run_ms:.1f} ms, "
+                f"total {(now - self.started) * 1000:.1f} ms")
+
+
+def cmd_crawl(args: argparse.Namespace, rest: list[str], timing: Timing) -> int:
+    with timing.importing():
+        import scraper
+    return scraper.main(rest)
+
+
+def cmd_resolve(args: argparse.Namespace, rest: list[str], timing: Timing) -> int:
+    with timing.importing():
+        import resolver
+    return resolver.main(rest, importing=timing.importing)
+
+
+def _matches(event: dict, args: argparse.Namespace, is_playable) -> bool:
+    if args.sport and (event.get('sport') or '').lower() != args.sport.lower():
+        return False
+    if args.live and not event.get('is_live'):
+        return False
+    return not args.playable or is_playable(event)
+
+
+def cmd_list(args: argparse.Namespace, rest: list[str], timing: Timing) -> int:
+    with timing.importing():
+        from streams import is_playable, load_streams
+    events = [e for e in load_streams(args.file) if _matches(e, args, is_playable)]
+    if args.json:
+        print(json.dumps(events, ensure_ascii=False))
+        return 0
+    for e in events:
+        status = 'OK  ' if is_playable(e) else 'FAIL'
+        live_tag = 'LIVE    ' if e.get('is_live') else 'Upcoming'
+        teams_str = ' vs '.join(e.get('teams') or [e.get('title') or '?'])
+        print(f"{status} {live_tag} [{e.get('sport', 'Other')}] {teams_str} "
+              f"({e.get('viewer_count', 0)} viewers)")
+    print(f"{len(events)} events", file=sys.stderr)
+    return 0
+
+
+COMMANDS = {
+    'crawl': cmd_crawl,
+    'resolve': cmd_resolve,
+    'list': cmd_list,
+}
+
+
+def parse_args(argv: list[str] | None = None) -> tuple[argparse.Namespace, list[str]]:
+    """The parsed top-level options plus the arguments passed on to `crawl` / `resolve`."""
+    parser = argparse.ArgumentParser(description='StreamCrawler: crawl, resolve and list live sports streams.')
+    parser.add_argument(
+        '--timing', action='store_true',
+        default=os.environ.get('STREAMCRAWLER_TIMING') == '1',
+        help='report start-up, import and run time on stderr (env STREAMCRAWLER_TIMING=1)',
+    )
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+    # crawl and resolve hand their arguments (including --help) to scraper.py / resolver.py
+    commands.add_parser('crawl', add_help=False,
+                        help='crawl /live and write streams.json (options: scraper.py --help)')
+    commands.add_parser('resolve', add_help=False,
+                        help='resolve one embed URL to a fresh m3u8 URL (options: resolver.py --help)')
+    listing = commands.add_parser('list', help='list the events of the last crawl')
+    listing.add_argument('--file', default='streams.json', help='crawl output to read (default streams.json)')
+    listing.add_argument('--sport', help='only this sport (case-insensitive)')
+    listing.add_argument('--live', action='store_true', help='only events that are live now')
+    listing.add_argument('--playable', action='store_true',
+                         help='only events with a stream or an embed URL to resolve one from')
+    listing.add_argument('--json', action='store_true', help='print the matching events as a JSON array')
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command == 'list' and rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    return args, rest
+
+
+def main(argv: list[str] | None = None) -> int:
+    args, rest = parse_args(argv)
+    timing = Timing()
+    timing.start()
+    try:
+        return COMMANDS[args.command](args, rest, timing)
+    finally:
+        if args.timing:
+            print(timing.report(args.command), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Crawler daemon
+==============
+Long-running mode of scraper.py (`python scraper.py --daemon`). Instead of
+paying Python startup, the Playwright import and a Chromium launch on every
+refresh, one process keeps the browser and HTTP pool warm, re-crawls on a
+schedule and serves the latest event list over a local HTTP endpoint
+(TCP on 127.0.0.1 or a Unix socket):
+
+  GET  /events               current event list (same JSON as streams.json)
+  GET  /events?refresh=true  wait for a fresh crawl, then return it
+  POST /refresh              same as ?refresh=true
+  GET  /status               last crawl time / duration / error, crawl count
+  GET  /metrics              metrics of the latest crawl, Prometheus text format
+  GET  /diff                 added/removed/updated cards of the latest crawl
+  GET  /resolve?embed_url=U  fresh m3u8 for one embed URL (see resolver.py);
+                             add &expired=1 when the last token stopped working
+  GET  /hls/...              HLS relay for local viewers, with --relay
+                             (see relay.py; /hls/stats for viewers and hits)
+
+Refreshes are single-flight: while a crawl is running, every caller that
+asks for a refresh waits for that same crawl instead of starting another.
+Tokens handed out by /resolve are refreshed in the background shortly
+before they expire, so a viewer's next request is answered from cache.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable
+
+from aiohttp import web
+
+from resolver import REFRESH_MARGIN
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8790
+DEFAULT_INTERVAL = 300  # seconds between scheduled crawls
+
+
+class CrawlerDaemon:
+    def __init__(self,
+                 crawl: Callable[[], Awaitable[list[dict]]],
+                 interval: float = DEFAULT_INTERVAL,
+                 save: Callable[[list[dict]], None] | None = None,
+                 initial: list[dict] | None = None,
+                 resolver=None,
+                 metrics=None,
+                 relay=None):
+        self.crawl = crawl
+        self.resolver = resolver
+        self.metrics = metrics
+        self.relay = relay
+        self.interval = interval
+        self.save = save
+        self.events: list[dict] = initial or []
+        self.updated_at: float | None = None
+        self.last_duration: float | None = None
+        self.last_error: str | None = None
+        self.crawls = 0
+        self.diff: dict | None = None
+        self._inflight: asyncio.Task | None = None
+
+    async def refresh(self) -> list[dict]:
+        """Run a crawl, or join the one already running (single-flight)."""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._run())
+            self._inflight.add_done_callback(self._clear_inflight)
+        # shield: a caller that disconnects must not cancel the shared crawl
+        return await asyncio.shield(self._inflight)
+
+    def set_diff(self, diff: dict) -> None:
+        """on_diff callback of the crawl: remember what the latest crawl changed."""
+        self.diff = diff
+
+    def _clear_inflight(self, task: asyncio.Task):
+        if self._inflight is task:
+            self._inflight = None
+
+    async def _run(self) -> list[dict]:
+        started = time.perf_counter()
+        try:
+            events = await self.crawl()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[Daemon] crawl failed: {e}")
+            raise
+        self.events = events
+        self.updated_at = time.time()
+        self.last_duration = time.perf_counter() - started
+        self.last_error = None
+        self.crawls += 1
+        if self.save is not None:
+            self.save(events)
+        print(f"[Daemon] crawl #{self.crawls}: {len(events)} events in {self.last_duration:.1f}s")
+        return events
+
+    async def _schedule(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # already logged; keep serving the previous list
+            await asyncio.sleep(self.interval)
+
+    async def _refresh_tokens(self):
+        while True:
+            await asyncio.sleep(REFRESH_MARGIN)
+            try:
+                refreshed = await self.resolver.refresh_expiring()
+                if refreshed:
+                    print(f"[Daemon] refreshed {refreshed} expiring tokens")
+                self.resolver.cache.save()
+            except Exception as e:
+                print(f"[Daemon] token refresh failed: {e}")
+
+    # ── HTTP handlers ────────────────────────────────────────────────────────
+
+    def _events_response(self, events: list[dict]) -> web.Response:
+        headers = {}
+        if self.updated_at is not None:
+            headers['X-Crawled-At'] = str(int(self.updated_at))
+        return web.json_response(
+            events, headers=headers,
+            dumps=lambda obj: json.dumps(obj, ensure_ascii=False),
+        )
+
+    async def handle_events(self, request: web.Request) -> web.Response:
+        if request.query.get('refresh') == 'true':
+            return await self.handle_refresh(request)
+        return self._events_response(self.events)
+
+    async def handle_refresh(self, request: web.Request) -> web.Response:
+        try:
+            events = await self.refresh()
+        except Exception as e:
+            return web.json_response({'error': str(e)}, status=502)
+        return self._events_response(events)
+
+    async def handle_resolve(self, request: web.Request) -> web.Response:
+        if self.resolver is None:
+            return web.json_response({'error': 'resolver not enabled'}, status=404)
+        embed_url = request.query.get('embed_url')
+        if not embed_url:
+            return web.json_response({'error': 'embed_url is required'}, status=400)
+        if request.query.get('expired') in ('1', 'true'):
+            self.resolver.report_expired(embed_url)
+        result = await self.resolver.resolve(embed_url)
+        return web.json_response(result, status=200 if result.get('m3u8') else 502)
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'events': len(self.events),
+            'crawls': self.crawls,
+            'crawling': self._inflight is not None,
+            'updated_at': self.updated_at,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error,
+            'interval': self.interval,
+            'relay_viewers': self.relay.stats()['viewers'] if self.relay is not None else None,
+        })
+
+    async def handle_diff(self, request: web.Request) -> web.Response:
+        if self.diff is None:
+            return web.json_response({'error': 'no crawl has finished yet'}, status=404)
+        return web.json_response(self.diff)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        if self.metrics is None and self.relay is None:
+            return web.Response(status=404, text='metrics not enabled\n')
+        text = self.metrics.to_prometheus() if self.metrics is not None else ''
+        if self.relay is not None:
+            text += self.relay.to_prometheus()
+        return web.Response(text=text, content_type='text/plain', charset='utf-8')
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/events', self.handle_events)
+        app.router.add_post('/refresh', self.handle_refresh)
+        app.router.add_get('/status', self.handle_status)
+        app.router.add_get('/resolve', self.handle_resolve)
+        app.router.add_get('/metrics', self.handle_metrics)
+        app.router.add_get('/diff', self.handle_diff)
+        if self.relay is not None:
+            self.relay.add_routes(app)
+        return app
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    socket_path: str | None = None) -> None:
+        """Serve until cancelled, crawling every `interval` seconds."""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            site = web.UnixSite(runner, socket_path)
+            where = f"unix:{socket_path}"
+        else:
+            site = web.TCPSite(runner, host, port)
+            where = f"http://{host}:{port}"
+        await site.start()
+        print(f"[Daemon] serving on {where}, refreshing every {self.interval:g}s")
+
+        tasks = [asyncio.create_task(self._schedule())]
+        if self.resolver is not None:
+            tasks.append(asyncio.create_task(self._refresh_tokens()))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.resolver is not None:
+                self.resolver.cache.save()
+            await runner.cleanup()
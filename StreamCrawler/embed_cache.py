@@ -0,0 +1,96 @@
+"""
+On-disk cache of event href -> embed URL.
+=========================================
+The /watch/<id>/<slug> page of a match always points at the same
+embedsporty.top/embed/... URL for the life of the match, so once an event
+page has been opened there is no need to open it again on the next refresh.
+
+Entries expire after `ttl` seconds (matches end, slugs get reused) and the
+cache keeps at most `max_entries` hrefs, evicting the least recently used
+ones first. The file is a small JSON object written atomically; with `path=None` the
+cache lives in memory only (used by crawl shard processes).
+"""
+import json
+import time
+
+from atomic import write_json_atomic
+
+DEFAULT_TTL = 6 * 3600        # seconds an href -> embed mapping is trusted
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class EmbedCache:
+    def __init__(self, path: str | None, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, dict] = {}
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        """Read the cache file; a missing or corrupt file starts an empty cache."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self._entries = {
+                href: entry for href, entry in data.items()
+                if isinstance(entry, dict) and entry.get('embed_url')
+            }
+
+    def get(self, href: str) -> str | None:
+        """Return the cached embed URL for `href`, counting a hit or a miss."""
+        entry = self._entries.get(href)
+        now = time.time()
+        if entry is None or now - entry.get('stored_at', 0) > self.ttl:
+            if entry is not None:
+                del self._entries[href]
+                self._dirty = True
+            self.misses += 1
+            return None
+        entry['last_used'] = now
+        self._dirty = True
+        self.hits += 1
+        return entry['embed_url']
+
+    def put(self, href: str, embed_url: str) -> None:
+        now = time.time()
+        self._entries[href] = {'embed_url': embed_url, 'stored_at': now, 'last_used': now}
+        self._dirty = True
+
+    def discard(self, href: str) -> None:
+        """Forget `href`, e.g. after its cached embed URL stopped working."""
+        if self._entries.pop(href, None) is not None:
+            self._dirty = True
+
+    def _evict(self) -> None:
+        now = time.time()
+        for href in [h for h, e in self._entries.items() if now - e.get('stored_at', 0) > self.ttl]:
+            del self._entries[href]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            by_age = sorted(self._entries, key=lambda h: self._entries[h].get('last_used', 0))
+            for href in by_age[:overflow]:
+                del self._entries[href]
+
+    def save(self) -> None:
+        """Evict expired / excess entries and write the file atomically."""
+        if not self._dirty or not self.path:
+            return
+        self._evict()
+        write_json_atomic(self.path, self._entries, ensure_ascii=False)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self)} entries"
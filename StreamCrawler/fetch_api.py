@@ -0,0 +1,173 @@
+"""
+embedsporty.top /fetch client (pure HTTP, no browser)
+=====================================================
+Turns an embed URL like
+    https://embedsporty.top/embed/echo/some-match-slug-12345/1
+into a playable m3u8 URL. The /fetch endpoint takes a small protobuf body
+(server, slug, stream number) and answers with the security token in the
+`goat` response header and, in its protobuf body (see proto.py), possibly
+the load-balancer hosts that can serve the stream. With an LbSelector the
+fastest of those edges is picked (see lb_selector.py); with a HostGovernor
+the call is kept within embedsporty.top's adaptive concurrency limit and
+retried on 429 / 5xx / timeouts (see governor.py).
+
+get_stream_url() is the blocking single-shot helper; crawls use
+get_stream_url_async() over one shared create_http_session() pool.
+"""
+import asyncio
+import os
+
+import aiohttp
+
+from governor import CircuitOpenError, HostGovernor
+from lb_selector import FALLBACK_LB, LB_URL_TEMPLATE, LbSelector
+from proto import ProtoError, build_fetch_request, parse_embed_url, parse_fetch_response
+
+# Overridable so the client can be pointed at the offline stand-in (bench/)
+EMBED_API = os.environ.get('STREAMCRAWLER_EMBED_API', 'https://embedsporty.top/fetch')
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
+)
+
+# Shared HTTP connection pool for the token calls
+HTTP_LIMIT = 32           # open connections in total
+HTTP_LIMIT_PER_HOST = 8   # open connections to a single host
+HTTP_TIMEOUT = 15         # seconds per request
+HTTP_KEEPALIVE = 30       # seconds an idle connection is kept for reuse
+
+
+def build_fetch_body(server: str, slug: str, stream_num: str) -> bytes:
+    """Build the protobuf request body for the /fetch endpoint."""
+    return build_fetch_request(server, slug, stream_num)
+
+
+def _fetch_headers(embed_url: str) -> dict:
+    """Request headers the /fetch endpoint expects from the embed player."""
+    return {
+        'User-Agent': USER_AGENT,
+        'Content-Type': 'application/octet-stream',
+        'Referer': embed_url,
+        'Origin': 'https://embedsporty.top',
+    }
+
+
+def advertised_lb_hosts(content: bytes) -> list[str]:
+    """Load-balancer hosts named in a /fetch response body ([] if none / not protobuf)."""
+    try:
+        return parse_fetch_response(content)['lb_hosts']
+    except ProtoError:
+        return []
+
+
+def build_m3u8_url(lb: str, goat_token: str, server: str, slug: str, stream_num: str) -> str:
+    return (
+        f"{LB_URL_TEMPLATE.format(lb=lb)}/secure/{goat_token}"
+        f"/{server}/stream/{slug}/{stream_num}/playlist.m3u8"
+    )
+
+
+def _stream_result(server: str, slug: str, stream_num: str,
+                   goat_token: str | None, lb_hosts: list[str], lb: str | None = None) -> dict:
+    """
+    Build the m3u8 result from a /fetch response. `lb` is the chosen edge;
+    by default the first advertised one, else FALLBACK_LB.
+    """
+    if not goat_token:
+        return {'error': 'No goat header in response'}
+
+    lb_server = lb or (lb_hosts[0] if lb_hosts else FALLBACK_LB)
+    return {
+        'goat': goat_token,
+        'lb': lb_server,
+        'lb_hosts': lb_hosts,
+        'm3u8': build_m3u8_url(lb_server, goat_token, server, slug, stream_num),
+    }
+
+
+def get_stream_url(embed_url: str) -> dict:
+    """
+    Call the embedsporty.top /fetch endpoint and return the m3u8 URL.
+    Returns a dict: { 'goat': ..., 'lb': ..., 'm3u8': ... } or empty dict on failure.
+    """
+    import requests  # only this blocking helper needs it
+
+    parsed = parse_embed_url(embed_url)
+    if not parsed:
+        return {}
+
+    server, slug, stream_num = parsed
+    body = build_fetch_body(server, slug, stream_num)
+
+    try:
+        resp = requests.post(EMBED_API, data=body, headers=_fetch_headers(embed_url),
+                             timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        return {'error': str(e)}
+
+    return _stream_result(server, slug, stream_num, resp.headers.get('goat'),
+                          advertised_lb_hosts(resp.content))
+
+
+def create_http_session(limit: int = HTTP_LIMIT,
+                        limit_per_host: int = HTTP_LIMIT_PER_HOST,
+                        timeout: float = HTTP_TIMEOUT,
+                        trace_configs: list[aiohttp.TraceConfig] | None = None) -> aiohttp.ClientSession:
+    """
+    Create the shared aiohttp session used for all token calls of a crawl.
+    Connections are kept alive and reused across events; `limit` caps the
+    pool size, `limit_per_host` the connections to any single host, and
+    `timeout` applies to each request. `trace_configs` hook request tracing
+    in (see CrawlMetrics.trace_config).
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=HTTP_KEEPALIVE,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout, connect=min(timeout, 5)),
+        trace_configs=trace_configs,
+    )
+
+
+async def get_stream_url_async(session: aiohttp.ClientSession, embed_url: str,
+                               selector: LbSelector | None = None,
+                               governor: HostGovernor | None = None) -> dict:
+    """
+    Async variant of get_stream_url() that goes through the shared `session`
+    (see create_http_session) instead of opening a new connection per call.
+    With a `selector`, the lowest-latency edge among the advertised hosts
+    is used instead of the first advertised one; without advertised hosts
+    the stream stays on FALLBACK_LB.
+    With a `governor`, the /fetch call waits for a slot under the host's
+    concurrency limit and is retried on back-off failures.
+    """
+    parsed = parse_embed_url(embed_url)
+    if not parsed:
+        return {}
+
+    server, slug, stream_num = parsed
+    body = build_fetch_body(server, slug, stream_num)
+
+    async def fetch() -> tuple[bytes, str | None]:
+        async with session.post(EMBED_API, data=body, headers=_fetch_headers(embed_url)) as resp:
+            resp.raise_for_status()
+            return await resp.read(), resp.headers.get('goat')
+
+    try:
+        if governor is not None:
+            content, goat_token = await governor.call(EMBED_API, fetch)
+        else:
+            content, goat_token = await fetch()
+    except asyncio.TimeoutError:
+        return {'error': f'Timed out calling {EMBED_API}'}
+    except (aiohttp.ClientError, CircuitOpenError) as e:
+        return {'error': str(e)}
+
+    lb_hosts = advertised_lb_hosts(content)
+    lb = await selector.pick(lb_hosts) if selector is not None and goat_token and lb_hosts else None
+    return _stream_result(server, slug, stream_num, goat_token, lb_hosts, lb)
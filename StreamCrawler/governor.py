@@ -0,0 +1,252 @@
+"""
+Per-host adaptive concurrency
+=============================
+A parallel crawl hits streamwest.cc and embedsporty.top/fetch from many
+workers at once. HostGovernor sits in front of every request to those hosts
+and keeps each one at a concurrency it is currently willing to serve:
+
+  - AIMD limit: every request that answers within `slow_after` seconds
+    raises the host's in-flight limit by 1/limit (about +1 per round of
+    requests, up to `max_limit`); a 429, a 5xx, a timeout or a refused
+    connection halves it (at most once per `cooldown` seconds, down to
+    `min_limit`).
+  - retries: such failures are retried up to `retries` times after a
+    jittered exponential delay ("full jitter": uniform in 0..base*2^n,
+    capped at `max_delay`); a 429 with a Retry-After header waits that long.
+    Each retry is also reported to `on_retry` (the crawl metrics count it
+    against the stage that made the request).
+  - circuit breaker: after `failure_threshold` consecutive failures the
+    host's circuit opens and requests fail immediately with CircuitOpenError
+    for `open_for` seconds; then a single trial request is let through,
+    closing the circuit on success and reopening it on failure.
+
+Other errors (404, bad payloads, ...) are passed through untouched: they
+say nothing about how loaded the host is.
+
+    governor = HostGovernor()
+    html = await governor.call(url, lambda: fetch(url))
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+
+T = TypeVar('T')
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 8           # fetch_api.HTTP_LIMIT_PER_HOST caps the pool anyway
+DEFAULT_SLOW_AFTER = 3.0        # seconds; slower answers do not raise the limit
+DEFAULT_COOLDOWN = 1.0          # seconds between two decreases of one host's limit
+DEFAULT_RETRIES = 2
+DEFAULT_BASE_DELAY = 0.5        # seconds, first retry waits up to this long
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_FAILURE_THRESHOLD = 5   # consecutive failures that open the circuit
+DEFAULT_OPEN_FOR = 30.0         # seconds a circuit stays open
+
+BACKOFF_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} circuit open, retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or url
+
+
+def should_back_off(exc: BaseException) -> bool:
+    """True for failures that mean "slow down": 429/5xx, timeouts, connection errors."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in BACKOFF_STATUSES
+    return isinstance(exc, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """Seconds from the Retry-After header of a 429, if it is given in seconds."""
+    if isinstance(exc, aiohttp.ClientResponseError) and exc.status == 429 and exc.headers:
+        try:
+            return max(0.0, float(exc.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+    return None
+
+
+class HostState:
+    """Limit, in-flight count and circuit of one host."""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.inflight = 0
+        self.cond = asyncio.Condition()
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.trial = False              # a half-open trial request is in flight
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.backoffs = 0
+        self.circuit_opens = 0
+        self.rejected = 0
+        self.peak_limit = limit
+
+
+class HostGovernor:
+    def __init__(self, initial_limit: int = DEFAULT_INITIAL_LIMIT,
+                 min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT,
+                 slow_after: float = DEFAULT_SLOW_AFTER,
+                 cooldown: float = DEFAULT_COOLDOWN,
+                 retries: int = DEFAULT_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 open_for: float = DEFAULT_OPEN_FOR,
+                 on_retry: Callable[[], None] | None = None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.initial_limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.slow_after = slow_after
+        self.cooldown = cooldown
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_for = open_for
+        self.on_retry = on_retry
+        self._hosts: dict[str, HostState] = {}
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(float(self.initial_limit))
+        return state
+
+    # ── circuit ─────────────────────────────────────────────────────────────
+
+    def _check_circuit(self, host: str, state: HostState) -> bool:
+        """Raise CircuitOpenError if the host is off limits; True for a half-open trial."""
+        if state.opened_at is None:
+            return False
+        remaining = state.opened_at + self.open_for - time.monotonic()
+        if remaining > 0 or state.trial:
+            state.rejected += 1
+            raise CircuitOpenError(host, max(remaining, 0.0))
+        state.trial = True
+        return True
+
+    # ── AIMD ────────────────────────────────────────────────────────────────
+
+    async def _acquire(self, state: HostState) -> None:
+        async with state.cond:
+            await state.cond.wait_for(lambda: state.inflight < int(state.limit))
+            state.inflight += 1
+
+    async def _release(self, state: HostState) -> None:
+        async with state.cond:
+            state.inflight -= 1
+            state.cond.notify_all()
+
+    def _on_success(self, state: HostState, seconds: float) -> None:
+        state.consecutive_failures = 0
+        state.opened_at = None
+        if seconds <= self.slow_after and state.limit < self.max_limit:
+            state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+            state.peak_limit = max(state.peak_limit, state.limit)
+
+    def _on_backoff(self, state: HostState) -> None:
+        state.backoffs += 1
+        state.consecutive_failures += 1
+        now = time.monotonic()
+        if now - state.last_decrease >= self.cooldown:
+            state.limit = max(self.min_limit, state.limit / 2)
+            state.last_decrease = now
+        if state.opened_at is not None or state.consecutive_failures >= self.failure_threshold:
+            if state.opened_at is None or state.trial:
+                state.circuit_opens += 1
+            state.opened_at = now
+
+    def _delay(self, attempt: int, exc: BaseException) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # ── requests ────────────────────────────────────────────────────────────
+
+    async def call(self, url: str, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `request()` (one HTTP request to `url`'s host) within the host's
+        limit, retrying back-off failures. Raises the last error once the
+        retries are used up, or CircuitOpenError if the circuit is open.
+        """
+        host = host_of(url)
+        state = self._state(host)
+        attempt = 0
+        while True:
+            trial = self._check_circuit(host, state)
+            await self._acquire(state)
+            state.requests += 1
+            started = time.monotonic()
+            try:
+                result = await request()
+            except Exception as exc:
+                if not should_back_off(exc):
+                    raise
+                self._on_backoff(state)
+                if state.opened_at is not None or attempt >= self.retries:
+                    raise
+                error = exc
+            else:
+                self._on_success(state, time.monotonic() - started)
+                return result
+            finally:
+                if trial:
+                    state.trial = False
+                await self._release(state)
+            state.retries += 1
+            if self.on_retry is not None:
+                self.on_retry()
+            await asyncio.sleep(self._delay(attempt, error))
+            attempt += 1
+
+    # ── reporting ───────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Per-host limits and counters for the crawl metrics."""
+        now = time.monotonic()
+        return {
+            host: {
+                'limit': int(state.limit),
+                'peak_limit': int(state.peak_limit),
+                'inflight': state.inflight,
+                'requests': state.requests,
+                'retries': state.retries,
+                'backoffs': state.backoffs,
+                'circuit_opens': state.circuit_opens,
+                'rejected': state.rejected,
+                'circuit': ('closed' if state.opened_at is None
+                            else 'open' if now - state.opened_at < self.open_for
+                            else 'half-open'),
+            }
+            for host, state in sorted(self._hosts.items())
+        }
+
+    def summary(self) -> str:
+        return stats_summary(self.stats())
+
+
+def stats_summary(stats: dict) -> str:
+    """One-line summary of HostGovernor.stats() (possibly merged across shards)."""
+    parts = [f"{host} limit {s['limit']} (peak {s['peak_limit']}), {s['retries']} retries"
+             + (f", circuit {s['circuit']}" if s.get('circuit', 'closed') != 'closed' else '')
+             for host, s in stats.items()]
+    return '; '.join(parts) or 'no requests'
@@ -0,0 +1,260 @@
+"""
+HLS liveness / quality probe
+============================
+A constructed m3u8 URL says nothing about whether the stream actually
+plays. probe_streams() fetches, for every record with a `stream`, the
+master playlist and then its highest-bandwidth media playlist, and stores
+what it saw under `hls`:
+
+  status             live | stalled | ended | dead | unknown
+  variants           [{bandwidth, resolution}] from the master playlist
+  segment_duration   mean #EXTINF of the media playlist (s)
+  target_duration    #EXT-X-TARGETDURATION (s)
+  newest_segment_age seconds since the newest segment ended, from
+                     #EXT-X-PROGRAM-DATE-TIME or else the playlist's
+                     Last-Modified header (None if neither is given)
+  master_ms/media_ms fetch latency of the two playlists
+  error              why a stream is dead
+
+A stream is "stalled" when its newest segment is older than
+`STALL_FACTOR` target durations (at least MIN_STALL seconds), "dead" when a
+playlist fails to load, is not HLS or lists no segments, and "unknown"
+when the probe did not finish within the crawl's time budget.
+
+All probes share one `budget` (seconds): whatever has not answered by
+then is left "unknown", so the stage never holds a crawl up for longer.
+With `drop=True` a dead or stalled stream is removed: the next ranked
+mirror (mirrors.py) takes its place and is probed in turn within what is
+left of the budget ("unknown" if nothing is), or the record gets an error.
+"""
+import asyncio
+import email.utils
+import re
+import time
+from datetime import datetime
+from urllib.parse import urljoin
+
+import aiohttp
+
+from fetch_api import USER_AGENT
+from governor import CircuitOpenError, HostGovernor
+
+MODES = ('off', 'flag', 'drop')
+DEFAULT_MODE = 'off'
+DEFAULT_BUDGET = 4.0        # seconds for the whole stage
+DEFAULT_CONCURRENCY = 16    # playlists fetched at once (per-host limits come from the governor)
+STALL_FACTOR = 3            # target durations without a new segment before a stream is stalled
+MIN_STALL = 15.0            # seconds
+
+_ATTR_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class PlaylistError(Exception):
+    """A playlist that could not be used (not HLS, no variants / segments)."""
+
+
+def _attributes(line: str) -> dict[str, str]:
+    return {k: v.strip('"') for k, v in _ATTR_RE.findall(line.split(':', 1)[1])}
+
+
+def parse_master(text: str, base_url: str) -> list[dict]:
+    """
+    Variants of a master playlist as [{bandwidth, resolution, uri}], highest
+    bandwidth first; [] if `text` is a media playlist.
+    """
+    variants = []
+    lines = [line.strip() for line in text.splitlines()]
+    for i, line in enumerate(lines):
+        if not line.startswith('#EXT-X-STREAM-INF:'):
+            continue
+        uri = next((l for l in lines[i + 1:] if l and not l.startswith('#')), None)
+        if uri is None:
+            continue
+        attrs = _attributes(line)
+        try:
+            bandwidth = int(attrs.get('BANDWIDTH', 0))
+        except ValueError:
+            bandwidth = 0
+        variants.append({'bandwidth': bandwidth, 'resolution': attrs.get('RESOLUTION'),
+                         'uri': urljoin(base_url, uri)})
+    return sorted(variants, key=lambda v: -v['bandwidth'])
+
+
+def parse_media(text: str) -> dict:
+    """
+    Segment facts of a media playlist: target_duration, segment_duration,
+    segments, ended and newest_segment_end (unix time, from
+    #EXT-X-PROGRAM-DATE-TIME; None without it).
+    """
+    target = None
+    durations = []
+    ended = False
+    newest_end = None
+    program_time = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            try:
+                target = float(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            program_time = _parse_iso(line.split(':', 1)[1])
+        elif line.startswith('#EXTINF:'):
+            try:
+                duration = float(line.split(':', 1)[1].split(',', 1)[0])
+            except ValueError:
+                duration = target or 0.0
+            durations.append(duration)
+            if program_time is not None:
+                newest_end = program_time + duration
+                program_time = newest_end
+        elif line == '#EXT-X-ENDLIST':
+            ended = True
+    return {
+        'target_duration': target,
+        'segment_duration': round(sum(durations) / len(durations), 3) if durations else None,
+        'segments': len(durations),
+        'ended': ended,
+        'newest_segment_end': newest_end,
+    }
+
+
+def _parse_iso(value: str) -> float | None:
+    """Unix time of an ISO 8601 timestamp like 2024-05-01T12:00:00.000Z."""
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _http_time(value: str | None) -> float | None:
+    """Unix time of an HTTP date header, or None."""
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class HlsProber:
+    def __init__(self, session: aiohttp.ClientSession, governor: HostGovernor | None = None,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        self.session = session
+        self.governor = governor
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def _get(self, url: str, referer: str | None) -> tuple[str, float, float | None]:
+        """(body, latency ms, Last-Modified as unix time) of one playlist."""
+        headers = {'User-Agent': USER_AGENT}
+        if referer:
+            headers['Referer'] = referer
+
+        async def fetch() -> tuple[str, float, float | None]:
+            started = time.perf_counter()
+            async with self.session.get(url, headers=headers) as resp:
+                resp.raise_for_status()
+                text = await resp.text(errors='replace')
+                return (text, round((time.perf_counter() - started) * 1000, 1),
+                        _http_time(resp.headers.get('Last-Modified')))
+
+        async with self._slots:
+            if self.governor is not None:
+                return await self.governor.call(url, fetch)
+            return await fetch()
+
+    async def probe(self, m3u8: str, referer: str | None = None) -> dict:
+        """Probe one stream; never raises, failures come back as status "dead"."""
+        result = {'status': 'dead', 'checked_at': round(time.time())}
+        try:
+            text, result['master_ms'], modified = await self._get(m3u8, referer)
+            if not text.lstrip().startswith('#EXTM3U'):
+                raise PlaylistError('not an HLS playlist')
+            variants = parse_master(text, m3u8)
+            result['variants'] = [{'bandwidth': v['bandwidth'], 'resolution': v['resolution']}
+                                  for v in variants]
+            if variants:
+                text, result['media_ms'], modified = await self._get(variants[0]['uri'], referer)
+            media = parse_media(text)
+            if not media['segments']:
+                raise PlaylistError('no segments in media playlist')
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, PlaylistError) as e:
+            result['error'] = str(e) or type(e).__name__
+            return result
+
+        newest = media['newest_segment_end'] or modified
+        age = max(0.0, time.time() - newest) if newest is not None else None
+        stall_after = max(MIN_STALL, STALL_FACTOR * (media['target_duration']
+                                                     or media['segment_duration'] or 0))
+        if media['ended']:
+            status = 'ended'
+        elif age is not None and age > stall_after:
+            status = 'stalled'
+        else:
+            status = 'live'
+        result.update({
+            'status': status,
+            'target_duration': media['target_duration'],
+            'segment_duration': media['segment_duration'],
+            'newest_segment_age': None if age is None else round(age, 1),
+        })
+        return result
+
+
+def _drop(record: dict) -> None:
+    """
+    Replace a dead / stalled stream by the next ranked mirror, or flag the
+    record. The mirror's embed URL comes along, as it is the Referer its
+    playlist is fetched with (by the relay and the player).
+    """
+    mirrors = [m for m in record.get('streams') or [] if m.get('m3u8') != record['stream']]
+    if record.get('streams') is not None:
+        record['streams'] = mirrors
+    record.pop('stream_source', None)
+    if mirrors:
+        record['stream'] = mirrors[0]['m3u8']
+        record['embed_url'] = mirrors[0].get('embed_url') or record.get('embed_url')
+    else:
+        record['stream'] = None
+        record['error'] = f"Stream {record['hls']['status']}"
+
+
+async def probe_streams(session: aiohttp.ClientSession, records: list[dict],
+                        budget: float = DEFAULT_BUDGET, drop: bool = False,
+                        governor: HostGovernor | None = None,
+                        concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """
+    Probe the `stream` of every record concurrently within `budget` seconds
+    and store the result in its `hls` field (see the module docstring).
+    With `drop`, a mirror that replaces a dead / stalled stream is probed
+    in the same budget. Returns a count of records per final status.
+    """
+    prober = HlsProber(session, governor, concurrency)
+    deadline = time.monotonic() + budget
+    targets = [r for r in records if r is not None and r.get('stream')]
+    counts: dict[str, int] = {}
+    while targets:
+        tasks = {
+            asyncio.create_task(prober.probe(r['stream'], r.get('embed_url'))): r
+            for r in targets
+        }
+        done, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        targets = []
+        for task, record in tasks.items():
+            if task.cancelled() or task.exception() is not None:
+                record['hls'] = {'status': 'unknown', 'checked_at': round(time.time())}
+            else:
+                record['hls'] = task.result()
+            status = record['hls']['status']
+            if drop and status in ('dead', 'stalled'):
+                _drop(record)
+                if record['stream']:
+                    targets.append(record)  # probe the mirror that took its place
+                    continue
+            counts[status] = counts.get(status, 0) + 1
+    return counts
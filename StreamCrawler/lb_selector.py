@@ -0,0 +1,95 @@
+"""
+Latency-aware load-balancer selection for the strmd.top HLS edges.
+==================================================================
+Every stream can be played from any `lbN.strmd.top` edge, but pinning all
+viewers to one (historically the `lb2` fallback) puts them on an edge that
+may be far away or overloaded. LbSelector probes the candidate hosts
+concurrently, ranks them by round-trip time and caches that ranking for
+`window` seconds, so a crawl pays for one round of probes, not one per event.
+
+Candidates are only the hosts the /fetch response advertises: a reachable
+edge root says nothing about whether that edge serves this stream, so when
+nothing is advertised (as in every captured real response, see proto.py)
+the known working FALLBACK_LB is used without probing.
+"""
+import asyncio
+import os
+import time
+
+import aiohttp
+
+# Overridable (e.g. 'http://127.0.0.1:8800/{lb}') for the offline stand-in in bench/
+LB_URL_TEMPLATE = os.environ.get('STREAMCRAWLER_LB_URL_TEMPLATE', 'https://{lb}.strmd.top')
+DEFAULT_WINDOW = 300.0       # seconds a ranking is reused
+DEFAULT_PROBE_TIMEOUT = 2.0  # seconds before a host counts as down
+FALLBACK_LB = 'lb2'
+
+
+class LbSelector:
+    def __init__(self, session: aiohttp.ClientSession,
+                 window: float = DEFAULT_WINDOW,
+                 probe_timeout: float = DEFAULT_PROBE_TIMEOUT):
+        self.session = session
+        self.window = window
+        self.probe_timeout = probe_timeout
+        self.probes = 0
+        # candidate set -> (ranked at, [(host, latency seconds or None)])
+        self._rankings: dict[tuple[str, ...], tuple[float, list[tuple[str, float | None]]]] = {}
+        self._inflight: dict[tuple[str, ...], asyncio.Task] = {}
+
+    async def _probe(self, lb: str) -> tuple[str, float | None]:
+        """Round-trip time of a HEAD request to the edge; None if unreachable."""
+        self.probes += 1
+        started = time.perf_counter()
+        try:
+            async with self.session.head(
+                LB_URL_TEMPLATE.format(lb=lb) + '/',
+                timeout=aiohttp.ClientTimeout(total=self.probe_timeout),
+                allow_redirects=False,
+            ) as resp:
+                # Any non-5xx answer (even 403/404 for the bare root) means the edge is up.
+                if resp.status >= 500:
+                    return lb, None
+                return lb, time.perf_counter() - started
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return lb, None
+
+    async def _rank(self, candidates: tuple[str, ...]) -> list[tuple[str, float | None]]:
+        results = await asyncio.gather(*(self._probe(lb) for lb in candidates))
+        up = sorted((r for r in results if r[1] is not None), key=lambda r: r[1])
+        down = [r for r in results if r[1] is None]
+        ranking = up + down
+        self._rankings[candidates] = (time.monotonic(), ranking)
+        return ranking
+
+    async def ranking(self, candidates) -> list[tuple[str, float | None]]:
+        """
+        [(host, latency)] fastest first, unreachable hosts (latency None) last.
+        Probes at most once per `window` per candidate set; concurrent callers
+        share the same round of probes.
+        """
+        key = tuple(candidates)
+        cached = self._rankings.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.window:
+            return cached[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._rank(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def pick(self, candidates=None) -> str:
+        """
+        The lowest-latency reachable host among the advertised `candidates`
+        (the first one if none answered); FALLBACK_LB when none are advertised.
+        """
+        if not candidates:
+            return FALLBACK_LB
+        if len(candidates) == 1:
+            return candidates[0]
+        ranking = await self.ranking(candidates)
+        for lb, latency in ranking:
+            if latency is not None:
+                return lb
+        return ranking[0][0]
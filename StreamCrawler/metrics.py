@@ -0,0 +1,313 @@
+"""
+Crawl metrics
+=============
+Timings and counters for one crawl, written next to streams.json as a JSON
+sidecar (streams.metrics.json) and optionally as a Prometheus textfile, so
+a slow refresh can be traced to the stage that caused it and regressions
+can be alerted on.
+
+Recorded per crawl:
+  - spans per stage (live_static, live_browser, browser_launch, embed_static,
+    embed_browser, token, mirrors, hls_probe): count, failures, p50/p95/max/total ms
+  - failures by stage and reason (e.g. token / http_503, embed_static / not_found)
+  - retries by stage: browser relaunches, and the governor's retries of the
+    requests made inside a span (e.g. token, embed_static, hls_probe)
+  - HTTP requests, bytes received and errors per host (aiohttp tracing on
+    the shared session) plus what the browser context loaded
+  - the adaptive per-host concurrency limits, retries and circuit state
+    (governor.py)
+  - one record per event: how the embed was found, per-stage ms, error
+"""
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+import aiohttp
+
+from atomic import write_json_atomic, write_text_atomic
+
+DEFAULT_METRICS_FILE = 'streams.metrics.json'
+
+_HTTP_STATUS_RE = re.compile(r'^(\d{3}),')
+_PROM_LABEL_RE = re.compile(r'[^a-zA-Z0-9_.:/-]')
+
+# stage of the innermost open span in this task (tasks inherit it when created)
+_current_stage: ContextVar[str | None] = ContextVar('current_stage', default=None)
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def failure_reason(error: str | None) -> str:
+    """
+    Collapse an error string into a short, low-cardinality reason:
+    "503, message='Service Unavailable', url=..." -> "http_503".
+    """
+    if not error:
+        return 'unknown'
+    m = _HTTP_STATUS_RE.match(error)
+    if m:
+        return f'http_{m.group(1)}'
+    lowered = error.lower()
+    if 'timed out' in lowered or 'timeout' in lowered:
+        return 'timeout'
+    if 'no goat' in lowered:
+        return 'no_token'
+    if 'circuit open' in lowered:
+        return 'circuit_open'
+    if 'no embed' in lowered:
+        return 'not_found'
+    if 'cannot connect' in lowered or 'connection' in lowered:
+        return 'connect'
+    return re.sub(r'\W+', '_', lowered)[:40].strip('_') or 'unknown'
+
+
+def _add_counts(a: dict, b: dict) -> dict:
+    """Sum two (nested) dicts of counters, e.g. the browser stats of two shards."""
+    out = dict(a)
+    for key, value in b.items():
+        if isinstance(value, dict):
+            out[key] = _add_counts(out.get(key) or {}, value)
+        elif isinstance(value, (int, float)) and isinstance(out.get(key, 0), (int, float)):
+            out[key] = out.get(key, 0) + value
+        else:
+            out[key] = value
+    return out
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+class Span:
+    """Times one stage; use via CrawlMetrics.span()."""
+
+    def __init__(self, metrics: 'CrawlMetrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.ms: float | None = None
+        self.error: str | None = None
+        self._started = 0.0
+        self._token = None
+
+    def fail(self, error: str | None) -> None:
+        """Mark the span failed (it is still timed)."""
+        self.error = error or 'unknown'
+
+    def __enter__(self) -> 'Span':
+        self._started = time.perf_counter()
+        self._token = _current_stage.set(self.stage)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.ms = (time.perf_counter() - self._started) * 1000
+        _current_stage.reset(self._token)
+        if exc_type is not None and self.error is None:
+            self.error = str(exc) or exc_type.__name__
+        self.metrics.observe(self.stage, self.ms, self.error)
+        return False
+
+
+class CrawlMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over, e.g. at the beginning of each daemon crawl."""
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.spans: dict[str, list[float]] = defaultdict(list)
+        self.span_failures: Counter = Counter()
+        self.failures: Counter = Counter()          # (stage, reason) -> n
+        self.retries: Counter = Counter()           # stage -> n
+        self.http_requests: Counter = Counter()     # host -> n
+        self.http_bytes: Counter = Counter()        # host -> bytes received
+        self.http_errors: Counter = Counter()       # (host, reason) -> n
+        self.events: list[dict] = []
+        self.browser: dict | None = None
+        self.hosts: dict | None = None              # HostGovernor.stats()
+
+    # ── recording ───────────────────────────────────────────────────────────
+
+    def span(self, stage: str) -> Span:
+        return Span(self, stage)
+
+    def observe(self, stage: str, ms: float, error: str | None = None) -> None:
+        self.spans[stage].append(ms)
+        if error is not None:
+            self.fail(stage, error)
+
+    def fail(self, stage: str, error: str | None) -> None:
+        self.span_failures[stage] += 1
+        self.failures[(stage, failure_reason(error))] += 1
+
+    def retry(self, stage: str, count: int = 1) -> None:
+        self.retries[stage] += count
+
+    def retry_in_span(self) -> None:
+        """Count a retry against the enclosing span's stage (HostGovernor.on_retry)."""
+        stage = _current_stage.get()
+        if stage is not None:
+            self.retry(stage)
+
+    def event(self, index: int, record: dict) -> None:
+        self.events.append({'index': index, **record})
+
+    def finish(self, browser_stats: dict | None = None, host_stats: dict | None = None) -> None:
+        self.finished_at = time.time()
+        if browser_stats is not None:
+            self.browser = _add_counts(self.browser or {}, browser_stats)
+        if host_stats is not None:
+            self.hosts = _add_counts(self.hosts or {}, host_stats)
+
+    def merge(self, other: 'CrawlMetrics') -> None:
+        """Fold in the metrics of a shard process (see scraper.resolve_sharded)."""
+        for stage, values in other.spans.items():
+            self.spans[stage].extend(values)
+        for mine, theirs in ((self.span_failures, other.span_failures),
+                             (self.failures, other.failures),
+                             (self.retries, other.retries),
+                             (self.http_requests, other.http_requests),
+                             (self.http_bytes, other.http_bytes),
+                             (self.http_errors, other.http_errors)):
+            mine.update(theirs)
+        self.events.extend(other.events)
+        if other.browser:
+            self.browser = _add_counts(self.browser or {}, other.browser)
+        if other.hosts:
+            # limits add up: each shard holds its own slots on every host
+            self.hosts = _add_counts(self.hosts or {}, other.hosts)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        aiohttp TraceConfig counting requests, bytes received and errors per
+        host; pass it to create_http_session(trace_configs=[...]).
+        """
+        async def on_request_end(session, ctx, params):
+            host = params.url.host
+            self.http_requests[host] += 1
+            if params.response.status >= 400:
+                self.http_errors[(host, f'http_{params.response.status}')] += 1
+
+        async def on_chunk(session, ctx, params):
+            self.http_bytes[params.url.host] += len(params.chunk)
+
+        async def on_request_exception(session, ctx, params):
+            host = params.url.host
+            self.http_requests[host] += 1
+            self.http_errors[(host, failure_reason(str(params.exception)
+                                                   or type(params.exception).__name__))] += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        trace.on_response_chunk_received.append(on_chunk)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    # ── output ──────────────────────────────────────────────────────────────
+
+    def stage_stats(self) -> dict:
+        return {
+            stage: {
+                'count': len(values),
+                'failures': self.span_failures[stage],
+                'p50_ms': _round(percentile(values, 50)),
+                'p95_ms': _round(percentile(values, 95)),
+                'max_ms': _round(max(values)),
+                'total_ms': _round(sum(values)),
+            }
+            for stage, values in self.spans.items() if values
+        }
+
+    def to_dict(self) -> dict:
+        finished = self.finished_at or time.time()
+        return {
+            'started_at': self.started_at,
+            'duration_ms': _round((finished - self.started_at) * 1000),
+            'stages': self.stage_stats(),
+            'failures': [{'stage': s, 'reason': r, 'count': n}
+                         for (s, r), n in self.failures.most_common()],
+            'retries': dict(self.retries),
+            'http': {
+                host: {
+                    'requests': self.http_requests[host],
+                    'bytes': self.http_bytes[host],
+                    'errors': {r: n for (h, r), n in self.http_errors.items() if h == host},
+                }
+                for host in sorted(set(self.http_requests) | set(self.http_bytes))
+            },
+            'browser': self.browser,
+            'hosts': self.hosts,
+            'events': sorted(self.events, key=lambda e: e['index']),
+        }
+
+    def to_prometheus(self, prefix: str = 'streamcrawler') -> str:
+        """Aggregates in the Prometheus text exposition format (no per-event data)."""
+        def label(value) -> str:
+            return _PROM_LABEL_RE.sub('_', str(value))
+
+        lines = [
+            f'# TYPE {prefix}_crawl_duration_seconds gauge',
+            f'{prefix}_crawl_duration_seconds '
+            f'{((self.finished_at or time.time()) - self.started_at):.3f}',
+            f'# TYPE {prefix}_crawl_timestamp_seconds gauge',
+            f'{prefix}_crawl_timestamp_seconds {self.started_at:.0f}',
+            f'# TYPE {prefix}_crawl_events gauge',
+            f'{prefix}_crawl_events {len(self.events)}',
+        ]
+        name = f'{prefix}_stage_duration_seconds'
+        lines.append(f'# TYPE {name} summary')
+        for stage, values in self.spans.items():
+            if not values:
+                continue
+            stage = label(stage)
+            for q in (0.5, 0.95):
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {percentile(values, q * 100) / 1000:.4f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {sum(values) / 1000:.4f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {len(values)}')
+        lines.append(f'# TYPE {prefix}_failures gauge')
+        for (stage, reason), n in sorted(self.failures.items()):
+            lines.append(f'{prefix}_failures{{stage="{label(stage)}",reason="{label(reason)}"}} {n}')
+        lines.append(f'# TYPE {prefix}_retries gauge')
+        for stage, n in sorted(self.retries.items()):
+            lines.append(f'{prefix}_retries{{stage="{label(stage)}"}} {n}')
+        lines.append(f'# TYPE {prefix}_http_requests gauge')
+        for host, n in sorted(self.http_requests.items()):
+            lines.append(f'{prefix}_http_requests{{host="{label(host)}"}} {n}')
+        lines.append(f'# TYPE {prefix}_http_bytes gauge')
+        for host, n in sorted(self.http_bytes.items()):
+            lines.append(f'{prefix}_http_bytes{{host="{label(host)}"}} {n}')
+        if self.hosts:
+            for key in ('limit', 'retries', 'circuit_opens', 'rejected'):
+                lines.append(f'# TYPE {prefix}_host_{key} gauge')
+                for host, stats in sorted(self.hosts.items()):
+                    lines.append(f'{prefix}_host_{key}{{host="{label(host)}"}} {stats.get(key, 0)}')
+        if self.browser:
+            lines.append(f'# TYPE {prefix}_browser_bytes gauge')
+            lines.append(f'{prefix}_browser_bytes {self.browser.get("bytes_loaded", 0)}')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str | None = None, prom_path: str | None = None) -> None:
+        """Write the JSON sidecar and/or the Prometheus textfile atomically."""
+        if path:
+            write_json_atomic(path, self.to_dict(), indent=2, ensure_ascii=False)
+        if prom_path:
+            write_text_atomic(prom_path, self.to_prometheus())
+
+    def summary(self) -> str:
+        """One-line human readable summary for the crawler log."""
+        stats = self.stage_stats()
+        parts = [f"{stage} p50 {s['p50_ms']:.0f}ms/p95 {s['p95_ms']:.0f}ms"
+                 for stage, s in stats.items()]
+        failed = sum(self.failures.values())
+        received = sum(self.http_bytes.values())
+        return (', '.join(parts) or 'no stages run') + \
+            f"; {failed} failures, {sum(self.retries.values())} retries, " \
+            f"{received / 1024:.0f} KiB over HTTP"
@@ -0,0 +1,114 @@
+"""
+Alternate streams (mirrors) per event
+=====================================
+The player iframe of an event names one embed, e.g.
+    https://embedsporty.top/embed/echo/<slug>/1
+but the same slug is usually served under several stream numbers (and
+sometimes by other servers). discover_mirrors() tries every candidate
+(server, stream_num) for the slug concurrently: each one gets its own
+/fetch token call, then its playlist is requested and the time to the
+first playlist byte is measured. The playable ones come back ranked
+fastest first, so the player starts on the quickest mirror and can fail
+over to the next one without another crawl.
+
+Candidates: the iframe's own embed, then stream numbers 1..`streams` on
+the iframe's server and on every server in `servers`
+(--mirror-streams / --mirror-servers, see scraper.py). Discovery costs up
+to servers x streams extra /fetch calls and playlist GETs per event, so it
+is off unless --mirror-streams is given, and never runs with --lazy-tokens
+(whose point is not to resolve tokens nobody plays).
+"""
+import asyncio
+import time
+
+import aiohttp
+
+from fetch_api import USER_AGENT, get_stream_url_async, parse_embed_url
+from governor import CircuitOpenError, HostGovernor
+from lb_selector import LbSelector
+
+DEFAULT_STREAMS = 0          # stream numbers tried per server (0: discovery off, opt in per crawl)
+DEFAULT_SERVERS: tuple[str, ...] = ()  # servers tried besides the iframe's own
+DEFAULT_PROBE_TIMEOUT = 5.0  # seconds allowed for the first playlist byte
+PLAYLIST_MAGIC = b'#EXTM3U'
+
+
+def candidate_embeds(embed_url: str, streams: int = DEFAULT_STREAMS,
+                     servers: tuple[str, ...] = DEFAULT_SERVERS) -> list[str]:
+    """`embed_url` followed by the other (server, stream_num) embeds of its slug."""
+    parsed = parse_embed_url(embed_url)
+    if not parsed:
+        return [embed_url]
+    server, slug, _ = parsed
+    prefix = embed_url[:embed_url.index('/embed/')]
+    candidates = [embed_url]
+    for name in dict.fromkeys((server, *servers)):
+        for number in range(1, streams + 1):
+            candidate = f'{prefix}/embed/{name}/{slug}/{number}'
+            if candidate not in candidates:
+                candidates.append(candidate)
+    return candidates
+
+
+async def playlist_ttfb(session: aiohttp.ClientSession, m3u8: str, embed_url: str,
+                        timeout: float = DEFAULT_PROBE_TIMEOUT) -> float | None:
+    """
+    Milliseconds until the first byte of the playlist arrived, or None if the
+    answer is not an HLS playlist. HTTP errors and timeouts are raised.
+    """
+    headers = {'User-Agent': USER_AGENT, 'Referer': embed_url}
+    started = time.perf_counter()
+    async with session.get(m3u8, headers=headers,
+                           timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        resp.raise_for_status()
+        chunk = await resp.content.readany()
+        ttfb = (time.perf_counter() - started) * 1000
+    return ttfb if chunk.lstrip().startswith(PLAYLIST_MAGIC) else None
+
+
+async def discover_mirrors(session: aiohttp.ClientSession, embed_url: str,
+                           primary: dict | None = None,
+                           selector: LbSelector | None = None,
+                           governor: HostGovernor | None = None,
+                           streams: int = DEFAULT_STREAMS,
+                           servers: tuple[str, ...] = DEFAULT_SERVERS,
+                           timeout: float = DEFAULT_PROBE_TIMEOUT) -> list[dict]:
+    """
+    Resolve and time every candidate embed of `embed_url` concurrently.
+    `primary` is the /fetch result already obtained for `embed_url` itself,
+    which is then not fetched again. Returns the playable mirrors as
+    [{embed_url, server, stream_num, m3u8, lb, ttfb_ms}], fastest first.
+    """
+    async def probe(candidate: str) -> dict | None:
+        if candidate == embed_url and primary is not None:
+            data = primary
+        else:
+            data = await get_stream_url_async(session, candidate, selector, governor)
+        m3u8 = data.get('m3u8')
+        if not m3u8:
+            return None
+
+        async def first_byte() -> float | None:
+            return await playlist_ttfb(session, m3u8, candidate, timeout)
+
+        try:
+            if governor is not None:
+                ttfb = await governor.call(m3u8, first_byte)
+            else:
+                ttfb = await first_byte()
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError):
+            return None
+        if ttfb is None:
+            return None
+        server, _, stream_num = parse_embed_url(candidate)
+        return {
+            'embed_url': candidate,
+            'server': server,
+            'stream_num': int(stream_num),
+            'm3u8': m3u8,
+            'lb': data.get('lb'),
+            'ttfb_ms': round(ttfb, 1),
+        }
+
+    results = await asyncio.gather(*(probe(c) for c in candidate_embeds(embed_url, streams, servers)))
+    return sorted((r for r in results if r is not None), key=lambda r: r['ttfb_ms'])
@@ -0,0 +1,126 @@
+"""
+Reusable Playwright pages.
+==========================
+Creating and closing a page for every event page is a large share of
+Chromium's CPU during a crawl. A PagePool keeps a few pages open on one
+browser context and lends them out instead:
+
+  - pages are pre-created (`size` of them) when the pool is started, so
+    the first workers do not wait for page creation;
+  - between uses a page is reset by navigating it to about:blank, which
+    drops the previous document, its timers and its frames;
+  - a page is closed and replaced after `max_uses` uses, when it crashed
+    (a crashed page stays open until closed), or when it could not be reset;
+  - the popup-killing handler is installed once, when the page is created.
+
+    async with pool.page() as page:
+        await page.goto(url)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+DEFAULT_MAX_USES = 50  # uses before a page is closed and replaced
+RESET_TIMEOUT = 5      # seconds allowed for the about:blank reset
+
+
+async def close_popup(popup):
+    await popup.close()
+
+
+class PagePool:
+    def __init__(self, context, size: int = 4, max_uses: int = DEFAULT_MAX_USES):
+        self.context = context
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._idle: list = []
+        self._uses: dict = {}           # page -> times lent out
+        self._crashed: set = set()
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.crashes = 0
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        page.on('popup', close_popup)
+        page.on('crash', self._on_crash)
+        self._uses[page] = 0
+        self.created += 1
+        return page
+
+    def _on_crash(self, page):
+        self._crashed.add(page)
+        self.crashes += 1
+
+    async def start(self) -> None:
+        """Pre-create `size` idle pages."""
+        missing = self.size - len(self._idle)
+        if missing > 0:
+            self._idle.extend(await asyncio.gather(*(self._new_page() for _ in range(missing))))
+
+    async def acquire(self):
+        while self._idle:
+            page = self._idle.pop()
+            if page.is_closed():
+                self._forget(page)
+                continue
+            if page in self._crashed:
+                await self._close(page)
+                continue
+            self.reused += 1
+            self._uses[page] += 1
+            return page
+        page = await self._new_page()
+        self._uses[page] += 1
+        return page
+
+    async def release(self, page) -> None:
+        """Reset `page` and put it back, or close it if it is worn out or broken."""
+        if page.is_closed():
+            self._forget(page)
+            return
+        if page in self._crashed:
+            await self._close(page)
+            return
+        if self._uses.get(page, 0) >= self.max_uses or len(self._idle) >= self.size:
+            self.recycled += 1
+            await self._close(page)
+            return
+        try:
+            await page.goto('about:blank', timeout=RESET_TIMEOUT * 1000)
+        except Exception:
+            self.recycled += 1
+            await self._close(page)
+            return
+        self._idle.append(page)
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self.acquire()
+        try:
+            yield page
+        finally:
+            await self.release(page)
+
+    def _forget(self, page) -> None:
+        self._uses.pop(page, None)
+        self._crashed.discard(page)
+
+    async def _close(self, page) -> None:
+        self._forget(page)
+        try:
+            await page.close()
+        except Exception:
+            pass  # already gone with its renderer
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._close(page) for page in idle))
+
+    def stats(self) -> dict:
+        return {'created': self.created, 'reused': self.reused,
+                'recycled': self.recycled, 'crashed': self.crashes}
+
+    def summary(self) -> str:
+        return (f"{self.created} pages created, {self.reused} reuses, "
+                f"{self.recycled} recycled, {self.crashes} crashed")
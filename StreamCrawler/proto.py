@@ -0,0 +1,149 @@
+"""
+Minimal protobuf wire-format codec for the embedsporty.top /fetch endpoint.
+===========================================================================
+Only what /fetch needs, without a .proto file or the protobuf package:
+
+  request   field 1 (string)  server       e.g. "echo"
+            field 2 (string)  slug         e.g. "piast-gliwice-vs-motor-lublin-football-1380579"
+            field 3 (string)  stream_num   e.g. "1"
+
+  response  a message whose length-delimited fields carry the player
+            payload; any load-balancer host it advertises ("lb10" or
+            "lb10.strmd.top") is collected by parse_fetch_response().
+            The captured responses (fetch_response.bin) hold a single
+            obfuscated field 1 with no plain host in it, in which case
+            the caller keeps the known working fallback host.
+
+Lengths and tags are proper varints, so values of 128 bytes or more encode
+correctly (a single length byte silently corrupts them).
+
+parse_embed_url() turns an embed URL into the request's three fields; it
+lives here, with no aiohttp import, so resolver.py can reject a bad URL
+before loading the HTTP client.
+"""
+import re
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LEN = 2
+WIRE_FIXED32 = 5
+
+_LB_RE = re.compile(rb'\b(lb\d+)(?:\.strmd\.top)?\b')
+
+
+def parse_embed_url(embed_url: str) -> tuple[str, str, str] | None:
+    """
+    Extract (server, slug, stream_num) from an embed URL like:
+        https://embedsporty.top/embed/echo/some-match-slug-12345/1
+    """
+    m = re.match(r'https?://[^/]+/embed/([^/]+)/(.+)/(\d+)$', embed_url)
+    if not m:
+        return None
+    return m.group(1), m.group(2), m.group(3)
+
+
+class ProtoError(ValueError):
+    """Raised for truncated or malformed protobuf input."""
+
+
+def encode_varint(value: int) -> bytes:
+    if value < 0:
+        raise ValueError('varint must be non-negative')
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_varint(buf: bytes, pos: int = 0) -> tuple[int, int]:
+    """Decode a varint at `pos`; returns (value, position after it)."""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ProtoError('truncated varint')
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ProtoError('varint too long')
+
+
+def encode_field(field_num: int, value: int | str | bytes) -> bytes:
+    """Encode one field: ints as varints, str/bytes as length-delimited."""
+    if isinstance(value, int):
+        return encode_varint(field_num << 3 | WIRE_VARINT) + encode_varint(value)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return encode_varint(field_num << 3 | WIRE_LEN) + encode_varint(len(value)) + value
+
+
+def encode_message(fields: list[tuple[int, int | str | bytes]]) -> bytes:
+    return b''.join(encode_field(num, value) for num, value in fields)
+
+
+def decode_message(buf: bytes) -> dict[int, list]:
+    """
+    Decode a message into {field number: [values]}. Varints come back as int,
+    length-delimited fields as bytes, fixed32/fixed64 as raw bytes.
+    """
+    fields: dict[int, list] = {}
+    pos = 0
+    while pos < len(buf):
+        key, pos = decode_varint(buf, pos)
+        field_num, wire_type = key >> 3, key & 7
+        if field_num == 0:
+            raise ProtoError('field number 0')
+        if wire_type == WIRE_VARINT:
+            value, pos = decode_varint(buf, pos)
+        elif wire_type == WIRE_LEN:
+            length, pos = decode_varint(buf, pos)
+            if pos + length > len(buf):
+                raise ProtoError('truncated length-delimited field')
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type in (WIRE_FIXED64, WIRE_FIXED32):
+            size = 8 if wire_type == WIRE_FIXED64 else 4
+            if pos + size > len(buf):
+                raise ProtoError('truncated fixed-width field')
+            value = buf[pos:pos + size]
+            pos += size
+        else:
+            raise ProtoError(f'unsupported wire type {wire_type}')
+        fields.setdefault(field_num, []).append(value)
+    return fields
+
+
+def build_fetch_request(server: str, slug: str, stream_num: str) -> bytes:
+    """Protobuf body for POST /fetch."""
+    return encode_message([(1, server), (2, slug), (3, stream_num)])
+
+
+def parse_fetch_response(content: bytes) -> dict:
+    """
+    Decode a /fetch response body. Returns
+      {'fields': {num: [values]}, 'lb_hosts': ['lb10', ...]}
+    with every load-balancer host advertised anywhere in the message, in
+    order of appearance. Raises ProtoError if the body is not a message.
+    """
+    fields = decode_message(content)
+    lb_hosts: list[str] = []
+    # Nested messages are just bytes inside a length-delimited field, so
+    # scanning every such field also covers hosts advertised in sub-messages.
+    for values in fields.values():
+        for value in values:
+            if not isinstance(value, bytes):
+                continue
+            for m in _LB_RE.finditer(value):
+                host = m.group(1).decode('ascii')
+                if host not in lb_hosts:
+                    lb_hosts.append(host)
+    return {'fields': fields, 'lb_hosts': lb_hosts}
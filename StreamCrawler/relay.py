@@ -0,0 +1,465 @@
+"""
+Local HLS relay
+===============
+Every viewer of an event normally pulls the same *.strmd.top playlists and
+segments on its own, multiplying upstream traffic and putting everyone on
+the same edge. HlsRelay sits in between: each playlist and segment is
+fetched from upstream once and served to every local viewer from memory.
+
+    GET /hls/<referer>/<upstream>/<name>   a playlist or segment
+    GET /hls/stats                         viewers, cache hits, ring usage (JSON)
+
+<referer> and <upstream> are the embed URL and the upstream URL, base64url
+encoded ("-" for no referer), so the relay needs no state to map a URL
+back; relay_url() builds them. Upstream URLs must be on an allowed host
+(the load-balancer domain of lb_selector.LB_URL_TEMPLATE by default), so
+the relay is not an open proxy.
+
+  - playlists are cached for `playlist_ttl` seconds (live playlists change
+    every segment) and their URIs rewritten to relay paths, relative to
+    the playlist, so the relay works behind any base URL;
+  - segments (and keys / init sections) go into a ring buffer bounded by
+    `max_segments` and `max_bytes`; the oldest are evicted first;
+  - concurrent requests for the same URL share one upstream fetch, and
+    every viewer is sent the same immutable bytes object: nothing is
+    copied per viewer;
+  - upstream errors are passed on with their status (a 403 tells the
+    player its token expired), unreachable upstreams answer 502;
+  - a viewer is a client address that loaded a playlist of the stream
+    within the last VIEWER_WINDOW seconds; streams idle for STREAM_IDLE
+    seconds are forgotten, and at most `max_streams` are tracked (least
+    recently requested go first).
+
+Run standalone with `python relay.py`, or let the daemon serve it next to
+/events (`scraper.py --daemon --relay URL`); `--relay URL` also makes a
+crawl point each event's `stream` at the relay, keeping the upstream URL
+in `stream_source`.
+"""
+import argparse
+import asyncio
+import base64
+import os
+import posixpath
+import re
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from aiohttp import web
+
+from fetch_api import USER_AGENT, create_http_session, parse_embed_url
+from governor import CircuitOpenError, HostGovernor
+from lb_selector import LB_URL_TEMPLATE
+
+DEFAULT_PORT = 8791
+DEFAULT_MAX_SEGMENTS = 256       # segments kept across all streams
+DEFAULT_MAX_MB = 256.0           # memory budget of the segment ring
+DEFAULT_PLAYLIST_TTL = 1.0       # seconds a fetched playlist is served from cache
+VIEWER_WINDOW = 30.0             # seconds since a client's last playlist request
+STREAM_IDLE = 10 * 60.0          # seconds without requests before a stream's counters go
+DEFAULT_MAX_STREAMS = 256        # streams whose counters are kept
+RELAY_PREFIX = '/hls/'
+PLAYLIST_CONTENT_TYPE = 'application/vnd.apple.mpegurl'
+
+_URI_ATTR_RE = re.compile(r'URI="([^"]+)"')
+# tags whose URI attribute names another playlist (the rest: keys, init sections)
+_PLAYLIST_URI_TAGS = ('#EXT-X-MEDIA:', '#EXT-X-I-FRAME-STREAM-INF:')
+_PROM_LABEL_RE = re.compile(r'[^a-zA-Z0-9_.:/-]')
+
+
+def default_upstream_hosts() -> tuple[str, ...]:
+    """
+    The load-balancer domain of LB_URL_TEMPLATE: ".strmd.top" (any host in
+    it) for https://{lb}.strmd.top, the exact host for other templates.
+    """
+    host = urlsplit(LB_URL_TEMPLATE.format(lb='lb')).hostname or ''
+    return (host[2:],) if host.startswith('lb.') else (host,)
+
+
+def _encode(value: str) -> str:
+    return base64.urlsafe_b64encode(value.encode()).rstrip(b'=').decode()
+
+
+def _decode(token: str) -> str:
+    return base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+
+
+def _relay_name(upstream: str, playlist: bool) -> str:
+    """Last path segment of `upstream`; playlists always end in .m3u8."""
+    name = posixpath.basename(urlsplit(upstream).path) or 'index'
+    if playlist and not name.endswith('.m3u8'):
+        name += '.m3u8'
+    return name
+
+
+def relay_path(upstream: str, referer: str | None = None, playlist: bool = True) -> str:
+    """Relay path (under RELAY_PREFIX) serving `upstream` with `referer`."""
+    ref = _encode(referer) if referer else '-'
+    return f"{RELAY_PREFIX}{ref}/{_encode(upstream)}/{_relay_name(upstream, playlist)}"
+
+
+def relay_url(base: str, upstream: str, referer: str | None = None) -> str:
+    """URL of the playlist `upstream` on the relay at `base`."""
+    return base.rstrip('/') + relay_path(upstream, referer)
+
+
+def relay_streams(records: list[dict], base: str | None) -> int:
+    """
+    Point the `stream` of every record at the relay at `base`, keeping the
+    upstream URL in `stream_source`; with no `base`, undo that. Returns the
+    number of relayed streams.
+    """
+    relayed = 0
+    for record in records:
+        if record is None:
+            continue
+        embed_url = record.get('embed_url')
+        source = record.pop('stream_source', None)
+        stream = record.get('stream')
+        if stream and source and stream.endswith(relay_path(source, embed_url)):
+            stream = source     # relayed by an earlier crawl
+        if stream and base:
+            record['stream_source'] = stream
+            stream = relay_url(base, stream, embed_url)
+            relayed += 1
+        if stream:
+            record['stream'] = stream
+    return relayed
+
+
+class SegmentRing:
+    """Recently fetched segments by URL; the oldest go first beyond either bound."""
+
+    def __init__(self, max_segments: int = DEFAULT_MAX_SEGMENTS,
+                 max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.max_segments = max(1, max_segments)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evicted = 0
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, url: str) -> bytes | None:
+        return self._items.get(url)
+
+    def put(self, url: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._items.pop(url, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._items[url] = data
+        self.bytes += len(data)
+        while len(self._items) > self.max_segments or self.bytes > self.max_bytes:
+            _, dropped = self._items.popitem(last=False)
+            self.bytes -= len(dropped)
+            self.evicted += 1
+
+
+class StreamStats:
+    """Counters of one relayed stream (one embed URL)."""
+
+    def __init__(self):
+        self.clients: dict[str, float] = {}  # client address -> last playlist request
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_upstream = 0
+        self.last_request = time.monotonic()
+
+    def viewers(self, now: float) -> int:
+        for client in [c for c, seen in self.clients.items() if now - seen > VIEWER_WINDOW]:
+            del self.clients[client]
+        return len(self.clients)
+
+
+class HlsRelay:
+    def __init__(self, session: aiohttp.ClientSession,
+                 governor: HostGovernor | None = None,
+                 upstream_hosts: tuple[str, ...] | None = None,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS,
+                 max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+                 playlist_ttl: float = DEFAULT_PLAYLIST_TTL,
+                 max_streams: int = DEFAULT_MAX_STREAMS):
+        self.session = session
+        self.governor = governor
+        self.upstream_hosts = upstream_hosts or default_upstream_hosts()
+        self.playlist_ttl = playlist_ttl
+        self.ring = SegmentRing(max_segments, max_bytes)
+        self.max_streams = max(1, max_streams)
+        # relay path -> (fetched at, body), oldest fetch first
+        self._playlists: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        # stream -> counters, least recently requested first
+        self._streams: OrderedDict[str, StreamStats] = OrderedDict()
+
+    def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        return parts.scheme in ('http', 'https') and any(
+            host == allowed or (allowed.startswith('.') and host.endswith(allowed))
+            for allowed in self.upstream_hosts
+        )
+
+    # ── upstream ────────────────────────────────────────────────────────────
+
+    async def _fetch(self, url: str, referer: str | None) -> bytes:
+        headers = {'User-Agent': USER_AGENT}
+        if referer:
+            headers['Referer'] = referer
+
+        async def fetch() -> bytes:
+            async with self.session.get(url, headers=headers) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+
+        if self.governor is not None:
+            return await self.governor.call(url, fetch)
+        return await fetch()
+
+    async def _once(self, key: str, fetch) -> bytes:
+        """Run `fetch()` for `key` unless a fetch of it is already running; share its result."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(fetch())
+
+            def done(t: asyncio.Future) -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled():
+                    t.exception()  # retrieved here, re-raised to every waiter
+
+            task.add_done_callback(done)
+        # shield: a viewer that disconnects must not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    def rewrite(self, text: str, upstream: str, ref: str) -> str:
+        """`text` with every URI pointing at its relay path, relative to the playlist."""
+        is_master = '#EXT-X-STREAM-INF' in text
+
+        def local(uri: str, playlist: bool) -> str:
+            target = urljoin(upstream, uri)
+            if not self.allowed(target):
+                return target
+            return f"../{_encode(target)}/{_relay_name(target, playlist)}"
+
+        lines = []
+        for line in text.splitlines():
+            stripped = line.strip()
+            if stripped and not stripped.startswith('#'):
+                line = local(stripped, is_master)
+            elif stripped.startswith('#') and 'URI="' in stripped:
+                playlist = stripped.startswith(_PLAYLIST_URI_TAGS)
+                line = _URI_ATTR_RE.sub(lambda m: f'URI="{local(m.group(1), playlist)}"', stripped)
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+    # ── requests ────────────────────────────────────────────────────────────
+
+    def _stream(self, referer: str | None, upstream: str) -> StreamStats:
+        parsed = parse_embed_url(referer) if referer else None
+        key = '/'.join(parsed) if parsed else referer or urlsplit(upstream).hostname or '?'
+        stats = self._streams.get(key)
+        if stats is not None:
+            self._streams.move_to_end(key)
+            stats.last_request = time.monotonic()
+            return stats
+        now = time.monotonic()
+        while self._streams and (len(self._streams) >= self.max_streams or
+                                 now - next(iter(self._streams.values())).last_request > STREAM_IDLE):
+            self._streams.popitem(last=False)
+        stats = self._streams[key] = StreamStats()
+        return stats
+
+    def _cache_playlist(self, path: str, body: bytes) -> None:
+        """Store a fetched playlist, dropping the ones whose TTL has run out."""
+        now = time.monotonic()
+        self._playlists.pop(path, None)
+        while self._playlists and now - next(iter(self._playlists.values()))[0] >= self.playlist_ttl:
+            self._playlists.popitem(last=False)
+        self._playlists[path] = (now, body)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        ref, token, name = (request.match_info[k] for k in ('ref', 'token', 'name'))
+        try:
+            upstream = _decode(token)
+            referer = None if ref == '-' else _decode(ref)
+        except (ValueError, UnicodeDecodeError):
+            return web.Response(status=400, text='bad relay path\n')
+        if not self.allowed(upstream):
+            return web.Response(status=403, text='upstream host not allowed\n')
+
+        playlist = name.endswith('.m3u8')
+        stats = self._stream(referer, upstream)
+        stats.requests += 1
+        now = time.monotonic()
+        if playlist:
+            stats.clients[request.remote or '?'] = now
+
+        try:
+            if playlist:
+                body, hit = await self._playlist(request.path, upstream, referer, ref, now)
+            else:
+                body, hit = await self._segment(upstream, referer)
+        except aiohttp.ClientResponseError as e:
+            return web.Response(status=e.status, text=f'upstream answered {e.status}\n')
+        except CircuitOpenError as e:
+            return web.Response(status=503, text=f'{e}\n')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return web.Response(status=502, text=f'upstream failed: {str(e) or type(e).__name__}\n')
+
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+            stats.bytes_upstream += len(body)
+        stats.bytes_served += len(body)
+        if playlist:
+            return web.Response(body=body, content_type=PLAYLIST_CONTENT_TYPE,
+                                headers={'Cache-Control': 'no-cache'})
+        return web.Response(body=body, content_type='video/mp2t' if name.endswith('.ts')
+                            else 'application/octet-stream',
+                            headers={'Cache-Control': 'max-age=60'})
+
+    async def _playlist(self, path: str, upstream: str, referer: str | None,
+                        ref: str, now: float) -> tuple[bytes, bool]:
+        cached = self._playlists.get(path)
+        if cached is not None and now - cached[0] < self.playlist_ttl:
+            return cached[1], True
+
+        async def fetch() -> bytes:
+            raw = await self._fetch(upstream, referer)
+            body = self.rewrite(raw.decode('utf-8', errors='replace'), upstream, ref).encode()
+            self._cache_playlist(path, body)
+            return body
+
+        joined = path in self._inflight
+        return await self._once(path, fetch), joined
+
+    async def _segment(self, upstream: str, referer: str | None) -> tuple[bytes, bool]:
+        data = self.ring.get(upstream)
+        if data is not None:
+            return data, True
+
+        async def fetch() -> bytes:
+            body = await self._fetch(upstream, referer)
+            self.ring.put(upstream, body)
+            return body
+
+        joined = upstream in self._inflight
+        return await self._once(upstream, fetch), joined
+
+    # ── reporting ───────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        streams = {
+            key: {
+                'viewers': s.viewers(now),
+                'requests': s.requests,
+                'hits': s.hits,
+                'misses': s.misses,
+                'hit_rate': round(s.hits / s.requests, 3) if s.requests else None,
+                'bytes_served': s.bytes_served,
+                'bytes_upstream': s.bytes_upstream,
+            }
+            for key, s in sorted(self._streams.items())
+        }
+        served = sum(s['bytes_served'] for s in streams.values())
+        upstream = sum(s['bytes_upstream'] for s in streams.values())
+        return {
+            'viewers': sum(s['viewers'] for s in streams.values()),
+            'bytes_served': served,
+            'bytes_upstream': upstream,
+            'byte_hit_rate': round(1 - upstream / served, 3) if served else None,
+            'ring': {
+                'segments': len(self.ring),
+                'bytes': self.ring.bytes,
+                'max_segments': self.ring.max_segments,
+                'max_bytes': self.ring.max_bytes,
+                'evicted': self.ring.evicted,
+            },
+            'streams': streams,
+        }
+
+    def to_prometheus(self, prefix: str = 'streamcrawler') -> str:
+        """stats() in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = [
+            f'# TYPE {prefix}_relay_ring_segments gauge',
+            f"{prefix}_relay_ring_segments {stats['ring']['segments']}",
+            f'# TYPE {prefix}_relay_ring_bytes gauge',
+            f"{prefix}_relay_ring_bytes {stats['ring']['bytes']}",
+            f'# TYPE {prefix}_relay_ring_evicted counter',
+            f"{prefix}_relay_ring_evicted {stats['ring']['evicted']}",
+        ]
+        for key in ('viewers', 'hits', 'misses', 'bytes_served', 'bytes_upstream'):
+            lines.append(f'# TYPE {prefix}_relay_{key} gauge')
+            for stream, s in stats['streams'].items():
+                lines.append(f'{prefix}_relay_{key}{{stream="{_PROM_LABEL_RE.sub("_", stream)}"}} {s[key]}')
+        return '\n'.join(lines) + '\n'
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_get(RELAY_PREFIX + 'stats', self.handle_stats)
+        app.router.add_get(RELAY_PREFIX + '{ref}/{token}/{name}', self.handle)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        self.add_routes(app)
+        return app
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    hosts = tuple(h for h in args.upstream_hosts.split(',') if h) or None
+    async with create_http_session() as session:
+        relay = HlsRelay(session, HostGovernor(), hosts, args.max_segments,
+                         int(args.max_mb * 1024 * 1024), args.playlist_ttl, args.max_streams)
+        runner = web.AppRunner(relay.make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        print(f"[Relay] serving {', '.join(relay.upstream_hosts)} on http://{args.host}:{args.port}")
+        sys.stdout.flush()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Relay HLS streams to local viewers from one upstream fetch.')
+    parser.add_argument('--host', default=os.environ.get('STREAMCRAWLER_RELAY_HOST', '127.0.0.1'),
+                        help='address to listen on (env STREAMCRAWLER_RELAY_HOST, default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('STREAMCRAWLER_RELAY_PORT', DEFAULT_PORT)),
+                        help=f'TCP port (env STREAMCRAWLER_RELAY_PORT, default {DEFAULT_PORT})')
+    parser.add_argument('--upstream-hosts', default=os.environ.get('STREAMCRAWLER_RELAY_HOSTS', ''),
+                        help='comma-separated hosts the relay may fetch from, ".domain" for any host '
+                             'in it (env STREAMCRAWLER_RELAY_HOSTS, '
+                             f'default {",".join(default_upstream_hosts())})')
+    parser.add_argument('--max-segments', type=int, default=DEFAULT_MAX_SEGMENTS,
+                        help=f'segments kept in memory (default {DEFAULT_MAX_SEGMENTS})')
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_MB,
+                        help=f'memory budget of the segment ring (default {DEFAULT_MAX_MB:g})')
+    parser.add_argument('--playlist-ttl', type=float, default=DEFAULT_PLAYLIST_TTL,
+                        help=f'seconds a playlist is served from cache (default {DEFAULT_PLAYLIST_TTL:g})')
+    parser.add_argument('--max-streams', type=int, default=DEFAULT_MAX_STREAMS,
+                        help=f'streams whose viewer / hit counters are kept (default {DEFAULT_MAX_STREAMS})')
+    args = parser.parse_args(argv)
+    if args.max_segments < 1:
+        parser.error('--max-segments must be at least 1')
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+On-demand m3u8 resolution
+=========================
+The goat token baked into an m3u8 URL expires, so resolving every event
+during the crawl is mostly wasted work by the time a user clicks a card.
+With `scraper.py --lazy-tokens` the crawl stores only `embed_url`, and the
+stream is resolved here when it is actually needed:
+
+    python resolver.py https://embedsporty.top/embed/echo/<slug>/1
+    -> {"m3u8": "...", "goat": "...", "lb": "...", "issued_at": ..., "expires_at": ..., "cached": false}
+
+Tokens are cached per embed URL (token_cache.json) together with an estimate
+of how long a token lives, and are re-fetched `REFRESH_MARGIN` seconds before
+that estimate runs out. The estimate is learned from two observations:
+  - the /fetch endpoint handed out a different token for the same embed
+    (the old one was rotated, so it lived about that long);
+  - a caller reported the token as expired (`--expired`, e.g. after the
+    player got a 403), which pins its lifetime to its age at that moment.
+
+aiohttp and the /fetch client are only imported once a token actually has
+to be fetched, so answering from the cache takes a few milliseconds
+(`cli.py resolve` is the per-click entry point).
+"""
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
+
+import argparse
+import asyncio
+import json
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager
+
+from atomic import write_json_atomic
+from proto import parse_embed_url
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from governor import HostGovernor
+    from lb_selector import LbSelector
+
+DEFAULT_TOKEN_CACHE = 'token_cache.json'
+DEFAULT_LIFETIME = 15 * 60  # seconds, until a real lifetime has been observed
+MIN_LIFETIME = 30           # never trust a learned lifetime shorter than this
+REFRESH_MARGIN = 30         # seconds before expiry a token is re-fetched
+MAX_ENTRIES = 500
+
+
+class TokenCache:
+    """embed_url -> last /fetch result, plus the learned token lifetime."""
+
+    def __init__(self, path: str | None = DEFAULT_TOKEN_CACHE,
+                 default_lifetime: float = DEFAULT_LIFETIME):
+        self.path = path
+        self.lifetime = default_lifetime
+        self.observations = 0
+        self._entries: dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self.lifetime = float(data.get('lifetime', self.lifetime))
+            self.observations = int(data.get('observations', 0))
+            self._entries = data.get('tokens') or {}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        if len(self._entries) > MAX_ENTRIES:
+            newest = sorted(self._entries.items(), key=lambda kv: kv[1]['issued_at'])
+            self._entries = dict(newest[-MAX_ENTRIES:])
+        write_json_atomic(self.path, {
+            'lifetime': self.lifetime,
+            'observations': self.observations,
+            'tokens': self._entries,
+        }, ensure_ascii=False)
+
+    def observe_lifetime(self, seconds: float) -> None:
+        """
+        Fold one observed token lifetime into the estimate. Expiry is what
+        hurts, so a shorter observation replaces the estimate immediately
+        while longer ones only move it up gradually.
+        """
+        seconds = max(seconds, MIN_LIFETIME)
+        if self.observations == 0 or seconds < self.lifetime:
+            self.lifetime = seconds
+        else:
+            self.lifetime = 0.8 * self.lifetime + 0.2 * seconds
+        self.observations += 1
+
+    def expires_at(self, entry: dict) -> float:
+        return entry['issued_at'] + self.lifetime
+
+    def get(self, embed_url: str, now: float | None = None) -> dict | None:
+        """The cached token for `embed_url`, unless it is about to expire."""
+        entry = self._entries.get(embed_url)
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+        if now >= self.expires_at(entry) - REFRESH_MARGIN:
+            return None
+        entry['last_used'] = now
+        return entry
+
+    def put(self, embed_url: str, result: dict, now: float | None = None,
+            touch: bool = True) -> dict:
+        """Store a /fetch result; `touch` marks it as just handed out to a viewer."""
+        now = time.time() if now is None else now
+        previous = self._entries.get(embed_url)
+        issued_at = now
+        if previous is not None:
+            age = now - previous['issued_at']
+            if previous['goat'] != result['goat']:
+                # The endpoint rotated the token: the old one lived about this long.
+                self.observe_lifetime(age)
+            else:
+                # Same token handed out again: it is older than we thought it
+                # could get, so the estimate was too short.
+                issued_at = previous['issued_at']
+                if age >= self.lifetime - REFRESH_MARGIN:
+                    self.lifetime = age + REFRESH_MARGIN
+        entry = {
+            'goat': result['goat'],
+            'lb': result['lb'],
+            'm3u8': result['m3u8'],
+            'issued_at': issued_at,
+            'last_used': now if touch or previous is None else previous.get('last_used', 0),
+        }
+        self._entries[embed_url] = entry
+        return entry
+
+    def report_expired(self, embed_url: str, now: float | None = None) -> None:
+        """A consumer saw this token fail: learn its lifetime and drop it."""
+        entry = self._entries.pop(embed_url, None)
+        if entry is not None:
+            now = time.time() if now is None else now
+            self.observe_lifetime(now - entry['issued_at'])
+
+    def expiring(self, within: float, used_since: float = 0,
+                 now: float | None = None) -> list[str]:
+        """
+        Embed URLs whose token expires in the next `within` seconds and that
+        were last handed out after `used_since` (i.e. are likely being watched).
+        """
+        now = time.time() if now is None else now
+        return [url for url, entry in self._entries.items()
+                if self.expires_at(entry) - now <= within
+                and entry.get('last_used', 0) >= used_since]
+
+
+def token_result(cache: TokenCache, entry: dict, cached: bool) -> dict:
+    """The {m3u8, goat, lb, issued_at, expires_at, cached} answer for a cache entry."""
+    return {**entry, 'expires_at': cache.expires_at(entry), 'cached': cached}
+
+
+class StreamResolver:
+    """
+    Resolves embed URLs to fresh m3u8 URLs through a TokenCache. Concurrent
+    requests for the same embed URL share one /fetch call; with a `governor`
+    (e.g. the daemon's) those calls respect embedsporty.top's current limit.
+    """
+
+    def __init__(self, session: 'aiohttp.ClientSession', cache: TokenCache,
+                 selector: 'LbSelector | None' = None,
+                 governor: 'HostGovernor | None' = None):
+        self.session = session
+        self.cache = cache
+        self.selector = selector
+        self.governor = governor
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def _result(self, entry: dict, cached: bool) -> dict:
+        return token_result(self.cache, entry, cached)
+
+    async def resolve(self, embed_url: str, force: bool = False, touch: bool = True) -> dict:
+        """
+        Return {m3u8, goat, lb, issued_at, expires_at, cached} for `embed_url`,
+        or {'error': ...}. `force` skips the cache; background refreshes pass
+        touch=False so they do not keep an unwatched token alive.
+        """
+        if not force:
+            entry = self.cache.get(embed_url)
+            if entry is not None:
+                return self._result(entry, cached=True)
+
+        task = self._inflight.get(embed_url)
+        if task is None:
+            from fetch_api import get_stream_url_async
+
+            task = asyncio.create_task(get_stream_url_async(self.session, embed_url, self.selector,
+                                                           self.governor))
+            self._inflight[embed_url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(embed_url, None))
+        data = await asyncio.shield(task)
+
+        if not data.get('m3u8'):
+            return {'error': data.get('error', 'Cannot parse embed URL')}
+        return self._result(self.cache.put(embed_url, data, touch=touch), cached=False)
+
+    def report_expired(self, embed_url: str) -> None:
+        self.cache.report_expired(embed_url)
+
+    async def refresh_expiring(self, within: float = REFRESH_MARGIN * 2,
+                               active_for: float = 3 * 3600) -> int:
+        """
+        Re-fetch the tokens that expire within `within` seconds, limited to
+        those handed out in the last `active_for` seconds.
+        """
+        urls = self.cache.expiring(within, used_since=time.time() - active_for)
+        await asyncio.gather(*(self.resolve(url, force=True, touch=False) for url in urls))
+        return len(urls)
+
+
+async def resolve_once(embed_url: str, expired: bool = False,
+                       cache_path: str | None = DEFAULT_TOKEN_CACHE,
+                       probe_lb: bool = False,
+                       importing: Callable[[], ContextManager] = nullcontext) -> dict:
+    """
+    Resolve a single embed URL with a short-lived session (CLI entry point).
+    Load-balancer probing is off by default here: a one-shot process cannot
+    reuse the ranking, and the probes would add to click-to-play latency.
+    A cached token is answered without opening a session at all, and a URL
+    that is not an embed URL without even importing the HTTP client; that
+    lazy import runs inside `importing()` (cli.py times it).
+    """
+    if parse_embed_url(embed_url) is None:
+        return {'error': 'Cannot parse embed URL'}
+    cache = TokenCache(cache_path)
+    if expired:
+        cache.report_expired(embed_url)
+    entry = cache.get(embed_url)
+    if entry is not None:
+        result = token_result(cache, entry, cached=True)
+    else:
+        with importing():
+            from fetch_api import create_http_session
+            from lb_selector import LbSelector
+
+        async with create_http_session() as session:
+            selector = LbSelector(session) if probe_lb else None
+            result = await StreamResolver(session, cache, selector).resolve(embed_url, force=True)
+    cache.save()
+    return result
+
+
+def main(argv: list[str] | None = None,
+         importing: Callable[[], ContextManager] = nullcontext) -> int:
+    parser = argparse.ArgumentParser(description='Resolve one embed URL to a fresh m3u8 URL.')
+    parser.add_argument('embed_url')
+    parser.add_argument('--expired', action='store_true',
+                        help='the previously returned token stopped working; fetch a new one')
+    parser.add_argument('--token-cache', metavar='PATH', default=DEFAULT_TOKEN_CACHE,
+                        help=f'token cache file, "" to disable (default {DEFAULT_TOKEN_CACHE})')
+    parser.add_argument('--probe-lb', action='store_true',
+                        help='probe the load balancers and use the fastest one')
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(resolve_once(args.embed_url, args.expired, args.token_cache or None,
+                                      args.probe_lb, importing))
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result.get('m3u8') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Resource policy for the crawler's Playwright browser context.
+=============================================================
+The scraper only reads DOM text, onclick attributes, img.src values and
+iframe srcs, so most of what a StreamWest page pulls in (posters, fonts,
+ad scripts, the embedded video player) is wasted bandwidth and renderer CPU.
+
+A ResourcePolicy is installed on a browser context with context.route() and
+decides per request whether it may load, based on
+  - resource type  (Playwright's request.resource_type: image, font, ...)
+  - host           (matched on the hostname and all of its parent domains)
+Allow rules win over block rules, so a host can be whitelisted even if its
+resource type is blocked.
+
+Every decision is counted: hits per type / host for blocked requests, and
+requests + response bytes (from Content-Length) for allowed ones.
+"""
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Ad / tracking / popunder networks seen on the streaming sites
+AD_HOSTS = frozenset({
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googletagmanager.com',
+    'google-analytics.com',
+    'adservice.google.com',
+    'popads.net',
+    'popcash.net',
+    'propellerads.com',
+    'adsterra.com',
+    'exoclick.com',
+    'juicyads.com',
+    'hilltopads.net',
+    'onclickads.net',
+    'histats.com',
+    'cloudflareinsights.com',
+})
+
+# The embedded player and its HLS edge: we only need the iframe's src
+# attribute, never the player itself.
+PLAYER_HOSTS = frozenset({
+    'embedsporty.top',
+    'strmd.top',
+})
+
+PROFILES = {
+    # Abort everything the scraper never reads
+    'default': {
+        'block_types': frozenset({'image', 'media', 'font'}),
+        'block_hosts': AD_HOSTS | PLAYER_HOSTS,
+    },
+    # Load everything (no interception at all)
+    'off': None,
+}
+
+
+def _host_matches(host: str, hosts: frozenset) -> str | None:
+    """Return the entry of `hosts` matching `host` or one of its parent domains."""
+    parts = host.split('.')
+    for i in range(len(parts) - 1):
+        candidate = '.'.join(parts[i:])
+        if candidate in hosts:
+            return candidate
+    return None
+
+
+class ResourcePolicy:
+    """Allow/deny list by resource type and host, with hit and byte counters."""
+
+    def __init__(self,
+                 block_types=frozenset(),
+                 block_hosts=frozenset(),
+                 allow_types=frozenset(),
+                 allow_hosts=frozenset()):
+        self.block_types = frozenset(block_types)
+        self.block_hosts = frozenset(block_hosts)
+        self.allow_types = frozenset(allow_types)
+        self.allow_hosts = frozenset(allow_hosts)
+
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_loaded = 0
+        self.blocked_by_type: Counter = Counter()
+        self.blocked_by_host: Counter = Counter()
+
+    @classmethod
+    def from_profile(cls, name: str) -> 'ResourcePolicy | None':
+        """Build the policy for a named profile ('off' returns None)."""
+        if name not in PROFILES:
+            raise ValueError(f"Unknown resource profile {name!r} (choose from {', '.join(PROFILES)})")
+        profile = PROFILES[name]
+        return cls(**profile) if profile is not None else None
+
+    def decide(self, resource_type: str, url: str) -> str | None:
+        """
+        Return the rule that blocks this request ('type:<t>' or 'host:<h>'),
+        or None if it may load.
+        """
+        host = (urlsplit(url).hostname or '').lower()
+        if resource_type in self.allow_types or _host_matches(host, self.allow_hosts):
+            return None
+        if resource_type in self.block_types:
+            return f'type:{resource_type}'
+        matched = _host_matches(host, self.block_hosts)
+        if matched:
+            return f'host:{matched}'
+        return None
+
+    async def install(self, context) -> None:
+        """Route every request of `context` through this policy."""
+        await context.route('**/*', self._handle_route)
+        context.on('response', self._on_response)
+
+    async def _handle_route(self, route):
+        request = route.request
+        rule = self.decide(request.resource_type, request.url)
+        if rule is None:
+            self.allowed += 1
+            await route.continue_()
+            return
+
+        self.blocked += 1
+        self.blocked_by_type[request.resource_type] += 1
+        if rule.startswith('host:'):
+            self.blocked_by_host[rule[5:]] += 1
+        await route.abort('blockedbyclient')
+
+    def _on_response(self, response):
+        length = response.headers.get('content-length')
+        if length and length.isdigit():
+            self.bytes_loaded += int(length)
+
+    def stats(self) -> dict:
+        """Counters as a plain dict (JSON-serialisable)."""
+        return {
+            'allowed': self.allowed,
+            'blocked': self.blocked,
+            'bytes_loaded': self.bytes_loaded,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'blocked_by_host': dict(self.blocked_by_host),
+        }
+
+    def summary(self) -> str:
+        """One-line human readable summary for the crawler log."""
+        top = ', '.join(f'{k}={v}' for k, v in self.blocked_by_type.most_common(4))
+        return (
+            f"{self.allowed} requests loaded ({self.bytes_loaded / 1024:.0f} KiB), "
+            f"{self.blocked} blocked" + (f" ({top})" if top else '')
+        )
@@ -4,318 +4,919 @@ StreamWest Live Sports Scraper
 Scrapes live stream URLs (and rich metadata) from https://streamwest.cc
 
 How it works:
-1. Uses Playwright (headless browser) to load the /live page and extract ALL
-   metadata from event cards in a single pass:
-   - sport        – e.g. "Football", "Basketball" (from the <h2> section heading)
-   - title        – e.g. "Piast Gliwice vs Motor Lublin"
-   - teams        – [team_a, team_b] parsed from the title (split on " vs ")
-   - thumbnail    – poster image URL for the event
-   - viewer_count – current viewer count (int)
-   - is_live      – True if the event is currently live
-   - streamwest_url – direct link to the StreamWest event page
-2. For each event, loads the event page to find the embedded player iframe URL.
-3. Calls the embedsporty.top /fetch API (pure HTTP, no browser) to get the
-   security token (goat header) and load-balancer hostname.
-4. Constructs the final m3u8 HLS stream URL.
+1. Loads the /live page and extracts every event card (sport, title, teams,
+   thumbnail, viewer_count, is_live, streamwest_url) in one pass; plain
+   HTML first, Chromium only when that misses (cards.py, --extractor).
+2. For each event, finds the embedded player iframe URL on the event page
+   (cached by href in embed_cache.py; unchanged cards are reused from the
+   previous streams.json, see changes.py).
+3. Calls the embedsporty.top /fetch API (fetch_api.py) for the goat token
+   and load-balancer host (lb_selector.py); --lazy-tokens leaves this to
+   resolver.py when a stream is played.
+4. Constructs the final m3u8 HLS stream URL, optionally ranking mirrors
+   (--mirror-streams, mirrors.py) and probing playlists (--hls-probe,
+   hls_probe.py).
+
+Requests go through a per-host governor (governor.py); browser pages come
+from page_pool.py and resource_policy.py. Thumbnails (thumb_cache.py), the
+HLS relay (relay.py), the daemon (daemon.py), metrics (metrics.py) and the
+SQLite sink (sqlite_sink.py) are optional; see --help. cli.py wraps this
+script, and bench/ holds an offline benchmark against fixture sites.
 
 Output: streams.json – ready to consume by the app. Fields per event:
   title, sport, teams, thumbnail, viewer_count, is_live,
-  streamwest_url, embed_url, stream, error
+  streamwest_url, embed_url, stream, error, plus streams, hls,
+  stream_source, embed_wait_ms and resolved_at when those features run
 """
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
+import argparse
 import asyncio
 import json
-import re
-import requests
-from playwright.async_api import async_playwright
+import multiprocessing
+import os
+import queue as queue_module
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import urljoin
 
-BASE_URL = 'https://streamwest.cc'
-EMBED_API = 'https://embedsporty.top/fetch'
+import aiohttp
+from bs4 import BeautifulSoup
 
+from atomic import write_json_atomic
+from cards import CARD_ENGINE, CARD_SCRIPT
+from changes import DEFAULT_MAX_AGE as DEFAULT_REUSE_MAX_AGE
+from changes import DEFAULT_DIFF_FILE, diff_summary, plan_refresh
+from embed_cache import DEFAULT_TTL as DEFAULT_EMBED_CACHE_TTL
+from embed_cache import EmbedCache
+# Token / m3u8 extraction (pure HTTP) lives in fetch_api.py; re-exported here
+# so existing callers of scraper.get_stream_url() keep working.
+from fetch_api import (
+    EMBED_API,
+    HTTP_LIMIT_PER_HOST,
+    USER_AGENT,
+    build_fetch_body,
+    create_http_session,
+    get_stream_url,
+    get_stream_url_async,
+    parse_embed_url,
+)
+from governor import DEFAULT_RETRIES, CircuitOpenError, HostGovernor, stats_summary
+from hls_probe import DEFAULT_BUDGET as DEFAULT_HLS_BUDGET
+from hls_probe import DEFAULT_MODE as DEFAULT_HLS_PROBE
+from hls_probe import MODES as HLS_PROBE_MODES
+from hls_probe import probe_streams
+from lb_selector import DEFAULT_WINDOW as DEFAULT_LB_WINDOW
+from lb_selector import LbSelector
+from metrics import DEFAULT_METRICS_FILE, CrawlMetrics
+from mirrors import DEFAULT_STREAMS as DEFAULT_MIRROR_STREAMS
+from mirrors import discover_mirrors
+from page_pool import DEFAULT_MAX_USES as DEFAULT_PAGE_MAX_USES
+from page_pool import PagePool
+from relay import relay_streams
+from resource_policy import PROFILES, ResourcePolicy
+from sqlite_sink import SqliteSink
+# streams.json helpers live in streams.py (no heavy imports, used by cli.py);
+# re-exported here for existing callers.
+from streams import STREAMS_FILE, is_playable, load_streams, save_streams
+from thumb_cache import DEFAULT_MAX_BYTES as DEFAULT_THUMB_MAX_BYTES
+from thumb_cache import DEFAULT_THUMB_DIR
+from thumb_cache import DEFAULT_WIDTH as DEFAULT_THUMB_WIDTH
+from thumb_cache import ThumbCache
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Token / m3u8 extraction (pure HTTP)
-# ─────────────────────────────────────────────────────────────────────────────
+# Overridable so the crawler can be pointed at the offline stand-in (bench/)
+BASE_URL = os.environ.get('STREAMCRAWLER_BASE_URL', 'https://streamwest.cc').rstrip('/')
 
-def _encode_proto_string(field_num: int, value: str) -> bytes:
-    """Encode a string as a protobuf length-delimited field."""
-    encoded = value.encode('utf-8')
-    tag = (field_num << 3) | 2  # wire type 2
-    return bytes([tag, len(encoded)]) + encoded
+# Number of event pages resolved in parallel (override with --concurrency
+# or the STREAMCRAWLER_CONCURRENCY environment variable).
+DEFAULT_CONCURRENCY = 4
 
+# Processes the event list is split across, each with its own browser
+# (--shards / STREAMCRAWLER_SHARDS); small crawls use fewer, see shard_count().
+DEFAULT_SHARDS = os.cpu_count() or 1
 
-def build_fetch_body(server: str, slug: str, stream_num: str) -> bytes:
-    """Build the protobuf request body for the /fetch endpoint."""
-    return (
-        _encode_proto_string(1, server)
-        + _encode_proto_string(2, slug)
-        + _encode_proto_string(3, stream_num)
-    )
+# Upper bounds (seconds) for the readiness waits. Pages usually become ready
+# much sooner; these only cap how long a slow page can hold up a worker.
+DEFAULT_LIVE_WAIT = 15.0   # /live: event cards rendered
+DEFAULT_EMBED_WAIT = 10.0  # event page: player iframe attached
+
+LIVE_CARD_SELECTOR = CARD_ENGINE.card_selector
+
+# Grids that load more cards on scroll: at most this many scrolls, each
+# ending as soon as new cards appear or after LIVE_SCROLL_WAIT seconds.
+LIVE_SCROLL_ROUNDS = int(os.environ.get('STREAMCRAWLER_LIVE_SCROLLS', 20))
+LIVE_SCROLL_WAIT = float(os.environ.get('STREAMCRAWLER_LIVE_SCROLL_WAIT', 1.0))
+
+# How pages are read: 'auto' parses the plain HTML first and only launches
+# Chromium for what the static parse could not extract; 'static' never
+# launches a browser; 'browser' always uses it.
+EXTRACTORS = ('auto', 'static', 'browser')
+DEFAULT_EXTRACTOR = 'auto'
 
+# Which requests the browser context may load (see resource_policy.py)
+DEFAULT_RESOURCE_PROFILE = 'default'
+
+# href -> embed URL cache, so known events never need their page opened again
+DEFAULT_EMBED_CACHE = 'embed_cache.json'
+
+def event_page_url(href: str) -> str:
+    """Turn a card href like /watch/123/slug into an absolute StreamWest URL."""
+    return BASE_URL + href if href.startswith('/') else href
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Static extractors (plain HTTP + BeautifulSoup, no browser)
+# ─────────────────────────────────────────────────────────────────────────────
 
-def parse_embed_url(embed_url: str) -> tuple[str, str, str] | None:
+# Fields every card must have for the static parse of /live to be trusted;
+# if any card misses one of them the browser extractor is used instead.
+REQUIRED_CARD_FIELDS = ('href', 'title', 'thumbnail')
+
+
+async def _fetch_html(session: aiohttp.ClientSession, url: str,
+                      governor: HostGovernor | None = None) -> str | None:
     """
-    Extract (server, slug, stream_num) from an embed URL like:
-        https://embedsporty.top/embed/echo/some-match-slug-12345/1
+    GET a StreamWest page through the shared session (within the host's
+    limit and with retries when a `governor` is given); None on any failure.
     """
-    m = re.match(r'https?://[^/]+/embed/([^/]+)/(.+)/(\d+)$', embed_url)
-    if not m:
+    async def fetch() -> str:
+        async with session.get(url, headers={'User-Agent': USER_AGENT}) as resp:
+            resp.raise_for_status()
+            return await resp.text()
+
+    try:
+        return await (governor.call(url, fetch) if governor is not None else fetch())
+    except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as e:
+        print(f"  [Warn] static fetch of {url} failed: {e}")
         return None
-    return m.group(1), m.group(2), m.group(3)
 
 
-def get_stream_url(embed_url: str) -> dict:
+def parse_live_cards(html: str) -> list[dict]:
     """
-    Call the embedsporty.top /fetch endpoint and return the m3u8 URL.
-    Returns a dict: { 'goat': ..., 'lb': ..., 'm3u8': ... } or empty dict on failure.
+    Parse the /live page HTML into the same event dicts get_live_events()
+    returns: title, sport, teams, thumbnail, viewer_count, is_live, href.
     """
-    parsed = parse_embed_url(embed_url)
-    if not parsed:
-        return {}
-
-    server, slug, stream_num = parsed
-    body = build_fetch_body(server, slug, stream_num)
-
-    headers = {
-        'User-Agent': (
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-        ),
-        'Content-Type': 'application/octet-stream',
-        'Referer': embed_url,
-        'Origin': 'https://embedsporty.top',
-    }
+    return list(CARD_ENGINE.rows(CARD_ENGINE.parse(html, BASE_URL)).values())
 
-    try:
-        resp = requests.post(EMBED_API, data=body, headers=headers, timeout=15)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        return {'error': str(e)}
 
-    goat_token = resp.headers.get('goat')
-    if not goat_token:
-        return {'error': 'No goat header in response'}
+def parse_embed_iframe(html: str) -> str | None:
+    """Return the src of the first iframe whose src contains 'embed' or 'stream'."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for iframe in soup.find_all('iframe', src=True):
+        src = iframe['src']
+        if 'embed' in src or 'stream' in src:
+            return urljoin(BASE_URL + '/', src)
+    return None
 
-    # The binary response body contains the lb server hostname (e.g. "lb10")
-    body_str = resp.content.decode('utf-8', errors='replace')
-    lb_match = re.search(r'lb\d+', body_str)
-    lb_server = lb_match.group(0) if lb_match else 'lb2'  # fallback
 
-    m3u8 = (
-        f"https://{lb_server}.strmd.top/secure/{goat_token}"
-        f"/{server}/stream/{slug}/{stream_num}/playlist.m3u8"
-    )
-    return {'goat': goat_token, 'lb': lb_server, 'm3u8': m3u8}
+async def get_live_events_static(session: aiohttp.ClientSession,
+                                 governor: HostGovernor | None = None) -> list[dict] | None:
+    """
+    Browser-free variant of get_live_events(). Returns None when the page
+    could not be fetched, or when the parse found no cards or cards missing
+    any of REQUIRED_CARD_FIELDS (e.g. a client-side rendered grid).
+    """
+    html = await _fetch_html(session, f'{BASE_URL}/live', governor)
+    if html is None:
+        return None
+    events = parse_live_cards(html)
+    if not events:
+        return None
+    if any(not e.get(field) for e in events for field in REQUIRED_CARD_FIELDS):
+        return None
+    return events
+
+
+async def get_embed_url_static(session: aiohttp.ClientSession, event_href: str,
+                               governor: HostGovernor | None = None) -> str | None:
+    """Browser-free variant of get_embed_url(); None if the iframe is not in the HTML."""
+    html = await _fetch_html(session, event_page_url(event_href), governor)
+    if html is None:
+        return None
+    return parse_embed_iframe(html)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Playwright helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-async def close_popup(popup):
-    await popup.close()
+class LazyBrowser:
+    """
+    Chromium + browser context that is only launched the first time a
+    caller asks for the context, so a crawl served entirely by the static
+    extractors never starts a browser. If Chromium dies, the next caller
+    gets a freshly launched one. Pages are lent out by a PagePool of
+    `pool_size` pages, each replaced after `page_max_uses` uses.
+    """
+
+    def __init__(self, headless: bool = True, policy: ResourcePolicy | None = None,
+                 pool_size: int = DEFAULT_CONCURRENCY,
+                 page_max_uses: int = DEFAULT_PAGE_MAX_USES):
+        self.headless = headless
+        self.policy = policy
+        self.pool_size = pool_size
+        self.page_max_uses = page_max_uses
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages: PagePool | None = None
+        self._lock = asyncio.Lock()
+        self.launch_ms: list[float] = []   # duration of every launch so far
+        self.crashes = 0
+
+    @property
+    def launched(self) -> bool:
+        return self._browser is not None
+
+    @property
+    def page_pool(self) -> PagePool | None:
+        return self._pages
+
+    async def get_context(self):
+        if self._context is not None:
+            return self._context
+        async with self._lock:
+            if self._context is None:
+                # Imported here: crawls served by the static extractors never need it.
+                from playwright.async_api import async_playwright
+
+                print("Launching Chromium ...")
+                started = time.perf_counter()
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._browser.on('disconnected', self._on_disconnected)
+                context = await self._browser.new_context(user_agent=USER_AGENT)
+                if self.policy is not None:
+                    await self.policy.install(context)
+                pages = PagePool(context, size=self.pool_size, max_uses=self.page_max_uses)
+                await pages.start()
+                self._context, self._pages = context, pages
+                self.launch_ms.append((time.perf_counter() - started) * 1000)
+        return self._context
+
+    async def get_pages(self) -> PagePool:
+        """The page pool of the current context (launching Chromium if needed)."""
+        await self.get_context()
+        return self._pages
 
+    def stats(self) -> dict:
+        """Resource policy counters plus page pool counters, for the crawl metrics."""
+        stats = self.policy.stats() if self.policy is not None else {}
+        if self._pages is not None:
+            stats['pages'] = self._pages.stats()
+        return stats
 
-async def get_live_events(context) -> list[dict]:
+    def _on_disconnected(self, browser):
+        if browser is self._browser:
+            print("  [Warn] Chromium disconnected, will relaunch on next use")
+            self._browser = self._context = self._pages = None
+            self.crashes += 1
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = self._browser = self._context = self._pages = None
+
+
+async def get_live_events(pages: PagePool, max_wait: float = DEFAULT_LIVE_WAIT) -> list[dict]:
     """
     Load the /live page and extract ALL metadata from event cards in one pass.
+    Waits until the first event card is rendered (at most `max_wait` seconds).
     Returns a list of event dicts with: title, sport, teams, thumbnail,
     viewer_count, is_live, href.
     """
-    page = await context.new_page()
-    page.on("popup", close_popup)
+    async with pages.page() as page:
+        return await _extract_live_cards(page, max_wait)
 
-    await page.goto(f'{BASE_URL}/live', wait_until='domcontentloaded')
-    await asyncio.sleep(5)
-
-    events = await page.evaluate('''() => {
-        const results = [];
-        const processed = new Set();
-        
-        // Helper to extract a single card
-        function extractCard(card, sport) {
-            const onclick = card.getAttribute('onclick') || '';
-            const hrefMatch = onclick.match(/location\\.href='([^']+)'/);
-            const href = hrefMatch ? hrefMatch[1] : null;
-            if (!href || processed.has(href)) return null;
-            processed.add(href);
-
-            // Title
-            const titleEl = card.querySelector(
-                '.match-title-compact, [class*="title"], [class*="match-name"], h3, h4'
-            );
-            const title = titleEl
-                ? titleEl.innerText.trim()
-                : card.innerText.split("\\n").filter(Boolean)[0] || 'Unknown';
-
-            // Teams: split on " vs " (case-insensitive)
-            const parts = title.split(/ vs /i);
-            const teams = parts.length >= 2
-                ? [parts[0].trim(), parts.slice(1).join(' vs ').trim()]
-                : [];
-
-            // Poster / thumbnail image
-            const img = card.querySelector('img.match-poster-img, img[class*="poster"], img');
-            const thumbnail = img ? (img.src || img.dataset.src || null) : null;
-
-            // Live indicator
-            const liveEl = card.querySelector(
-                '.live-indicator, [class*="live"], .badge-live'
-            );
-            const is_live = liveEl
-                ? liveEl.innerText.toLowerCase().includes('live')
-                : false;
-
-            // Optional sport override from badge inside card
-            const sportEl = card.querySelector(
-                '[class*="sport-badge"], [class*="sport-tag"], [class*="category"]'
-            );
-            const sport_override = sportEl ? sportEl.innerText.trim() : null;
-
-            // Viewer count (looking for icon + number)
-            const allSpans = Array.from(card.querySelectorAll('span'));
-            let viewer_count = 0;
-            for (const s of allSpans) {
-                const m = s.innerText.match(/(\\d+)/);
-                if (m && (s.innerText.includes('👁️') || s.innerText.includes('👀'))) {
-                    viewer_count = parseInt(m[1]);
-                    break;
-                }
-            }
 
-            return {
-                href,
-                title,
-                sport: sport_override || sport || 'Other',
-                teams,
-                thumbnail,
-                is_live,
-                viewer_count,
-            };
-        }
+async def _extract_live_cards(page, max_wait: float) -> list[dict]:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-        const cards = document.querySelectorAll('.match-card-compact[onclick]');
-        for (const card of cards) {
-            // Find parent grid or section container
-            let el = card;
-            let sportHeading = 'Other';
-            while (el && el.tagName !== 'BODY') {
-                // If we found the grid, look at its previous sibling for h2
-                if (el.classList && (el.classList.contains('matches-grid-compact') || el.className.includes('grid'))) {
-                    let prev = el.previousElementSibling;
-                    while (prev) {
-                        if (prev.tagName === 'H2' || prev.tagName === 'H3') {
-                            sportHeading = prev.innerText.trim();
-                            break;
-                        }
-                        prev = prev.previousElementSibling;
-                    }
-                    if (sportHeading !== 'Other') break;
-                }
-                el = el.parentElement;
-            }
-            const data = extractCard(card, sportHeading);
-            if (data) results.push(data);
-        }
+    await page.goto(f'{BASE_URL}/live', wait_until='domcontentloaded')
+    started = time.perf_counter()
+    try:
+        await page.wait_for_selector(
+            LIVE_CARD_SELECTOR, state='attached', timeout=max_wait * 1000
+        )
+    except PlaywrightTimeoutError:
+        print(f"  [Warn] no event cards after {max_wait:.1f}s, extracting what is there")
+    print(f"  /live ready after {(time.perf_counter() - started) * 1000:.0f} ms")
 
-        return results;
-    }''')
+    # Lazy-loaded / infinitely scrolled grids: after each extraction scroll to
+    # the bottom and read again once cards not yet marked as seen appear.
+    events: dict[str, dict] = {}
+    for round_ in range(LIVE_SCROLL_ROUNDS + 1):
+        CARD_ENGINE.rows(await page.evaluate(CARD_SCRIPT, CARD_ENGINE.config), into=events)
+        if round_ == LIVE_SCROLL_ROUNDS:
+            break
+        await page.evaluate('window.scrollTo(0, document.documentElement.scrollHeight)')
+        try:
+            await page.wait_for_function(
+                '(selector) => document.querySelector(selector) !== null',
+                arg=CARD_ENGINE.unseen_selector, timeout=LIVE_SCROLL_WAIT * 1000,
+            )
+        except PlaywrightTimeoutError:
+            break
+    if round_:
+        print(f"  /live: {len(events)} cards after {round_} scroll(s)")
+    return list(events.values())
 
-    await page.close()
-    return events
 
+async def get_embed_url(pages: PagePool, event_href: str,
+                        max_wait: float = DEFAULT_EMBED_WAIT,
+                        timings: dict | None = None) -> str | None:
+    """
+    Navigate to an event page and extract the video player iframe embed src.
+    Returns as soon as an iframe whose src contains 'embed' or 'stream' is
+    attached, or None after `max_wait` seconds. The time spent waiting is
+    stored in `timings['embed_wait_ms']` when a dict is passed.
+    """
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-async def get_embed_url(context, event_href: str) -> str | None:
-    """Navigate to an event page and extract the video player iframe embed src."""
-    full_url = BASE_URL + event_href if event_href.startswith('/') else event_href
-    page = await context.new_page()
-    page.on("popup", close_popup)
+    full_url = event_page_url(event_href)
+    page = await pages.acquire()
 
+    started = None
     try:
         await page.goto(full_url, wait_until='domcontentloaded')
-        await asyncio.sleep(3)
+        started = time.perf_counter()
 
-        embed_url = await page.evaluate('''() => {
+        handle = await page.wait_for_function('''() => {
             for (const f of document.querySelectorAll('iframe')) {
                 if (f.src && (f.src.includes('embed') || f.src.includes('stream'))) {
                     return f.src;
                 }
             }
             return null;
-        }''')
-        return embed_url
+        }''', timeout=max_wait * 1000)
+        return await handle.json_value()
+    except PlaywrightTimeoutError:
+        return None
     except Exception as e:
         print(f"  [Error] getting embed for {full_url}: {e}")
         return None
     finally:
-        await page.close()
+        if timings is not None and started is not None:
+            timings['embed_wait_ms'] = round((time.perf_counter() - started) * 1000)
+        await pages.release(page)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Main
 # ─────────────────────────────────────────────────────────────────────────────
 
-async def scrape_all_events(headless: bool = True) -> list[dict]:
-    results = []
+@dataclass
+class Crawl:
+    """State shared by all workers of one crawl."""
+    browser: LazyBrowser
+    session: aiohttp.ClientSession
+    embed_wait: float = DEFAULT_EMBED_WAIT
+    extractor: str = DEFAULT_EXTRACTOR
+    embed_cache: EmbedCache | None = None
+    # Store only embed_url and leave the token call to resolver.py at play time
+    lazy_tokens: bool = False
+    # Picks the fastest strmd.top edge for each stream (None: first advertised)
+    lb_selector: LbSelector | None = None
+    # Per-host concurrency limits, retries and circuit breaker (see governor.py)
+    governor: HostGovernor | None = None
+    # Stream numbers per server tried for alternate streams, 0 = none (see mirrors.py)
+    mirror_streams: int = DEFAULT_MIRROR_STREAMS
+    # Servers tried besides the one named by the iframe
+    mirror_servers: tuple[str, ...] = ()
+    # Called with (card index, record) as soon as each event is resolved
+    on_result: Callable[[int, dict], None] | None = None
+    # Per-stage spans, failures and per-event timings (see metrics.py)
+    metrics: CrawlMetrics = field(default_factory=CrawlMetrics)
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            user_agent=(
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-            )
-        )
-
-        print("Fetching live event list ...")
-        events = await get_live_events(context)
-        print(f"Found {len(events)} events.")
 
-        for event in events:
-            title = event['title']
-            href = event['href']
-            streamwest_url = BASE_URL + href if href.startswith('/') else href
-            print(f"\n[{event.get('sport', '?')}] {title}")
+async def resolve_event(crawl: Crawl, event: dict, timings: dict | None = None) -> dict:
+    """
+    Resolve a single /live event into its output record: find the embed
+    iframe on the event page, then fetch the m3u8 URL for it.
+    The embed URL comes from the embed cache when the href was seen before;
+    otherwise the iframe is looked for in the static HTML and the browser is
+    only used if that fails (unless `crawl.extractor` forces one or the other).
+    With `crawl.mirror_streams` above 0 (off by default), the other streams
+    of the slug are then resolved and ranked too (mirrors.py), and the
+    fastest one is used. Lazy-token crawls return before the token step and
+    so never discover mirrors.
+    Stage durations are recorded as spans on `crawl.metrics` and, when a
+    dict is passed, as `timings['embed_source']`, `['embed_ms']`, `['token_ms']`
+    and `['mirrors_ms']`.
+    """
+    title = event['title']
+    href = event['href']
+    streamwest_url = event_page_url(href)
+    label = f"[{event.get('sport', '?')}] {title}"
 
-            embed_url = await get_embed_url(context, href)
+    timings = {} if timings is None else timings
+    metrics = crawl.metrics
+    how = None
+    source = None
+    embed_started = time.perf_counter()
+    cache = crawl.embed_cache
+    embed_url = cache.get(href) if cache is not None else None
+    from_cache = embed_url is not None
+    if from_cache:
+        timings['embed_wait_ms'] = 0
+        how, source = 'cached embed', 'cache'
+    if not embed_url and crawl.extractor != 'browser':
+        with metrics.span('embed_static') as span:
+            embed_url = await get_embed_url_static(crawl.session, href, crawl.governor)
+            if not embed_url:
+                span.fail('No embed found')
+        if embed_url:
+            timings['embed_wait_ms'] = 0
+            how, source = 'static HTML', 'static'
+    if not embed_url and crawl.extractor != 'static':
+        pages = await crawl.browser.get_pages()
+        with metrics.span('embed_browser') as span:
+            embed_url = await get_embed_url(pages, href, max_wait=crawl.embed_wait, timings=timings)
             if not embed_url:
-                print("  [FAIL] No embed iframe found")
-                results.append({
+                span.fail('No embed found')
+        how = f"iframe after {timings.get('embed_wait_ms')} ms"
+        source = 'browser'
+    timings['embed_source'] = source if embed_url else None
+    timings['embed_ms'] = round((time.perf_counter() - embed_started) * 1000, 1)
+    if embed_url and cache is not None and not from_cache:
+        cache.put(href, embed_url)
+    embed_wait_ms = timings.get('embed_wait_ms')
+    if not embed_url:
+        print(f"  [FAIL] {label}: No embed iframe found")
+        return {
+            **event,
+            'streamwest_url': streamwest_url,
+            'embed_url': None,
+            'stream': None,
+            'error': 'No embed found',
+            'embed_wait_ms': embed_wait_ms,
+        }
+
+    if crawl.lazy_tokens:
+        print(f"  [OK] {label}: Embed ready ({how})")
+        return {
+            **event,
+            'streamwest_url': streamwest_url,
+            'embed_url': embed_url,
+            'stream': None,
+            'error': None,
+            'embed_wait_ms': embed_wait_ms,
+        }
+
+    with metrics.span('token') as span:
+        stream_data = await get_stream_url_async(crawl.session, embed_url, crawl.lb_selector,
+                                                 crawl.governor)
+        if not stream_data.get('m3u8'):
+            span.fail(stream_data.get('error', 'Cannot parse embed URL'))
+    timings['token_ms'] = round(span.ms, 1)
+    m3u8 = stream_data.get('m3u8')
+    error = stream_data.get('error')
+    mirrors = None
+    if crawl.mirror_streams > 0:
+        with metrics.span('mirrors') as span:
+            mirrors = await discover_mirrors(crawl.session, embed_url, primary=stream_data,
+                                             selector=crawl.lb_selector, governor=crawl.governor,
+                                             streams=crawl.mirror_streams,
+                                             servers=crawl.mirror_servers)
+            if not mirrors:
+                span.fail('No playable mirror')
+        timings['mirrors_ms'] = round(span.ms, 1)
+        if mirrors:
+            m3u8, error = mirrors[0]['m3u8'], None
+            how += f", {len(mirrors)} mirror(s), fastest {mirrors[0]['ttfb_ms']:.0f} ms"
+    if not m3u8 and from_cache:
+        # The cached mapping may be stale; rediscover it on the next refresh.
+        cache.discard(href)
+    if m3u8:
+        print(f"  [OK] {label}: Stream ready ({how})")
+    else:
+        print(f"  [FAIL] {label}: {error or 'unknown error'}")
+
+    return {
+        **event,                        # title, sport, teams, thumbnail, is_live, viewer_count
+        'streamwest_url': streamwest_url,
+        'embed_url': embed_url,
+        'stream': m3u8,
+        'streams': mirrors,
+        'error': error,
+        'embed_wait_ms': embed_wait_ms,
+    }
+
+
+async def resolve_events(crawl: Crawl, events: list[dict], concurrency: int) -> list[dict]:
+    """
+    Resolve events through a pool of `concurrency` workers.
+    Results are returned in the same order as `events`, regardless of the
+    order in which they finish; `crawl.on_result` sees them in completion
+    order. A failing event yields an error record instead of aborting the
+    other workers.
+    """
+    results: list[dict | None] = [None] * len(events)
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, event in enumerate(events):
+        queue.put_nowait((index, event))
+
+    async def worker():
+        while True:
+            try:
+                index, event = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            timings = {}
+            started = time.perf_counter()
+            try:
+                results[index] = await resolve_event(crawl, event, timings)
+            except Exception as e:
+                print(f"  [Error] resolving {event.get('href')}: {e}")
+                crawl.metrics.fail('event', str(e))
+                results[index] = {
                     **event,
-                    'streamwest_url': streamwest_url,
+                    'streamwest_url': event_page_url(event.get('href') or ''),
                     'embed_url': None,
                     'stream': None,
-                    'error': 'No embed found',
-                })
-                continue
-
-            stream_data = get_stream_url(embed_url)
-            m3u8 = stream_data.get('m3u8')
-            if m3u8:
-                print(f"  [OK] Stream ready")
-            else:
-                print(f"  [FAIL] Failed: {stream_data.get('error', 'unknown error')}")
-
-            results.append({
-                **event,                        # title, sport, teams, thumbnail, is_live, viewer_count
-                'streamwest_url': streamwest_url,
-                'embed_url': embed_url,
-                'stream': m3u8,
-                'error': stream_data.get('error'),
+                    'error': str(e),
+                    'embed_wait_ms': None,
+                }
+            record = results[index]
+            record['resolved_at'] = round(time.time())
+            crawl.metrics.event(index, {
+                'href': event.get('href'),
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+                'embed_source': timings.get('embed_source'),
+                'embed_ms': timings.get('embed_ms'),
+                'token_ms': timings.get('token_ms'),
+                'mirrors_ms': timings.get('mirrors_ms'),
+                'error': record.get('error'),
             })
+            if crawl.on_result is not None:
+                crawl.on_result(index, results[index])
+
+    workers = max(1, min(concurrency, len(events)))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return results
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sharding across processes
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Records cross the process boundary as tuples in these field orders
+# (pickled by multiprocessing), never as JSON strings.
+EVENT_FIELDS = ('href', 'title', 'sport', 'teams', 'thumbnail', 'viewer_count', 'is_live')
+RESULT_FIELDS = ('streamwest_url', 'embed_url', 'stream', 'streams', 'error', 'embed_wait_ms',
+                 'resolved_at')
+
+# A shard process pays for its own interpreter, imports and browser, so it
+# only pays off with enough events to keep its workers busy.
+MIN_EVENTS_PER_SHARD = 25
+
+_SHARD_POLL = 0.5  # seconds between liveness checks while waiting for shards
 
+
+def shard_count(requested: int, events: int) -> int:
+    """Number of shard processes actually used for `events` events (1 = no sharding)."""
+    return max(1, min(requested, events // MIN_EVENTS_PER_SHARD))
+
+
+def _shard_main(shard: int, items: list[tuple], options: dict, queue) -> None:
+    """
+    Entry point of a shard process. `items` are (card index, EVENT_FIELDS
+    tuple, cached embed URL or None); every resolved event is put on
+    `queue` as ('result', index, RESULT_FIELDS tuple), followed by
+    ('done', shard, CrawlMetrics) at the end.
+    """
+    # Progress lines go to stderr: stdout may be carrying NDJSON.
+    sys.stdout = sys.stderr
+    asyncio.run(_resolve_shard(shard, items, options, queue))
+
+
+async def _resolve_shard(shard: int, items: list[tuple], options: dict, queue) -> None:
+    metrics = CrawlMetrics()
+    cache = EmbedCache(None, ttl=options['embed_cache_ttl'])
+    for _, values, embed_url in items:
+        if embed_url:
+            cache.put(values[0], embed_url)
+    browser = LazyBrowser(headless=options['headless'],
+                          policy=ResourcePolicy.from_profile(options['resource_profile']),
+                          pool_size=options['concurrency'],
+                          page_max_uses=options['page_max_uses'])
+    governor = create_governor(options['concurrency'], options['retries'], metrics.retry_in_span)
+    positions = [index for index, _, _ in items]
+
+    def on_result(position: int, record: dict) -> None:
+        queue.put(('result', positions[position], tuple(record.get(f) for f in RESULT_FIELDS)))
+
+    try:
+        async with create_http_session(trace_configs=[metrics.trace_config()]) as session:
+            selector = (LbSelector(session, window=options['lb_window'])
+                        if options['lb_probe'] else None)
+            crawl = Crawl(browser, session, embed_wait=options['embed_wait'],
+                          extractor=options['extractor'], embed_cache=cache,
+                          lazy_tokens=options['lazy_tokens'], lb_selector=selector,
+                          governor=governor, mirror_streams=options['mirror_streams'],
+                          mirror_servers=options['mirror_servers'],
+                          on_result=on_result, metrics=metrics)
+            events = [dict(zip(EVENT_FIELDS, values)) for _, values, _ in items]
+            await resolve_events(crawl, events, options['concurrency'])
+    finally:
+        launched = browser.launched
+        for ms in browser.launch_ms:
+            metrics.observe('browser_launch', ms)
+        if browser.crashes:
+            metrics.retry('browser_launch', browser.crashes)
+        metrics.finish(browser.stats() if launched else None, governor.stats())
+        for record in metrics.events:
+            record['index'] = positions[record['index']]
         await browser.close()
+        queue.put(('done', shard, metrics))
+
 
+async def resolve_sharded(events: list[dict], shards: int, options: dict,
+                          embed_cache: EmbedCache | None, metrics: CrawlMetrics,
+                          on_result: Callable[[int, dict], None] | None = None) -> list[dict]:
+    """
+    Resolve `events` in `shards` processes, each with its own browser, HTTP
+    pool and `options['concurrency']` workers. Cards are dealt round-robin
+    so every shard gets a similar mix; results come back in card order and
+    `on_result` sees them as they arrive. A shard that dies leaves error
+    records for the events it had not reported yet.
+    """
+    cached = [embed_cache.get(e['href']) if embed_cache is not None else None for e in events]
+    items = [[] for _ in range(shards)]
+    for index, event in enumerate(events):
+        items[index % shards].append(
+            (index, tuple(event.get(f) for f in EVENT_FIELDS), cached[index]))
+
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_shard_main, args=(n, items[n], options, queue), daemon=True)
+             for n in range(shards)]
+    for proc in procs:
+        proc.start()
+
+    results: list[dict | None] = [None] * len(events)
+    running = set(range(shards))
+    try:
+        while running:
+            try:
+                message = await asyncio.to_thread(queue.get, True, _SHARD_POLL)
+            except queue_module.Empty:
+                for n in list(running):
+                    if not procs[n].is_alive():
+                        print(f"  [Error] shard {n} exited with code {procs[n].exitcode}")
+                        running.discard(n)
+                continue
+            if message[0] == 'result':
+                _, index, values = message
+                results[index] = {**events[index], **dict(zip(RESULT_FIELDS, values))}
+                if on_result is not None:
+                    on_result(index, results[index])
+            else:
+                _, n, shard_metrics = message
+                metrics.merge(shard_metrics)
+                running.discard(n)
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.kill()
+
+    for index, event in enumerate(events):
+        if results[index] is None:
+            results[index] = {
+                **event,
+                'streamwest_url': event_page_url(event.get('href') or ''),
+                'embed_url': None,
+                'stream': None,
+                'error': 'Shard process died',
+                'embed_wait_ms': None,
+                'resolved_at': round(time.time()),
+            }
+            metrics.fail('event', 'shard died')
+            if on_result is not None:
+                on_result(index, results[index])
+        elif embed_cache is not None:
+            record = results[index]
+            if cached[index] is None and record['embed_url']:
+                embed_cache.put(event['href'], record['embed_url'])
+            elif cached[index] is not None and not record['stream'] and not options['lazy_tokens']:
+                embed_cache.discard(event['href'])
     return results
 
 
-if __name__ == '__main__':
-    events = asyncio.run(scrape_all_events(headless=True))
+async def scrape_all_events(headless: bool = True,
+                            concurrency: int = DEFAULT_CONCURRENCY,
+                            live_wait: float = DEFAULT_LIVE_WAIT,
+                            embed_wait: float = DEFAULT_EMBED_WAIT,
+                            resource_profile: str = DEFAULT_RESOURCE_PROFILE,
+                            page_max_uses: int = DEFAULT_PAGE_MAX_USES,
+                            extractor: str = DEFAULT_EXTRACTOR,
+                            embed_cache: EmbedCache | None = None,
+                            thumb_cache: ThumbCache | None = None,
+                            lazy_tokens: bool = False,
+                            shards: int = 1,
+                            lb_probe: bool = True,
+                            lb_window: float = DEFAULT_LB_WINDOW,
+                            lb_selector: LbSelector | None = None,
+                            retries: int = DEFAULT_RETRIES,
+                            governor: HostGovernor | None = None,
+                            mirror_streams: int = DEFAULT_MIRROR_STREAMS,
+                            mirror_servers: tuple[str, ...] = (),
+                            hls_probe: str = DEFAULT_HLS_PROBE,
+                            hls_budget: float = DEFAULT_HLS_BUDGET,
+                            relay: str | None = None,
+                            browser: LazyBrowser | None = None,
+                            session: aiohttp.ClientSession | None = None,
+                            on_found: Callable[[list[dict]], None] | None = None,
+                            on_result: Callable[[int, dict], None] | None = None,
+                            metrics: CrawlMetrics | None = None,
+                            previous: list[dict] | None = None,
+                            incremental: bool = True,
+                            reuse_max_age: float = DEFAULT_REUSE_MAX_AGE,
+                            on_diff: Callable[[dict], None] | None = None) -> list[dict]:
+    """
+    Crawl /live and resolve every event. A `browser` and `session` passed in
+    (e.g. by the daemon) are reused and left open; otherwise both are created
+    for this crawl and closed at the end; the same goes for `lb_selector`
+    (created when `lb_probe` is set) and `governor` (created with
+    `retries`; pass one in to keep the learned limits across crawls). `on_found` receives the card list
+    from /live and `on_result` each resolved record as soon as it is ready.
+    Timings end up in `metrics`; HTTP bytes are only counted when the session
+    was created with its trace_config() (always the case for an own session).
+    With `shards` > 1 and enough events, the events are resolved in separate
+    processes (resolve_sharded) and `concurrency` applies per shard.
+    Given the `previous` records (e.g. the last streams.json), cards whose
+    href and title are unchanged reuse their record with fresh viewer_count /
+    is_live and skip all page and token work (unless `incremental` is off),
+    and `on_diff` receives the added/removed/updated summary (changes.py).
+    `mirror_streams` / `mirror_servers` control the alternate-stream
+    discovery per event (mirrors.py; off at the default 0 streams and
+    with `lazy_tokens`). With
+    `hls_probe` 'flag' or 'drop', every stream is checked within
+    `hls_budget` seconds once all events are resolved (hls_probe.py).
+    With a `relay` base URL, `stream` points at that HLS relay and the
+    upstream URL moves to `stream_source` (relay.py).
+    With a `thumb_cache`, thumbnails are prefetched once all events are
+    resolved and `thumbnail` points at the local copy (thumb_cache.py).
+    """
+    if metrics is None:
+        metrics = CrawlMetrics()
+    own_browser = browser is None
+    if own_browser:
+        browser = LazyBrowser(headless=headless, policy=ResourcePolicy.from_profile(resource_profile),
+                              pool_size=concurrency, page_max_uses=page_max_uses)
+    own_session = session is None
+    if own_session:
+        session = create_http_session(trace_configs=[metrics.trace_config()])
+    if lb_selector is None and lb_probe:
+        lb_selector = LbSelector(session, window=lb_window)
+    if governor is None:
+        governor = create_governor(concurrency, retries, metrics.retry_in_span)
+    launches_before, crashes_before = len(browser.launch_ms), browser.crashes
+    hls_counts = None
+    relayed = None
 
-    # Group by sport for clean output
-    from collections import defaultdict
+    try:
+        print("Fetching live event list ...")
+        events = None
+        if extractor != 'browser':
+            with metrics.span('live_static') as span:
+                events = await get_live_events_static(session, governor)
+                if events is None:
+                    span.fail('No complete cards in static HTML')
+        if events is None and extractor != 'static':
+            pages = await browser.get_pages()
+            with metrics.span('live_browser') as span:
+                events = await get_live_events(pages, max_wait=live_wait)
+                if not events:
+                    span.fail('No event cards rendered')
+        events = events or []
+        if previous is not None:
+            reused, todo, diff = plan_refresh(previous, events, reuse_max_age,
+                                              lazy_tokens=lazy_tokens, reuse=incremental)
+        else:
+            reused, todo, diff = {}, list(range(len(events))), None
+        pending = [events[i] for i in todo]
+        n_shards = shard_count(shards, len(pending))
+        found = f"Found {len(events)} events"
+        if reused:
+            found += f" ({len(reused)} unchanged, reused)"
+        if n_shards > 1:
+            print(f"{found}. Resolving {len(pending)} in {n_shards} shards "
+                  f"with concurrency={concurrency} each ...")
+        else:
+            print(f"{found}. Resolving {len(pending)} with concurrency={concurrency} ...")
+        if on_found is not None:
+            on_found(events)
+        if on_result is not None:
+            for index, record in reused.items():
+                on_result(index, record)
+        # results of `pending` arrive by position in it; report them by card index
+        on_pending = ((lambda position, record: on_result(todo[position], record))
+                      if on_result is not None else None)
+
+        if not pending:
+            resolved = []
+        elif n_shards > 1:
+            resolved = await resolve_sharded(pending, n_shards, {
+                'headless': headless,
+                'concurrency': concurrency,
+                'embed_wait': embed_wait,
+                'resource_profile': resource_profile,
+                'page_max_uses': page_max_uses,
+                'extractor': extractor,
+                'embed_cache_ttl': embed_cache.ttl if embed_cache is not None else DEFAULT_EMBED_CACHE_TTL,
+                'lazy_tokens': lazy_tokens,
+                'lb_probe': lb_probe,
+                'lb_window': lb_window,
+                'retries': retries,
+                'mirror_streams': mirror_streams,
+                'mirror_servers': mirror_servers,
+            }, embed_cache, metrics, on_pending)
+        else:
+            crawl = Crawl(browser, session, embed_wait=embed_wait, extractor=extractor,
+                          embed_cache=embed_cache, lazy_tokens=lazy_tokens,
+                          lb_selector=lb_selector, governor=governor,
+                          mirror_streams=mirror_streams, mirror_servers=mirror_servers,
+                          on_result=on_pending, metrics=metrics)
+            resolved = await resolve_events(crawl, pending, concurrency)
+        for record in metrics.events:
+            record['index'] = todo[record['index']]
+        results = [reused.get(index) for index in range(len(events))]
+        for position, record in enumerate(resolved):
+            results[todo[position]] = record
+        relay_streams(results, None)  # reused records: probe the upstream URL
+        if hls_probe != 'off' and results:
+            with metrics.span('hls_probe'):
+                hls_counts = await probe_streams(session, results, budget=hls_budget,
+                                                 drop=hls_probe == 'drop', governor=governor)
+        if thumb_cache is not None:
+            with metrics.span('thumbnails'):
+                await thumb_cache.prefetch(session, results)
+        if relay:
+            relayed = relay_streams(results, relay)
+    finally:
+        launched = browser.launched
+        for ms in browser.launch_ms[launches_before:]:
+            metrics.observe('browser_launch', ms)
+        if browser.crashes > crashes_before:
+            metrics.retry('browser_launch', browser.crashes - crashes_before)
+        metrics.finish(browser.stats() if launched else None, governor.stats())
+        if own_browser:
+            await browser.close()
+        if own_session:
+            await session.close()
+        if embed_cache is not None:
+            embed_cache.save()
+
+    if embed_cache is not None:
+        print(f"Embed cache: {embed_cache.summary()}")
+    if thumb_cache is not None:
+        print(f"Thumbnails: {thumb_cache.summary()}")
+    if hls_counts is not None:
+        print("HLS probe: " + (', '.join(f"{n} {status}" for status, n in sorted(hls_counts.items()))
+                               or 'no streams'))
+    if relayed is not None:
+        print(f"Relay: {relayed} streams via {relay}")
+
+    if diff is not None:
+        print(f"Changes: {diff_summary(diff)}")
+        if on_diff is not None:
+            on_diff(diff)
+
+    if not launched:
+        print("Browser not used (static extraction covered every page)")
+    else:
+        if browser.policy is not None:
+            print(f"Resources ({resource_profile}): {browser.policy.summary()}")
+        if browser.page_pool is not None:
+            print(f"Pages: {browser.page_pool.summary()}")
+    if metrics.hosts:
+        print(f"Hosts: {stats_summary(metrics.hosts)}")
+    print(f"Metrics: {metrics.summary()}")
+
+    return results
+
+
+def create_governor(concurrency: int, retries: int = DEFAULT_RETRIES,
+                    on_retry: Callable[[], None] | None = None) -> HostGovernor:
+    """
+    Per-host governor for a crawl with `concurrency` workers: each host starts
+    at that many requests in flight and may grow up to the connection pool's
+    per-host limit. `on_retry` is usually CrawlMetrics.retry_in_span.
+    """
+    return HostGovernor(initial_limit=concurrency,
+                        max_limit=max(concurrency, HTTP_LIMIT_PER_HOST),
+                        retries=retries, on_retry=on_retry)
+
+
+def print_results(events: list[dict]) -> None:
+    """Print the per-sport summary of a crawl."""
     by_sport = defaultdict(list)
     for e in events:
         by_sport[e.get('sport', 'Other')].append(e)
@@ -324,15 +925,375 @@ if __name__ == '__main__':
     for sport, sport_events in by_sport.items():
         print(f"\n  [{sport}]")
         for e in sport_events:
-            status = "[OK]" if e['stream'] else "[FAIL]"
+            status = "[OK]" if is_playable(e) else "[FAIL]"
             teams_str = ' vs '.join(e.get('teams') or [e['title']])
             viewers = e.get('viewer_count', 0)
             live_tag = 'LIVE' if e.get('is_live') else 'Upcoming'
             print(f"    {status} {live_tag}  {teams_str}  ({viewers} viewers)")
 
-    success = sum(1 for e in events if e['stream'])
+    success = sum(1 for e in events if is_playable(e))
     print(f"\n{success}/{len(events)} streams found.")
 
-    with open('streams.json', 'w', encoding='utf-8') as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
-    print("Saved to streams.json")
+
+class NdjsonWriter:
+    """
+    Streams crawl progress as NDJSON, one record per line, flushed immediately:
+      {"type": "start", "total": N}
+      {"type": "event", "index": i, "event": {...}}   (completion order)
+      {"type": "done", "total": N, "ok": k, "diff": {...}}
+    `index` is the card position on /live, so consumers can restore order.
+    """
+
+    def __init__(self, out):
+        self.out = out
+
+    def _write(self, record: dict) -> None:
+        self.out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.out.flush()
+
+    def found(self, events: list[dict]) -> None:
+        self._write({'type': 'start', 'total': len(events)})
+
+    def result(self, index: int, record: dict) -> None:
+        self._write({'type': 'event', 'index': index, 'event': record})
+
+    def done(self, events: list[dict], diff: dict | None = None) -> None:
+        record = {'type': 'done', 'total': len(events),
+                  'ok': sum(1 for e in events if is_playable(e))}
+        if diff is not None:
+            record['diff'] = diff
+        self._write(record)
+
+
+def save_sqlite(events: list[dict], path: str | None) -> None:
+    """Upsert the crawl into the app's SQLite database (see sqlite_sink.py)."""
+    if not path:
+        return
+    sink = SqliteSink(path)
+    try:
+        count = sink.upsert(events)
+    finally:
+        sink.close()
+    print(f"Upserted {count} events into {path}")
+
+
+def save_diff(diff: dict | None, path: str | None = DEFAULT_DIFF_FILE) -> None:
+    """Write the added/removed/updated summary of the last crawl (see changes.py)."""
+    if diff is not None and path:
+        write_json_atomic(path, diff, indent=2, ensure_ascii=False)
+
+
+def crawl_options(args: argparse.Namespace) -> dict:
+    """scrape_all_events() keyword arguments for the parsed command line."""
+    return {
+        'headless': True,
+        'concurrency': args.concurrency,
+        'live_wait': args.live_wait,
+        'embed_wait': args.embed_wait,
+        'resource_profile': args.resource_profile,
+        'page_max_uses': args.page_max_uses,
+        'extractor': args.extractor,
+        'embed_cache': (EmbedCache(args.embed_cache, ttl=args.embed_cache_ttl)
+                        if args.embed_cache else None),
+        'thumb_cache': (ThumbCache(args.thumbs, max_bytes=int(args.thumb_max_mb * 1024 * 1024),
+                                   width=args.thumb_width)
+                        if args.thumbs else None),
+        'lazy_tokens': args.lazy_tokens,
+        'shards': args.shards,
+        'lb_probe': not args.no_lb_probe,
+        'lb_window': args.lb_window,
+        'retries': args.retries,
+        'mirror_streams': args.mirror_streams,
+        'mirror_servers': tuple(s for s in args.mirror_servers.split(',') if s),
+        'hls_probe': args.hls_probe,
+        'hls_budget': args.hls_budget,
+        'relay': args.relay,
+        'incremental': not args.full,
+        'reuse_max_age': args.reuse_max_age,
+    }
+
+
+async def serve_daemon(args: argparse.Namespace) -> None:
+    """
+    Daemon mode: keep one browser and HTTP pool warm across crawls and serve
+    the latest events locally (see daemon.py).
+    """
+    from daemon import CrawlerDaemon
+    from relay import HlsRelay
+    from resolver import StreamResolver, TokenCache
+
+    options = crawl_options(args)
+    options['shards'] = 1  # the point of the daemon is its one warm browser
+    browser = LazyBrowser(headless=options['headless'],
+                          policy=ResourcePolicy.from_profile(args.resource_profile),
+                          pool_size=args.concurrency, page_max_uses=args.page_max_uses)
+    metrics = CrawlMetrics()
+    try:
+        async with create_http_session(trace_configs=[metrics.trace_config()]) as session:
+            selector = LbSelector(session, window=args.lb_window) if options['lb_probe'] else None
+            governor = create_governor(args.concurrency, args.retries, metrics.retry_in_span)
+
+            async def crawl() -> list[dict]:
+                metrics.reset()
+                return await scrape_all_events(browser=browser, session=session,
+                                               lb_selector=selector, governor=governor,
+                                               metrics=metrics,
+                                               previous=daemon.events, on_diff=daemon.set_diff,
+                                               **options)
+
+            def save(events: list[dict]) -> None:
+                save_streams(events)
+                save_sqlite(events, args.sqlite)
+                save_diff(daemon.diff, args.diff)
+                metrics.save(args.metrics, args.metrics_prom)
+
+            daemon = CrawlerDaemon(crawl, interval=args.interval,
+                                   save=save, initial=load_streams(),
+                                   resolver=StreamResolver(session, TokenCache(), selector, governor),
+                                   metrics=metrics,
+                                   relay=HlsRelay(session, governor) if args.relay else None)
+            await daemon.serve(args.host, args.port, args.socket)
+    finally:
+        await browser.close()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Scrape live sports streams from StreamWest.')
+    parser.add_argument(
+        '--concurrency', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_CONCURRENCY', DEFAULT_CONCURRENCY)),
+        help='number of events resolved in parallel '
+             f'(env STREAMCRAWLER_CONCURRENCY, default {DEFAULT_CONCURRENCY})',
+    )
+    parser.add_argument(
+        '--shards', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_SHARDS', DEFAULT_SHARDS)),
+        help='worker processes (each with its own browser) to split the events across; '
+             f'crawls with fewer than {MIN_EVENTS_PER_SHARD} events per shard use fewer '
+             f'(env STREAMCRAWLER_SHARDS, default: CPU count = {DEFAULT_SHARDS}; not used by --daemon)',
+    )
+    parser.add_argument(
+        '--live-wait', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_LIVE_WAIT', DEFAULT_LIVE_WAIT)),
+        help='max seconds to wait for event cards on /live '
+             f'(env STREAMCRAWLER_LIVE_WAIT, default {DEFAULT_LIVE_WAIT:g})',
+    )
+    parser.add_argument(
+        '--embed-wait', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_EMBED_WAIT', DEFAULT_EMBED_WAIT)),
+        help='max seconds to wait for the player iframe on an event page '
+             f'(env STREAMCRAWLER_EMBED_WAIT, default {DEFAULT_EMBED_WAIT:g})',
+    )
+    parser.add_argument(
+        '--resource-profile', choices=sorted(PROFILES),
+        default=os.environ.get('STREAMCRAWLER_RESOURCE_PROFILE', DEFAULT_RESOURCE_PROFILE),
+        help='which requests the browser may load: "default" aborts images, media, '
+             'fonts, ad hosts and the embedded player; "off" loads everything '
+             '(env STREAMCRAWLER_RESOURCE_PROFILE)',
+    )
+    parser.add_argument(
+        '--page-max-uses', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_PAGE_MAX_USES', DEFAULT_PAGE_MAX_USES)),
+        help='times a pooled browser page is reused before it is replaced '
+             f'(env STREAMCRAWLER_PAGE_MAX_USES, default {DEFAULT_PAGE_MAX_USES})',
+    )
+    parser.add_argument(
+        '--extractor', choices=EXTRACTORS,
+        default=os.environ.get('STREAMCRAWLER_EXTRACTOR', DEFAULT_EXTRACTOR),
+        help='"auto" parses plain HTML first and launches Chromium only when needed, '
+             '"static" never launches it, "browser" always does '
+             '(env STREAMCRAWLER_EXTRACTOR)',
+    )
+    parser.add_argument(
+        '--embed-cache', metavar='PATH',
+        default=os.environ.get('STREAMCRAWLER_EMBED_CACHE', DEFAULT_EMBED_CACHE),
+        help='file caching href -> embed URL between runs; "" disables it '
+             f'(env STREAMCRAWLER_EMBED_CACHE, default {DEFAULT_EMBED_CACHE})',
+    )
+    parser.add_argument(
+        '--embed-cache-ttl', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_EMBED_CACHE_TTL', DEFAULT_EMBED_CACHE_TTL)),
+        help='seconds a cached embed URL stays valid '
+             f'(env STREAMCRAWLER_EMBED_CACHE_TTL, default {DEFAULT_EMBED_CACHE_TTL})',
+    )
+    parser.add_argument(
+        '--thumbs', metavar='DIR',
+        default=os.environ.get('STREAMCRAWLER_THUMBS', DEFAULT_THUMB_DIR),
+        help='directory thumbnails are cached in and served from; "" keeps the remote URLs '
+             f'(env STREAMCRAWLER_THUMBS, default {DEFAULT_THUMB_DIR})',
+    )
+    parser.add_argument(
+        '--thumb-width', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_THUMB_WIDTH', DEFAULT_THUMB_WIDTH)),
+        help='downscale wider thumbnails to this width (needs Pillow); 0 keeps them as is '
+             f'(env STREAMCRAWLER_THUMB_WIDTH, default {DEFAULT_THUMB_WIDTH})',
+    )
+    parser.add_argument(
+        '--thumb-max-mb', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_THUMB_MAX_MB', DEFAULT_THUMB_MAX_BYTES / 1024 / 1024)),
+        help='disk budget of the thumbnail cache; least recently used files are evicted '
+             f'(env STREAMCRAWLER_THUMB_MAX_MB, default {DEFAULT_THUMB_MAX_BYTES // 1024 // 1024:d})',
+    )
+    parser.add_argument(
+        '--lazy-tokens', action='store_true',
+        default=os.environ.get('STREAMCRAWLER_LAZY_TOKENS') == '1',
+        help='store only embed_url and skip the /fetch token calls; streams are '
+             'resolved on demand by resolver.py (env STREAMCRAWLER_LAZY_TOKENS=1)',
+    )
+    parser.add_argument(
+        '--no-lb-probe', action='store_true',
+        help='use the first advertised load balancer instead of probing for the fastest one',
+    )
+    parser.add_argument(
+        '--lb-window', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_LB_WINDOW', DEFAULT_LB_WINDOW)),
+        help='seconds a load-balancer latency ranking is reused '
+             f'(env STREAMCRAWLER_LB_WINDOW, default {DEFAULT_LB_WINDOW:g})',
+    )
+    parser.add_argument(
+        '--retries', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_RETRIES', DEFAULT_RETRIES)),
+        help='retries of a request that got a 429, a 5xx or timed out, after a jittered backoff '
+             f'(env STREAMCRAWLER_RETRIES, default {DEFAULT_RETRIES})',
+    )
+    parser.add_argument(
+        '--mirror-streams', type=int,
+        default=int(os.environ.get('STREAMCRAWLER_MIRROR_STREAMS', DEFAULT_MIRROR_STREAMS)),
+        help='stream numbers per server tried as alternate streams of each event, ranked by '
+             'time to the first playlist byte; costs extra /fetch calls per event, ignored '
+             'with --lazy-tokens '
+             f'(env STREAMCRAWLER_MIRROR_STREAMS, default {DEFAULT_MIRROR_STREAMS})',
+    )
+    parser.add_argument(
+        '--mirror-servers', metavar='NAMES',
+        default=os.environ.get('STREAMCRAWLER_MIRROR_SERVERS', ''),
+        help='comma-separated embed servers (e.g. alpha,bravo) tried besides the one in the '
+             'iframe (env STREAMCRAWLER_MIRROR_SERVERS)',
+    )
+    parser.add_argument(
+        '--hls-probe', choices=HLS_PROBE_MODES,
+        default=os.environ.get('STREAMCRAWLER_HLS_PROBE', DEFAULT_HLS_PROBE),
+        help='load every stream\'s playlists after the crawl: "flag" records liveness and '
+             'quality in `hls`, "drop" also replaces dead / stalled streams by the next mirror '
+             f'(env STREAMCRAWLER_HLS_PROBE, default {DEFAULT_HLS_PROBE})',
+    )
+    parser.add_argument(
+        '--hls-budget', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_HLS_BUDGET', DEFAULT_HLS_BUDGET)),
+        help='seconds the whole HLS probe may take; unfinished probes are left "unknown" '
+             f'(env STREAMCRAWLER_HLS_BUDGET, default {DEFAULT_HLS_BUDGET:g})',
+    )
+    parser.add_argument(
+        '--relay', metavar='URL', default=os.environ.get('STREAMCRAWLER_RELAY_URL'),
+        help='base URL of an HLS relay (relay.py) that `stream` should point at, keeping the '
+             'upstream URL in `stream_source`; with --daemon the daemon serves the relay itself '
+             '(env STREAMCRAWLER_RELAY_URL)',
+    )
+    parser.add_argument(
+        '--full', action='store_true',
+        help='re-resolve every card instead of reusing unchanged records from streams.json',
+    )
+    parser.add_argument(
+        '--reuse-max-age', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_REUSE_MAX_AGE', DEFAULT_REUSE_MAX_AGE)),
+        help='seconds a previously resolved stream URL may be carried over to the next crawl '
+             f'(env STREAMCRAWLER_REUSE_MAX_AGE, default {DEFAULT_REUSE_MAX_AGE})',
+    )
+    parser.add_argument(
+        '--diff', metavar='PATH', default=os.environ.get('STREAMCRAWLER_DIFF', DEFAULT_DIFF_FILE),
+        help='added/removed/updated summary of each crawl; "" disables it '
+             f'(env STREAMCRAWLER_DIFF, default {DEFAULT_DIFF_FILE})',
+    )
+    parser.add_argument(
+        '--sqlite', metavar='PATH', default=os.environ.get('STREAMCRAWLER_SQLITE'),
+        help='also upsert the events into the sports_events table of this SQLite '
+             'database, e.g. ../data/solari.db (env STREAMCRAWLER_SQLITE)',
+    )
+    parser.add_argument(
+        '--metrics', metavar='PATH',
+        default=os.environ.get('STREAMCRAWLER_METRICS', DEFAULT_METRICS_FILE),
+        help='JSON sidecar with per-stage timings, failures, retries and bytes; "" disables it '
+             f'(env STREAMCRAWLER_METRICS, default {DEFAULT_METRICS_FILE})',
+    )
+    parser.add_argument(
+        '--metrics-prom', metavar='PATH', default=os.environ.get('STREAMCRAWLER_METRICS_PROM'),
+        help='also write the aggregates as a Prometheus textfile, e.g. for the node_exporter '
+             'textfile collector (env STREAMCRAWLER_METRICS_PROM)',
+    )
+    parser.add_argument(
+        '--ndjson', action='store_true',
+        help='stream one JSON record per event on stdout as it resolves '
+             '(progress messages go to stderr)',
+    )
+    daemon = parser.add_argument_group('daemon mode')
+    daemon.add_argument(
+        '--daemon', action='store_true',
+        help='keep running: crawl on a schedule and serve events on a local endpoint',
+    )
+    daemon.add_argument(
+        '--host', default=os.environ.get('STREAMCRAWLER_HOST', '127.0.0.1'),
+        help='address to listen on (env STREAMCRAWLER_HOST, default 127.0.0.1)',
+    )
+    daemon.add_argument(
+        '--port', type=int, default=int(os.environ.get('STREAMCRAWLER_PORT', 8790)),
+        help='TCP port to listen on (env STREAMCRAWLER_PORT, default 8790)',
+    )
+    daemon.add_argument(
+        '--socket', metavar='PATH', default=os.environ.get('STREAMCRAWLER_SOCKET'),
+        help='listen on this Unix socket instead of TCP (env STREAMCRAWLER_SOCKET)',
+    )
+    daemon.add_argument(
+        '--interval', type=float,
+        default=float(os.environ.get('STREAMCRAWLER_INTERVAL', 300)),
+        help='seconds between scheduled crawls (env STREAMCRAWLER_INTERVAL, default 300)',
+    )
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    if args.shards < 1:
+        parser.error('--shards must be at least 1')
+    if args.retries < 0:
+        parser.error('--retries must not be negative')
+    if args.mirror_streams < 0:
+        parser.error('--mirror-streams must not be negative')
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run one crawl (or the daemon) for the command line `argv`; also `cli.py crawl`."""
+    args = parse_args(argv)
+    if args.daemon:
+        try:
+            asyncio.run(serve_daemon(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    metrics = CrawlMetrics()
+    changes = {}
+    options = dict(crawl_options(args), metrics=metrics,
+                   previous=load_streams(), on_diff=changes.update)
+    if args.ndjson:
+        # stdout carries only NDJSON records; human-readable output goes to stderr
+        ndjson = NdjsonWriter(sys.stdout)
+        sys.stdout = sys.stderr
+        events = asyncio.run(scrape_all_events(
+            **options, on_found=ndjson.found, on_result=ndjson.result,
+        ))
+        save_streams(events)
+        save_sqlite(events, args.sqlite)
+        save_diff(changes, args.diff)
+        metrics.save(args.metrics, args.metrics_prom)
+        ndjson.done(events, changes)
+    else:
+        events = asyncio.run(scrape_all_events(**options))
+        print_results(events)
+        save_streams(events)
+        save_sqlite(events, args.sqlite)
+        save_diff(changes, args.diff)
+        metrics.save(args.metrics, args.metrics_prom)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
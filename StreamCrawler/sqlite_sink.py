@@ -0,0 +1,91 @@
+"""
+SQLite sink for crawl results.
+==============================
+Upserts every crawled event into the `sports_events` table of the app's
+SQLite database (data/solari.db, see src/server/db/schema.ts), keyed by
+href, so the server can answer filtered / paginated queries and keep
+history instead of parsing the whole streams.json:
+
+  - the database is switched to WAL mode, so the server keeps reading
+    while a crawl writes;
+  - one transaction per crawl; rows of events that vanished from /live are
+    kept (history) and recognisable by an older `last_seen`;
+  - sport, is_live, viewer_count and last_seen are indexed.
+
+The table is created here if the Drizzle migration has not run yet; both
+use the same DDL (drizzle/0002_sports_events.sql).
+"""
+import json
+import sqlite3
+import time
+
+TABLE = 'sports_events'
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS `{TABLE}` (
+  `href` text PRIMARY KEY NOT NULL,
+  `title` text NOT NULL,
+  `sport` text,
+  `teams` text,
+  `thumbnail` text,
+  `viewer_count` integer DEFAULT 0,
+  `is_live` integer DEFAULT false,
+  `streamwest_url` text,
+  `embed_url` text,
+  `stream` text,
+  `error` text,
+  `embed_wait_ms` integer,
+  `resolved_at` integer,
+  `first_seen` integer NOT NULL,
+  `last_seen` integer NOT NULL
+);
+CREATE INDEX IF NOT EXISTS `sports_events_sport_idx` ON `{TABLE}` (`sport`);
+CREATE INDEX IF NOT EXISTS `sports_events_is_live_idx` ON `{TABLE}` (`is_live`);
+CREATE INDEX IF NOT EXISTS `sports_events_viewer_count_idx` ON `{TABLE}` (`viewer_count`);
+CREATE INDEX IF NOT EXISTS `sports_events_last_seen_idx` ON `{TABLE}` (`last_seen`);
+'''
+
+COLUMNS = ('href', 'title', 'sport', 'teams', 'thumbnail', 'viewer_count', 'is_live',
+           'streamwest_url', 'embed_url', 'stream', 'error', 'embed_wait_ms', 'resolved_at')
+
+_UPSERT = (
+    f"INSERT INTO `{TABLE}` ({', '.join(COLUMNS)}, first_seen, last_seen) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?, ?) "
+    f"ON CONFLICT(href) DO UPDATE SET "
+    + ', '.join(f'{c} = excluded.{c}' for c in COLUMNS if c != 'href')
+    + ', last_seen = excluded.last_seen'
+)
+
+
+def _row(event: dict, seen: int) -> tuple:
+    values = []
+    for column in COLUMNS:
+        value = event.get(column)
+        if column == 'teams':
+            value = json.dumps(value or [], ensure_ascii=False)
+        elif column == 'is_live':
+            value = int(bool(value))
+        elif column == 'viewer_count':
+            value = int(value or 0)
+        values.append(value)
+    return (*values, seen, seen)
+
+
+class SqliteSink:
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def upsert(self, events: list[dict], seen: float | None = None) -> int:
+        """Insert or update `events` (those with an href) in one transaction; returns the count."""
+        seen = int(time.time() if seen is None else seen)
+        rows = [_row(e, seen) for e in events if e.get('href')]
+        with self.conn:
+            self.conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,33 @@
+"""
+streams.json
+============
+Reading and writing the crawl output, kept free of the crawler's heavy
+imports (aiohttp, BeautifulSoup, Playwright) so lightweight commands such
+as `cli.py list` can use it.
+"""
+import json
+
+from atomic import write_json_atomic
+
+STREAMS_FILE = 'streams.json'
+
+
+def is_playable(event: dict) -> bool:
+    """True if the event has a stream, or an embed URL to resolve one from."""
+    return bool(event.get('stream') or (event.get('embed_url') and not event.get('error')))
+
+
+def save_streams(events: list[dict], path: str = STREAMS_FILE) -> None:
+    """Write streams.json atomically so concurrent readers never see a partial file."""
+    write_json_atomic(path, events, indent=2, ensure_ascii=False)
+    print(f"Saved to {path}")
+
+
+def load_streams(path: str = STREAMS_FILE) -> list[dict]:
+    """Previously saved events, or [] if there is no readable streams.json."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return events if isinstance(events, list) else []
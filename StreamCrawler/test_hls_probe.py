@@ -0,0 +1,56 @@
+"""
+Test probe_streams(drop=True) replacing a dead stream by its next mirror,
+with HlsProber.probe replaced by canned statuses (no network).
+"""
+import asyncio
+
+import hls_probe
+from hls_probe import probe_streams
+
+PRIMARY_EMBED = 'https://embedsporty.top/embed/alpha/some-match/1'
+MIRROR_EMBED = 'https://mirror-embed.example/embed/bravo/some-match/2'
+PRIMARY_M3U8 = 'https://lb2.strmd.top/secure/abc/alpha/stream/some-match/1/playlist.m3u8'
+MIRROR_M3U8 = 'https://lb5.strmd.top/secure/def/bravo/stream/some-match/2/playlist.m3u8'
+
+
+def run_probe(monkeypatch, statuses: dict, record: dict) -> tuple[dict, list]:
+    probed = []
+
+    async def probe(self, m3u8, referer=None):
+        probed.append((m3u8, referer))
+        return {'status': statuses[m3u8]}
+
+    monkeypatch.setattr(hls_probe.HlsProber, 'probe', probe)
+    counts = asyncio.run(probe_streams(None, [record], budget=5, drop=True))
+    return counts, probed
+
+
+def test_dead_stream_is_replaced_with_the_mirror_embed(monkeypatch):
+    record = {
+        'embed_url': PRIMARY_EMBED,
+        'stream': PRIMARY_M3U8,
+        'stream_source': PRIMARY_M3U8,
+        'streams': [
+            {'embed_url': PRIMARY_EMBED, 'm3u8': PRIMARY_M3U8, 'ttfb_ms': 10.0},
+            {'embed_url': MIRROR_EMBED, 'm3u8': MIRROR_M3U8, 'ttfb_ms': 20.0},
+        ],
+    }
+    counts, probed = run_probe(monkeypatch, {PRIMARY_M3U8: 'dead', MIRROR_M3U8: 'live'}, record)
+
+    assert counts == {'live': 1}
+    assert record['stream'] == MIRROR_M3U8
+    assert record['embed_url'] == MIRROR_EMBED
+    assert 'stream_source' not in record
+    assert [m['m3u8'] for m in record['streams']] == [MIRROR_M3U8]
+    # the mirror is probed with its own embed as the Referer
+    assert probed == [(PRIMARY_M3U8, PRIMARY_EMBED), (MIRROR_M3U8, MIRROR_EMBED)]
+
+
+def test_dead_stream_without_mirrors_is_flagged(monkeypatch):
+    record = {'embed_url': PRIMARY_EMBED, 'stream': PRIMARY_M3U8, 'streams': None}
+    counts, _ = run_probe(monkeypatch, {PRIMARY_M3U8: 'dead'}, record)
+
+    assert counts == {'dead': 1}
+    assert record['stream'] is None
+    assert record['embed_url'] == PRIMARY_EMBED
+    assert record['error'] == 'Stream dead'
@@ -0,0 +1,247 @@
+"""
+Local thumbnail cache.
+======================
+Every card's `thumbnail` points at streamed.pk's image proxy, so without a
+cache each view of the Sports page downloads every poster again. After a
+crawl, ThumbCache.prefetch() downloads the thumbnails concurrently into a
+local directory and rewrites each event's `thumbnail` to the server route
+that serves them (THUMB_URL_PREFIX); the remote URL is kept in
+`thumbnail_source`.
+
+  - files are content-addressed (sha256 of the stored bytes), so posters
+    shared by several events are stored once;
+  - with Pillow installed, images wider than `width` are downscaled to the
+    card size and stored as WebP; without it the original bytes are kept;
+  - a source URL whose file is still on disk is never fetched again;
+  - the directory is kept under `max_bytes`, least recently used files
+    first (index.json records source URL -> file, size and last use);
+  - an image that cannot be fetched or written (e.g. a full disk) keeps
+    its remote URL;
+  - the counters in summary() cover the last prefetch() only, so a
+    long-lived cache (daemon.py) reports per crawl.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+
+from atomic import write_json_atomic
+
+try:
+    from PIL import Image
+except ImportError:  # optional: store thumbnails as downloaded
+    Image = None
+
+DEFAULT_THUMB_DIR = 'thumbs'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_WIDTH = 480           # 2x the ~240px wide cards of the Sports grid; 0 keeps the size
+DEFAULT_CONCURRENCY = 16
+FETCH_TIMEOUT = 15            # seconds per image
+WEBP_QUALITY = 80
+THUMB_URL_PREFIX = '/api/sports/thumbs/'
+INDEX_FILE = 'index.json'
+
+_EXTENSIONS = {'image/webp': '.webp', 'image/jpeg': '.jpg', 'image/png': '.png',
+               'image/gif': '.gif', 'image/avif': '.avif'}
+
+
+def downscale(data: bytes, width: int) -> tuple[bytes, str] | None:
+    """Re-encode `data` as WebP at most `width` pixels wide; None if Pillow can't (or needn't)."""
+    if Image is None or width <= 0:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= width:
+                return None
+            img.thumbnail((width, width * img.height // img.width))
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+            out = io.BytesIO()
+            img.save(out, 'WEBP', quality=WEBP_QUALITY, method=4)
+    except Exception:
+        return None
+    return out.getvalue(), '.webp'
+
+
+class ThumbCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 width: int = DEFAULT_WIDTH, concurrency: int = DEFAULT_CONCURRENCY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.width = width
+        self.concurrency = max(1, concurrency)
+        self.reset_counts()
+        self._entries: dict[str, dict] = {}   # source URL -> {file, size, stored_at, last_used}
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def reset_counts(self) -> None:
+        """Zero the per-crawl counters reported by summary()."""
+        self.hits = 0
+        self.fetched = 0
+        self.failed = 0
+        self.evicted = 0
+        self.saved_bytes = 0          # bytes saved by downscaling
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def load(self) -> None:
+        """Read index.json, dropping entries whose file is gone."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self._entries = {
+                url: entry for url, entry in data.items()
+                if isinstance(entry, dict) and entry.get('file')
+                and os.path.isfile(os.path.join(self.directory, entry['file']))
+            }
+
+    def lookup(self, url: str) -> str | None:
+        """Cached file name for `url`, or None if it has to be fetched."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        if not os.path.isfile(os.path.join(self.directory, entry['file'])):
+            del self._entries[url]
+            self._dirty = True
+            return None
+        entry['last_used'] = time.time()
+        self._dirty = True
+        return entry['file']
+
+    def _store(self, url: str, data: bytes, content_type: str | None) -> str:
+        scaled = downscale(data, self.width)
+        if scaled is not None and len(scaled[0]) < len(data):
+            self.saved_bytes += len(data) - len(scaled[0])
+            data, ext = scaled
+        else:
+            ext = _EXTENSIONS.get((content_type or '').split(';')[0].strip(), '.img')
+        name = hashlib.sha256(data).hexdigest() + ext
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            fd, tmp = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        now = time.time()
+        self._entries[url] = {'file': name, 'size': len(data), 'stored_at': now, 'last_used': now}
+        self._dirty = True
+        return name
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str,
+                     semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)) as resp:
+                    if resp.status != 200:
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history,
+                                                          status=resp.status)
+                    data = await resp.read()
+                    content_type = resp.headers.get('Content-Type')
+            except Exception as e:
+                self.failed += 1
+                print(f"  [Warn] thumbnail {url}: {e}")
+                return
+        # decoding / resizing is CPU work; keep it off the event loop
+        try:
+            await asyncio.to_thread(self._store, url, data, content_type)
+        except OSError as e:
+            self.failed += 1
+            print(f"  [Warn] thumbnail {url}: cannot store: {e}")
+            return
+        self.fetched += 1
+
+    async def prefetch(self, session: aiohttp.ClientSession, events: list[dict]) -> None:
+        """
+        Make sure every event's thumbnail is cached and point `thumbnail` at
+        the local copy. Events whose image could not be fetched keep the
+        remote URL, as do those evicted again because the budget is smaller
+        than the crawl's thumbnails.
+        """
+        self.reset_counts()
+        by_url: dict[str, list[dict]] = {}
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            source = event.get('thumbnail_source') or event.get('thumbnail')
+            if source and not source.startswith(THUMB_URL_PREFIX):
+                by_url.setdefault(source, []).append(event)
+
+        missing = []
+        for url in by_url:
+            if self.lookup(url) is not None:
+                self.hits += 1
+            else:
+                missing.append(url)
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*(self._fetch(session, url, semaphore) for url in missing))
+        try:
+            self.save()
+        except OSError as e:
+            print(f"  [Warn] thumbnail index: {e}")  # still dirty, retried next crawl
+
+        for url, group in by_url.items():
+            entry = self._entries.get(url)
+            for event in group:
+                event['thumbnail_source'] = url
+                event['thumbnail'] = THUMB_URL_PREFIX + entry['file'] if entry else url
+
+    def _evict(self) -> None:
+        """Delete least recently used files until the directory fits in max_bytes."""
+        files: dict[str, dict] = {}   # file -> {size, last_used, urls}
+        for url, entry in self._entries.items():
+            info = files.setdefault(entry['file'], {'size': entry.get('size', 0),
+                                                    'last_used': 0, 'urls': []})
+            info['last_used'] = max(info['last_used'], entry.get('last_used', 0))
+            info['urls'].append(url)
+        total = sum(info['size'] for info in files.values())
+        for name in sorted(files, key=lambda n: files[n]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            for url in files[name]['urls']:
+                del self._entries[url]
+            total -= files[name]['size']
+            self.evicted += 1
+
+    def save(self) -> None:
+        """Enforce the disk budget and write index.json atomically."""
+        if not self._dirty:
+            return
+        self._evict()
+        write_json_atomic(self.index_path, self._entries)
+        self._dirty = False
+
+    def size(self) -> int:
+        return sum({e['file']: e.get('size', 0) for e in self._entries.values()}.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        return (f"{self.hits} cached, {self.fetched} fetched, {self.failed} failed, "
+                f"{self.evicted} evicted, {self.size() / 1e6:.1f} MB on disk"
+                + (f", {self.saved_bytes / 1e6:.1f} MB saved by downscaling" if self.saved_bytes else ''))
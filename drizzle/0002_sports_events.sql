@@ -0,0 +1,25 @@
+CREATE TABLE IF NOT EXISTS `sports_events` (
+  `href` text PRIMARY KEY NOT NULL,
+  `title` text NOT NULL,
+  `sport` text,
+  `teams` text,
+  `thumbnail` text,
+  `viewer_count` integer DEFAULT 0,
+  `is_live` integer DEFAULT false,
+  `streamwest_url` text,
+  `embed_url` text,
+  `stream` text,
+  `error` text,
+  `embed_wait_ms` integer,
+  `resolved_at` integer,
+  `first_seen` integer NOT NULL,
+  `last_seen` integer NOT NULL
+);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `sports_events_sport_idx` ON `sports_events` (`sport`);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `sports_events_is_live_idx` ON `sports_events` (`is_live`);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `sports_events_viewer_count_idx` ON `sports_events` (`viewer_count`);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `sports_events_last_seen_idx` ON `sports_events` (`last_seen`);
@@ -0,0 +1,236 @@
+"""
+Export UI assets at display sizes, in several formats, plus a sprite atlas.
+==========================================================================
+Reads the transparent images written by scripts/remove_bg.py (the ones
+listed in buttons_assets/generated/transparent/.manifest.json, or every
+PNG / WebP of --input-dir when it has no manifest) and writes to
+buttons_assets/dist/:
+
+  <name>@1x.png / .webp / .avif    fitted into the 1x box of its target
+  <name>@2x.png / .webp / .avif    twice the 1x dimensions, capped at the
+                                   source resolution (never upscaled)
+
+Assets are exported by a pool of worker processes (--workers). Each source
+is decoded once; every size and format is produced from that one decoded
+image. PNG is optimized, WebP is lossless, AVIF (when Pillow has AVIF
+support) is written at quality 100 with 4:4:4 chroma, as Pillow cannot
+request strictly lossless AVIF.
+
+With --atlas the taskbar icons are additionally packed into one sprite
+sheet per scale (taskbar-atlas@1x|2x.<fmt>) and taskbar-atlas.json, which
+maps each icon name to its x, y, w, h in 1x pixels (2x is the same layout
+doubled, so it is only written when every icon has a full 2x rendering).
+
+    python scripts/export_assets.py --atlas --workers 4
+"""
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, features
+
+from remove_bg import MANIFEST_FILE, OUTPUT_DIR as INPUT_DIR, load_manifest
+
+OUTPUT_DIR = "buttons_assets/dist"
+SCALES = (1, 2)
+FORMATS = ("png", "webp", "avif")
+
+# (file name pattern, 1x box in CSS pixels); the first match wins. Taskbar
+# icons render at most 110px (src/styles/layout.css, .taskbar-icon-image).
+TARGETS = (
+    ("taskbar_*", 110),
+    ("quick_preview_frame*", 480),
+    ("*", 450),
+)
+ATLAS_PATTERN = "taskbar_*"
+ATLAS_NAME = "taskbar-atlas"
+ATLAS_MAX_WIDTH = 512   # 1x pixels per shelf
+ATLAS_PADDING = 2       # 1x pixels between icons, so filtering never bleeds
+
+
+def target_box(name):
+    for pattern, box in TARGETS:
+        if fnmatch.fnmatch(name, pattern):
+            return box
+    return None
+
+
+def find_sources(input_dir):
+    """
+    Map asset name -> source path: the outputs recorded in remove_bg's
+    manifest, else every image of `input_dir` (PNG preferred over WebP).
+    """
+    manifest = load_manifest(os.path.join(input_dir, MANIFEST_FILE))
+    if manifest:
+        paths = (os.path.join(input_dir, filename) for filename in manifest)
+        return dict(sorted(
+            (os.path.splitext(os.path.basename(path))[0], path)
+            for path in paths if os.path.exists(path)
+        ))
+    sources = {}
+    for ext in ("webp", "png"):
+        for path in glob.glob(os.path.join(input_dir, f"*.{ext}")):
+            sources[os.path.splitext(os.path.basename(path))[0]] = path
+    return dict(sorted(sources.items()))
+
+
+def fit(size, box):
+    """`size` scaled down (never up) to fit a box x box square."""
+    width, height = size
+    scale = min(1.0, box / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def available_formats(formats):
+    if "avif" in formats and not features.check("avif"):
+        print("  [Warn] Pillow has no AVIF support; skipping .avif")
+        formats = tuple(f for f in formats if f != "avif")
+    return formats
+
+
+def save_image(image, path, fmt):
+    if fmt == "png":
+        image.save(path, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(path, "WEBP", lossless=True, quality=100, method=6)
+    elif fmt == "avif":
+        image.save(path, "AVIF", quality=100, subsampling="4:4:4", speed=4)
+    else:
+        raise ValueError(f"unknown format {fmt}")
+
+
+def render_scales(source, box):
+    """Decode `source` once and return {scale: resized RGBA image}, never upscaled."""
+    with Image.open(source) as img:
+        img = img.convert("RGBA")
+        rendered = {}
+        for scale in SCALES:
+            size = fit(img.size, box * scale)
+            rendered[scale] = img if size == img.size else img.resize(size, Image.Resampling.LANCZOS)
+        return rendered
+
+
+def export_asset(name, source, output_dir, formats, keep=False):
+    """
+    Runs in a worker: write every size / format of one asset. Returns
+    ({scale: size}, bytes written, {scale: image} if `keep` else None).
+    """
+    rendered = render_scales(source, target_box(name))
+    written = 0
+    for scale, image in rendered.items():
+        for fmt in formats:
+            path = os.path.join(output_dir, f"{name}@{scale}x.{fmt}")
+            save_image(image, path, fmt)
+            written += os.path.getsize(path)
+    sizes = {scale: image.size for scale, image in rendered.items()}
+    return sizes, written, rendered if keep else None
+
+
+def pack(sizes):
+    """Shelf-pack {name: (w, h)} into ATLAS_MAX_WIDTH; returns (frames, width, height)."""
+    frames = {}
+    x = y = shelf_height = width = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: -item[1][1]):
+        if x and x + w > ATLAS_MAX_WIDTH:
+            x, y = 0, y + shelf_height + ATLAS_PADDING
+            shelf_height = 0
+        frames[name] = {"x": x, "y": y, "w": w, "h": h}
+        x += w + ATLAS_PADDING
+        width = max(width, x - ATLAS_PADDING)
+        shelf_height = max(shelf_height, h)
+    return frames, width, y + shelf_height
+
+
+def build_atlas(icons, output_dir, formats):
+    """Pack {name: {scale: image}} into one sheet per scale plus the JSON manifest."""
+    sizes = {name: rendered[1].size for name, rendered in icons.items()}
+    frames, width, height = pack(sizes)
+    images = {}
+    for scale in SCALES:
+        capped = [name for name, frame in frames.items()
+                  if icons[name][scale].size != (frame["w"] * scale, frame["h"] * scale)]
+        if capped:
+            print(f"  [Warn] no {scale}x atlas: {', '.join(capped)} smaller than {scale}x at the source")
+            continue
+        sheet = Image.new("RGBA", (width * scale, height * scale), (0, 0, 0, 0))
+        for name, frame in frames.items():
+            sheet.paste(icons[name][scale], (frame["x"] * scale, frame["y"] * scale))
+        images[f"{scale}x"] = {}
+        for fmt in formats:
+            filename = f"{ATLAS_NAME}@{scale}x.{fmt}"
+            save_image(sheet, os.path.join(output_dir, filename), fmt)
+            images[f"{scale}x"][fmt] = filename
+    manifest = {"width": width, "height": height, "images": images, "frames": frames}
+    with open(os.path.join(output_dir, f"{ATLAS_NAME}.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest
+
+
+def export_assets(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, formats=FORMATS, atlas=False,
+                  workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    formats = available_formats(formats)
+    sources = find_sources(input_dir)
+    print(f"Exporting {len(sources)} assets at {', '.join(f'{s}x' for s in SCALES)} "
+          f"as {', '.join(formats)} ...")
+    started = time.perf_counter()
+    icons = {}
+    failures = []
+    total_in = total_out = 0
+    if sources:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(sources)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(export_asset, name, source, output_dir, formats,
+                            atlas and fnmatch.fnmatch(name, ATLAS_PATTERN)): (name, source)
+                for name, source in sources.items()
+            }
+            for future in as_completed(futures):
+                name, source = futures[future]
+                try:
+                    sizes, written, rendered = future.result()
+                except Exception as e:
+                    failures.append((name, f"{type(e).__name__}: {e}"))
+                    print(f"  [Error] {name}: {e}")
+                    continue
+                total_in += os.path.getsize(source)
+                total_out += written
+                if rendered is not None:
+                    icons[name] = rendered
+                print(f"  [OK] {name} -> " + ", ".join(f"{w}x{h} @{scale}x" for scale, (w, h) in sizes.items()))
+
+    if atlas and icons:
+        manifest = build_atlas(icons, output_dir, formats)
+        print(f"Atlas: {len(manifest['frames'])} icons in "
+              f"{manifest['width']}x{manifest['height']} @1x ({ATLAS_NAME}.json)")
+
+    print(f"Done in {time.perf_counter() - started:.1f}s: {total_in / 1e6:.1f} MB of sources -> "
+          f"{total_out / 1e6:.2f} MB of variants, {len(failures)} failed")
+    for name, error in failures:
+        print(f"  {name}: {error}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export UI assets at 1x/2x in several formats.")
+    parser.add_argument("--input-dir", default=INPUT_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--atlas", action="store_true",
+                        help=f"also pack the {ATLAS_PATTERN} icons into a sprite atlas")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    failed = export_assets(args.input_dir, args.output_dir, tuple(args.formats), atlas=args.atlas,
+                           workers=args.workers)
+    sys.exit(1 if failed else 0)
@@ -1,28 +1,179 @@
-import os
+"""
+Remove the background of the generated button assets.
+=====================================================
+Reads buttons_assets/generated/*.png and writes transparent copies to
+buttons_assets/generated/transparent/.
+
+  - images are processed by a pool of worker processes (--workers); each
+    worker creates one rembg session, so the model is loaded once per
+    worker instead of once per image;
+  - a manifest (transparent/.manifest.json) records the sha256 of every
+    source image and the parameters it was processed with; unchanged
+    images whose output still exists are skipped (--force redoes all);
+  - failures are collected and listed at the end, and make the script
+    exit with status 1.
+
+    python scripts/remove_bg.py --workers 4
+"""
+import argparse
 import glob
-from rembg import remove
-from PIL import Image
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+INPUT_DIR = "buttons_assets/generated"
+OUTPUT_DIR = "buttons_assets/generated/transparent"
+MANIFEST_FILE = ".manifest.json"
+DEFAULT_MODEL = "u2net"
+
+# rembg session of this worker process (created by _init_worker)
+_session = None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def params_key(params):
+    """Stable string for the parameters an output depends on."""
+    return json.dumps(params, sort_keys=True)
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
 
-def process_images():
-    input_dir = "buttons_assets/generated"
-    output_dir = "buttons_assets/generated/transparent"
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
 
-    for image_path in glob.glob(os.path.join(input_dir, "*.png")):
+def _init_worker(model):
+    # rembg / onnxruntime are imported here so the parent process (and a run
+    # with nothing to do) never pays for loading them
+    global _session
+    from rembg import new_session
+    _session = new_session(model)
+
+
+def _process(image_path, output_path, params):
+    """Runs in a worker: remove the background of one image."""
+    from PIL import Image
+    from rembg import remove
+
+    started = time.perf_counter()
+    with Image.open(image_path) as input_image:
+        output_image = remove(
+            input_image,
+            session=_session,
+            alpha_matting=params["alpha_matting"],
+            post_process_mask=params["post_process_mask"],
+        )
+    output_image.save(output_path, "PNG")
+    return time.perf_counter() - started
+
+
+def plan(images, output_dir, manifest, params, force):
+    """Split `images` into (todo, skipped); todo entries are (path, output_path, sha256)."""
+    key = params_key(params)
+    todo, skipped = [], []
+    for image_path in images:
         filename = os.path.basename(image_path)
         output_path = os.path.join(output_dir, filename)
-        
-        print(f"Processing: {filename}")
-        
-        try:
-            input_image = Image.open(image_path)
-            output_image = remove(input_image)
-            output_image.save(output_path, "PNG")
-            print(f"Saved: {output_path}")
-        except Exception as e:
-            print(f"Failed to process {filename}: {e}")
+        source_hash = file_sha256(image_path)
+        entry = manifest.get(filename)
+        if (not force and entry is not None and entry.get("source") == source_hash
+                and entry.get("params") == key and os.path.exists(output_path)):
+            skipped.append(filename)
+        else:
+            todo.append((image_path, output_path, source_hash))
+    return todo, skipped
+
+
+def process_images(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, workers=None,
+                   model=DEFAULT_MODEL, alpha_matting=False, post_process_mask=False,
+                   force=False):
+    """Process new or changed images; returns the list of (filename, error) failures."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path)
+    params = {"model": model, "alpha_matting": alpha_matting,
+              "post_process_mask": post_process_mask}
+
+    images = sorted(glob.glob(os.path.join(input_dir, "*.png")))
+    todo, skipped = plan(images, output_dir, manifest, params, force)
+    # forget outputs whose source image is gone
+    current = {os.path.basename(p) for p in images}
+    for filename in [f for f in manifest if f not in current]:
+        del manifest[filename]
+
+    print(f"{len(images)} images: {len(skipped)} unchanged, {len(todo)} to process")
+    failures = []
+    started = time.perf_counter()
+    if todo:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        print(f"Removing backgrounds with {workers} worker(s), model {model} ...")
+        key = params_key(params)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model,)) as pool:
+            futures = {
+                pool.submit(_process, image_path, output_path, params): (image_path, output_path, source_hash)
+                for image_path, output_path, source_hash in todo
+            }
+            for future in as_completed(futures):
+                image_path, output_path, source_hash = futures[future]
+                filename = os.path.basename(image_path)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    failures.append((filename, f"{type(e).__name__}: {e}"))
+                    manifest.pop(filename, None)
+                    print(f"  [Error] {filename}: {e}")
+                    continue
+                manifest[filename] = {"source": source_hash, "params": key}
+                print(f"  [OK] {filename} ({seconds:.1f}s)")
+    save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - started
+    done = len(todo) - len(failures)
+    print(f"Done in {elapsed:.1f}s: {done} processed, {len(skipped)} skipped, {len(failures)} failed")
+    if failures:
+        print("Failures:")
+        for filename, error in failures:
+            print(f"  {filename}: {error}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Remove the background of the generated button assets.")
+    parser.add_argument("--input-dir", default=INPUT_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, each with its own rembg session (default: CPU count)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"rembg model (default {DEFAULT_MODEL})")
+    parser.add_argument("--alpha-matting", action="store_true", help="refine edges with alpha matting")
+    parser.add_argument("--post-process-mask", action="store_true", help="smooth the predicted mask")
+    parser.add_argument("--force", action="store_true", help="reprocess images even if unchanged")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    process_images()
+    args = parse_args()
+    failed = process_images(args.input_dir, args.output_dir, workers=args.workers, model=args.model,
+                            alpha_matting=args.alpha_matting, post_process_mask=args.post_process_mask,
+                            force=args.force)
+    sys.exit(1 if failed else 0)
@@ -21,6 +21,12 @@ interface SportStreamEvent {
     streamwest_url: string;
     embed_url: string | null;
     stream: string | null;
+    // Playable mirrors ranked by time to first playlist byte; `stream` is the first one.
+    streams?: { embed_url: string; server: string; stream_num: number; m3u8: string; lb: string | null; ttfb_ms: number }[] | null;
+    // With `scraper.py --hls-probe`: whether the stream was found playing when crawled.
+    hls?: { status: 'live' | 'stalled' | 'ended' | 'dead' | 'unknown'; newest_segment_age?: number | null } | null;
+    // With `scraper.py --relay URL`: `stream` is the local relay URL and this the upstream m3u8.
+    stream_source?: string | null;
     error?: string | null;
 }
 
@@ -28,6 +34,12 @@ const fetchLiveSports = async (force: boolean) => {
     return fetchJson<SportStreamEvent[]>(`/api/sports/live${force ? '?refresh=true' : ''}`);
 };
 
+const resolveStream = async (embedUrl: string) => {
+    return fetchJson<{ m3u8?: string; error?: string }>(
+        `/api/sports/resolve?embed_url=${encodeURIComponent(embedUrl)}`
+    );
+};
+
 export default function SportsDashboard() {
     const navigate = useNavigate();
     const mediaPlayer = useMediaPlayer();
@@ -45,7 +57,8 @@ export default function SportsDashboard() {
     const isLoading = () => sportsResult() === undefined;
     const hasError = () => sportsResult()?.error != null;
 
-    const playableEvents = () => events().filter((e) => e.stream != null);
+    // With `scraper.py --lazy-tokens` only embed_url is stored; the stream is resolved on click.
+    const playableEvents = () => events().filter((e) => e.stream != null || (e.embed_url != null && !e.error));
     const filteredEvents = () =>
         playableEvents().filter(
             (e) =>
@@ -53,8 +66,13 @@ export default function SportsDashboard() {
                 e.sport.toLowerCase().includes(filterQuery().toLowerCase())
         );
 
-    const openStream = (event: SportStreamEvent) => {
-        if (!event.stream) return;
+    const openStream = async (event: SportStreamEvent) => {
+        let streamUrl = event.stream;
+        if (!streamUrl && event.embed_url) {
+            const resolved = await resolveStream(event.embed_url);
+            streamUrl = resolved.data?.m3u8 ?? null;
+        }
+        if (!streamUrl) return;
 
         mediaPlayer.openItem({
             id: `sports-${Date.now()}`,
@@ -63,7 +81,7 @@ export default function SportsDashboard() {
             mediaKind: 'episode', // Pretend it's an episode to unlock full screen video controls
             title: event.title,
             subtitle: `${event.sport} • ${event.viewer_count} Viewers`,
-            streamUrl: event.stream,
+            streamUrl,
             artworkUrl: event.thumbnail || undefined,
         });
         void navigate('/player');
@@ -115,7 +133,7 @@ export default function SportsDashboard() {
                     <div class="movies-grid">
                         <For each={filteredEvents()}>
                             {(match) => (
-                                <Card class="movie-card" onClick={() => openStream(match)}>
+                                <Card class="movie-card" onClick={() => void openStream(match)}>
                                     <div class="movie-poster" style="aspect-ratio: 16/9; margin-bottom: 0;">
                                         {match.thumbnail ? (
                                             <img src={match.thumbnail} alt={match.title} />
@@ -1,10 +1,14 @@
 import { Hono } from 'hono';
-import { exec } from 'child_process';
+import { exec, execFile } from 'child_process';
 import { promisify } from 'util';
 import path from 'path';
 import fs from 'fs/promises';
+import { and, desc, eq, max, type SQL } from 'drizzle-orm';
+import { db } from '../db/connection';
+import { sportsEvents } from '../db/schema';
 
 const execAsync = promisify(exec);
+const execFileAsync = promisify(execFile);
 
 export const sportsRouter = new Hono();
 
@@ -16,6 +20,22 @@ sportsRouter.get('/live', async (c) => {
 
         const forceRefresh = c.req.query('refresh') === 'true';
 
+        // Prefer a running crawler daemon (`python scraper.py --daemon`): it keeps the
+        // browser warm and shares one crawl between concurrent refresh requests.
+        const daemonUrl = process.env.SPORTS_CRAWLER_URL;
+        if (daemonUrl) {
+            try {
+                const res = await fetch(`${daemonUrl}/events${forceRefresh ? '?refresh=true' : ''}`);
+                if (res.ok) {
+                    console.log('[Sports] Serving streams from crawler daemon');
+                    return c.json(await res.json());
+                }
+                console.error(`[Sports] Crawler daemon answered ${res.status}, falling back`);
+            } catch (err) {
+                console.error('[Sports] Crawler daemon unreachable, falling back:', err);
+            }
+        }
+
         // Fast-path: Return cached streams.json immediately if it exists and no refresh requested
         if (!forceRefresh) {
             try {
@@ -56,3 +76,128 @@ sportsRouter.get('/live', async (c) => {
         return c.json({ error: error.message || 'Unknown crawler failure.' }, 500);
     }
 });
+
+// Resolve one embed URL to a fresh m3u8 at play time (used when the crawler runs with
+// --lazy-tokens and only stores embed_url). `expired=1` reports that the last token failed.
+sportsRouter.get('/resolve', async (c) => {
+    const embedUrl = c.req.query('embed_url');
+    if (!embedUrl) {
+        return c.json({ error: 'embed_url is required' }, 400);
+    }
+    const expired = c.req.query('expired') === '1';
+
+    try {
+        const daemonUrl = process.env.SPORTS_CRAWLER_URL;
+        if (daemonUrl) {
+            const params = new URLSearchParams({ embed_url: embedUrl });
+            if (expired) params.set('expired', '1');
+            const res = await fetch(`${daemonUrl}/resolve?${params}`);
+            return c.json(await res.json(), res.ok ? 200 : 502);
+        }
+
+        const crawlerPath = path.resolve(process.cwd(), 'StreamCrawler');
+        // cli.py resolve only imports what a cached answer needs, so it is cheap per click.
+        // '--' keeps an embed URL starting with '-' from being read as an option.
+        const args = [path.join(crawlerPath, 'cli.py'), 'resolve'];
+        if (expired) args.push('--expired');
+        args.push('--', embedUrl);
+        const { stdout } = await execFileAsync('python', args, {
+            cwd: crawlerPath,
+            env: { ...process.env, PYTHONIOENCODING: 'utf8' }
+        });
+        return c.json(JSON.parse(stdout));
+    } catch (error: any) {
+        console.error('[Sports] Stream resolve failed:', error);
+        // A failed resolve exits non-zero but still prints its {error} JSON on stdout.
+        if (error.stdout) {
+            try {
+                return c.json(JSON.parse(error.stdout), 502);
+            } catch {
+                // not JSON (e.g. a Python traceback): fall through to the generic message
+            }
+        }
+        return c.json({ error: error.message || 'Unknown resolve failure.' }, 502);
+    }
+});
+
+// Thumbnails cached by the crawler (StreamCrawler/thumb_cache.py). File names are the
+// sha256 of their content, so a response never changes and can be cached forever.
+const THUMB_CONTENT_TYPES: Record<string, string> = {
+    '.webp': 'image/webp',
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.avif': 'image/avif',
+};
+
+sportsRouter.get('/thumbs/:name', async (c) => {
+    const name = c.req.param('name');
+    if (!/^[0-9a-f]{64}\.(webp|jpg|png|gif|avif|img)$/.test(name)) {
+        return c.json({ error: 'Invalid thumbnail name' }, 400);
+    }
+    const thumbsDir = path.resolve(process.cwd(), 'StreamCrawler', process.env.STREAMCRAWLER_THUMBS || 'thumbs');
+
+    try {
+        const data = await fs.readFile(path.join(thumbsDir, name));
+        return c.body(data, 200, {
+            'Content-Type': THUMB_CONTENT_TYPES[path.extname(name)] || 'application/octet-stream',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'X-Content-Type-Options': 'nosniff',
+        });
+    } catch {
+        return c.json({ error: 'Thumbnail not found' }, 404);
+    }
+});
+
+// Filtered / paginated events from the sports_events table, populated when the crawler
+// runs with `--sqlite ../data/solari.db`. By default only the latest crawl is returned;
+// `history=true` includes events that have since dropped off /live.
+sportsRouter.get('/events', async (c) => {
+    const sport = c.req.query('sport');
+    const live = c.req.query('live');
+    const history = c.req.query('history') === 'true';
+
+    const parsedLimit = Number.parseInt(c.req.query('limit') || '', 10);
+    const limit = Number.isInteger(parsedLimit) ? Math.min(500, Math.max(1, parsedLimit)) : 100;
+    const parsedOffset = Number.parseInt(c.req.query('offset') || '', 10);
+    const offset = Number.isInteger(parsedOffset) ? Math.max(0, parsedOffset) : 0;
+
+    try {
+        const conditions: SQL[] = [];
+        if (!history) {
+            const [latest] = await db.select({ lastSeen: max(sportsEvents.lastSeen) }).from(sportsEvents);
+            if (!latest?.lastSeen) {
+                return c.json([]);
+            }
+            conditions.push(eq(sportsEvents.lastSeen, latest.lastSeen));
+        }
+        if (sport) conditions.push(eq(sportsEvents.sport, sport));
+        if (live === 'true' || live === 'false') conditions.push(eq(sportsEvents.isLive, live === 'true'));
+
+        const rows = await db.select().from(sportsEvents)
+            .where(and(...conditions))
+            .orderBy(desc(sportsEvents.viewerCount))
+            .limit(limit)
+            .offset(offset);
+
+        // Same shape as streams.json, so the Sports page can consume either source
+        return c.json(rows.map((row) => ({
+            href: row.href,
+            title: row.title,
+            sport: row.sport,
+            teams: row.teams ? JSON.parse(row.teams) : [],
+            thumbnail: row.thumbnail,
+            viewer_count: row.viewerCount,
+            is_live: row.isLive,
+            streamwest_url: row.streamwestUrl,
+            embed_url: row.embedUrl,
+            stream: row.stream,
+            error: row.error,
+            embed_wait_ms: row.embedWaitMs,
+            last_seen: row.lastSeen,
+        })));
+    } catch (error: any) {
+        console.error('[Sports] Event query failed:', error);
+        return c.json({ error: error.message || 'Unknown event query failure.' }, 500);
+    }
+});
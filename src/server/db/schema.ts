@@ -1,4 +1,4 @@
-import { sqliteTable, text, integer, real } from 'drizzle-orm/sqlite-core';
+import { sqliteTable, text, integer, real, index } from 'drizzle-orm/sqlite-core';
 import { sql } from 'drizzle-orm';
 
 // Base media table
@@ -160,3 +160,27 @@ export const discordSettings = sqliteTable('discord_settings', {
   onDownloadCompleted: integer('on_download_completed', { mode: 'boolean' }).default(true),
   onDownloadFailed: integer('on_download_failed', { mode: 'boolean' }).default(true),
 });
+
+// Sports events (upserted by StreamCrawler/scraper.py --sqlite)
+export const sportsEvents = sqliteTable('sports_events', {
+  href: text('href').primaryKey(),
+  title: text('title').notNull(),
+  sport: text('sport'),
+  teams: text('teams'), // JSON array
+  thumbnail: text('thumbnail'),
+  viewerCount: integer('viewer_count').default(0),
+  isLive: integer('is_live', { mode: 'boolean' }).default(false),
+  streamwestUrl: text('streamwest_url'),
+  embedUrl: text('embed_url'),
+  stream: text('stream'),
+  error: text('error'),
+  embedWaitMs: integer('embed_wait_ms'),
+  resolvedAt: integer('resolved_at', { mode: 'timestamp' }),
+  firstSeen: integer('first_seen', { mode: 'timestamp' }).notNull(),
+  lastSeen: integer('last_seen', { mode: 'timestamp' }).notNull(),
+}, (table) => ({
+  sportIdx: index('sports_events_sport_idx').on(table.sport),
+  isLiveIdx: index('sports_events_is_live_idx').on(table.isLive),
+  viewerCountIdx: index('sports_events_viewer_count_idx').on(table.viewerCount),
+  lastSeenIdx: index('sports_events_last_seen_idx').on(table.lastSeen),
+}));